@@ -15,8 +15,11 @@ import configparser
 
 # utils モジュールへのパスを追加
 sys.path.insert(0, os.getcwd())
-from utils.voicevox_api import VoicevoxAPI
+from utils.voicevox_api import voicevox_api
 from utils.audio_cache import cache_manager
+from utils.synthesis import synthesis_service
+from utils.burst_coalescer import BurstCoalescer
+from utils.text_normalizer import text_normalizer
 
 # 環境変数の読み込み
 load_dotenv()
@@ -64,10 +67,11 @@ bot = commands.Bot(command_prefix='!', intents=intents)
 logger = setup_logger()
 
 # テキスト読み上げの設定
-voicevox_api = VoicevoxAPI()
 config = configparser.ConfigParser()
 config.read('config/settings.ini')
 max_message_length = config.getint('DEFAULT', 'max_message_length', fallback=100)
+streaming_enabled = config.getboolean('READING', 'streaming_enabled', fallback=True)
+max_stream_message_length = config.getint('READING', 'max_stream_message_length', fallback=400)
 
 async def load_extensions():
     """Cogを読み込む"""
@@ -149,8 +153,8 @@ async def process_auto_reading(message):
     if not audio_control.is_connected(message.guild.id):
         return
     
-    # メッセージ内容を取得
-    text = message.content
+    # メッセージ内容を取得（表記ゆれを揃えて、同じ読み上げ内容が同じキャッシュキーになるようにする）
+    text = text_normalizer.normalize(message.content)
     
     # 空のメッセージは無視
     if not text.strip():
@@ -159,71 +163,94 @@ async def process_auto_reading(message):
     # URLやコードブロックなど読み上げ不要な部分を除外
     # TODO: 必要に応じてメッセージのフィルタリングを実装
     
-    # テキストの最大長をチェック
-    if len(text) > max_message_length:
-        text = text[:max_message_length] + "..."
+    # テキストの最大長をチェック（ストリーム読み上げでは長文も最後まで読める）
+    length_limit = max_stream_message_length if streaming_enabled else max_message_length
+    if len(text) > length_limit:
+        text = text[:length_limit] + "..."
     
-    try:
-        # 話者ID設定
-        speaker_id = None
-        
-        # set_speaker_commandから話者ID設定を取得
-        if hasattr(bot, 'set_speaker_command'):
-            speaker_id = bot.set_speaker_command.get_default_speaker(
-                message.author.id, 
-                message.guild.id
-            )
-        else:
-            # デフォルト値を使用
-            speaker_id = 1
-        
-        # キャッシュキーを生成
-        cache_key = cache_manager.generate_cache_key(text, speaker_id)
-        cache_path = cache_manager.get_cache_path(cache_key)
+    # 話者ID設定
+    speaker_id = None
+    
+    # set_speaker_commandから話者ID設定を取得
+    if hasattr(bot, 'set_speaker_command'):
+        speaker_id = bot.set_speaker_command.get_default_speaker(
+            message.author.id, 
+            message.guild.id
+        )
+    else:
+        # デフォルト値を使用
+        speaker_id = 1
+    
+    # システム統計オブジェクトがあれば、メッセージ処理をカウント
+    if hasattr(bot, 'system_stats'):
+        bot.system_stats.increment_messages()
+        # 読み上げる単語数をカウント
+        bot.system_stats.add_words(text)
         
-        # システム統計オブジェクトがあれば、メッセージ処理をカウント
-        if hasattr(bot, 'system_stats'):
-            bot.system_stats.increment_messages()
-            # 読み上げる単語数をカウント
-            bot.system_stats.add_words(text)
-            
-            # メッセージ処理時のステータス更新は削除（定期タスクに任せる）
+        # メッセージ処理時のステータス更新は削除（定期タスクに任せる）
+    
+    # 同じ投稿者の連続した短いメッセージは、まとめて1回で合成する
+    if burst_coalescer.enabled:
+        await burst_coalescer.add(message, speaker_id, text)
+    else:
+        await read_message(message, speaker_id, text)
+
+async def read_message(message, speaker_id, text):
+    """メッセージ（または連続したメッセージをまとめたもの）を読み上げキューに追加する"""
+    audio_control = bot.get_cog('AudioControl')
+    if not audio_control or not audio_control.is_connected(message.guild.id):
+        return
+    
+    # 合成を依頼する前に、読み上げキューの受付条件（上限・経過時間）を確認
+    created_at = message.created_at.timestamp()
+    if not audio_control.admit(message.guild.id, created_at):
+        logger.debug(f"読み上げキューが受け付けなかったためスキップ: {text[:20]}")
+        return
+    
+    try:
+        guild_id = message.guild.id
+        system_stats = getattr(bot, 'system_stats', None)
         
-        audio_path = None
-        if cache_path:
-            # キャッシュがある場合はそれを使用
-            audio_path = cache_path
-            # キャッシュヒットを記録
-            if hasattr(bot, 'system_stats'):
-                bot.system_stats.record_cache_hit()
+        # 話速は合成を開始する時点のキューの溜まり具合で決める
+        if streaming_enabled and len(text) > voicevox_api.long_text_threshold:
+            # 長文は文ごとに合成し、最初の文ができた時点で読み上げを始める
+            async def synthesize():
+                params = audio_control.get_synthesis_params(guild_id, text)
+                return synthesis_service.get_audio_stream(text, speaker_id, system_stats, guild_id=guild_id,
+                                                          params=params)
         else:
-            # 音声合成リクエスト
-            audio_path = await voicevox_api.create_audio(text, speaker_id)
-            # キャッシュミスを記録
-            if hasattr(bot, 'system_stats'):
-                bot.system_stats.record_cache_miss()
-                
-            if audio_path:
-                # キャッシュに追加
-                await cache_manager.add_to_cache(cache_key, audio_path, text, speaker_id)
-        
-        if not audio_path:
-            logger.error(f"音声の生成に失敗: {text}")
-            return
+            # キャッシュの確認と音声合成（同じテキストの合成が実行中ならその結果を共有）
+            async def synthesize():
+                params = audio_control.get_synthesis_params(guild_id, text)
+                return await synthesis_service.get_audio(text, speaker_id, system_stats, guild_id=guild_id,
+                                                         params=params)
         
-        # オーディオをキューに追加
-        await audio_control.play_audio(message.guild.id, audio_path, message.author.id, text)
-        
-        logger.info(f"自動読み上げ: \"{text}\" (話者ID: {speaker_id}, ユーザー: {message.author.name})")
+        # 到着順に再生キューを予約する（合成は再生順が近づいた時点で先行して行われる）
+        if audio_control.reserve(guild_id, synthesize, message.author.id, text, created_at):
+            logger.info(f"自動読み上げ: \"{text}\" (話者ID: {speaker_id}, ユーザー: {message.author.name})")
         
     except Exception as e:
         logger.error(f"自動読み上げエラー: {e}")
+    finally:
+        audio_control.release_admission(message.guild.id)
+
+# 連続したメッセージをまとめて読み上げる
+burst_coalescer = BurstCoalescer(read_message)
+bot.burst_coalescer = burst_coalescer
 
 async def main():
     """メイン関数"""
     async with bot:
-        await load_extensions()
-        await bot.start(TOKEN)
+        # VOICEVOX APIの共有HTTPセッションを開始
+        await voicevox_api.start()
+        try:
+            await load_extensions()
+            await bot.start(TOKEN)
+        finally:
+            # 終了時に共有HTTPセッションを閉じる
+            await voicevox_api.close()
+            # 最終アクセス日時の未書き込みの更新を書き込んでキャッシュの索引を閉じる
+            await cache_manager.close()
 
 # Botを起動
 if __name__ == '__main__':
@@ -2,26 +2,243 @@ import discord
 from discord.ext import commands
 import asyncio
 import os
+import io
 import logging
 import sys
 from collections import deque
 import traceback
+import time
+import configparser
 
 # utils/audio_cacheをインポートするためのパス設定
 sys.path.insert(0, os.getcwd())
-from utils.audio_cache import AudioCache
+from utils.audio_cache import cache_manager
+from utils.audio_source import WavAudioSource, OpusPacketSource
+from utils.voicevox_api import AudioStream, voicevox_api
+
+class QueueItem:
+    """
+    再生キューの項目（音声ファイルまたは文ごとのストリーム）
+    factory を指定した場合は、再生順が近づいた時点で合成を開始する
+    """
+    
+    __slots__ = ("path", "stream", "user_id", "text", "created_at", "factory", "task", "retired")
+    
+    def __init__(self, path=None, stream=None, user_id=None, text=None, created_at=None, factory=None):
+        self.path = path
+        self.stream = stream
+        self.user_id = user_id
+        self.text = text
+        self.created_at = created_at
+        self.factory = factory  # 音声ファイルのパスまたはAudioStreamを返すコルーチン関数
+        self.task = None        # factory の実行タスク
+        self.retired = False    # 再生済みまたは破棄済み
+
+
+class GuildPlayer:
+    """サーバーごとのボイスクライアント・再生キュー・再生タスクをまとめたクラス"""
+    
+    def __init__(self, voice_client, ahead=3):
+        """
+        初期化
+        
+        Args:
+            voice_client (discord.VoiceClient): 接続済みのボイスクライアント
+            ahead (int): 再生中の項目を含めて先行して合成する件数
+        """
+        self.voice_client = voice_client
+        self.queue = asyncio.Queue()
+        self.texts = {}       # キュー内のテキスト -> 件数（重複チェック用）
+        self.queued_chars = 0 # キュー内のテキストの合計文字数（読み上げ終わるまでの時間の見積もり用）
+        self.current = None   # 再生中の項目
+        self.task = None      # 再生タスク
+        
+        # 先行合成
+        self.ahead = max(1, ahead)
+        self.deferred = deque()  # 合成の開始を待つ項目（到着順）
+        self.active = set()      # 合成を開始し、まだ再生し終えていない項目
+    
+    def __len__(self):
+        return self.queue.qsize()
+    
+    def has_text(self, text):
+        """同じテキストがキューにあるかどうか"""
+        return text in self.texts
+    
+    def put(self, item):
+        """キューの末尾に追加"""
+        self.queue.put_nowait(item)
+        if item.text:
+            self.texts[item.text] = self.texts.get(item.text, 0) + 1
+            self.queued_chars += len(item.text)
+        if item.factory is not None:
+            self.deferred.append(item)
+            self.fill()
+    
+    def fill(self):
+        """先行合成の枠が空いていれば、到着順に合成を開始する"""
+        while self.deferred and len(self.active) < self.ahead:
+            item = self.deferred.popleft()
+            if item.retired:
+                continue
+            item.task = asyncio.create_task(item.factory())
+            self.active.add(item)
+    
+    def retire(self, item):
+        """再生済み・破棄した項目を先行合成の枠から外す"""
+        item.retired = True
+        self.active.discard(item)
+        self.fill()
+    
+    def forget(self, item):
+        """キューから取り出した項目を重複チェックの対象から外す"""
+        if item.text:
+            self.queued_chars = max(0, self.queued_chars - len(item.text))
+            count = self.texts.get(item.text, 0) - 1
+            if count > 0:
+                self.texts[item.text] = count
+            else:
+                self.texts.pop(item.text, None)
+    
+    def pop_oldest(self):
+        """キューの先頭（最も古い項目）を取り出す"""
+        item = self.queue.get_nowait()
+        self.forget(item)
+        self.retire(item)
+        return item
+    
+    def drain(self):
+        """キューの項目をすべて取り出す"""
+        # 取り出す途中で後続の合成が始まらないよう、先に合成待ちを空にする
+        self.deferred.clear()
+        items = []
+        while not self.queue.empty():
+            items.append(self.pop_oldest())
+        return items
+    
+    def chars_ahead(self, text):
+        """
+        キューでそのテキストの項目より前にある項目の合計文字数（その項目自身は含めない）
+        重複チェックにより同じテキストはキューに1件しかないため、テキストで項目を特定する
+        
+        Returns:
+            int: 合計文字数（項目がキューにない場合は0）
+        """
+        chars = 0
+        for item in self.queue._queue:
+            if item.text == text:
+                return chars
+            if item.text:
+                chars += len(item.text)
+        return 0
+    
+    def drop_unsynthesized(self):
+        """合成を始めていない項目をキューから取り出す（合成中・合成済みの項目は順番どおり残す）"""
+        # 合成待ちの項目はすべて取り出すため、合成待ちを空にする
+        self.deferred.clear()
+        kept, dropped = [], []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item.factory is not None and item.task is None:
+                dropped.append(item)
+            else:
+                kept.append(item)
+        for item in kept:
+            self.queue.put_nowait(item)
+        for item in dropped:
+            self.forget(item)
+            self.retire(item)
+        return dropped
+    
+    @property
+    def idle(self):
+        """再生中の項目も再生待ちもないかどうか"""
+        return self.current is None and self.queue.empty()
+
 
 class AudioControl(commands.Cog):
     """音声制御クラス"""
 
     def __init__(self, bot):
         self.bot = bot
-        self.voice_clients = {}  # サーバーIDごとのVoiceClientを管理
-        self.audio_queues = {}   # サーバーIDごとの音声キューを管理
-        self.is_playing = {}     # サーバーIDごとの再生状態を管理
+        self.players = {}        # サーバーIDごとの再生状態（GuildPlayer）を管理
         self.logger = logging.getLogger("audio_control")
-        self.cache_manager = AudioCache()
+        self.cache_manager = cache_manager
         self.auto_disconnect_tasks = {}  # 自動切断タスクを管理
+        self.reconnect_tasks = {}  # 切断された接続の再接続タスクを管理
+        self.pending_counts = {}  # サーバーIDごとの合成待ちメッセージ数
+        self.queue_stats = {}     # サーバーIDごとの受付・破棄の統計
+        
+        # 文ごとのストリーム再生の統計
+        self.stream_stats = {
+            "streams": 0,
+            "first_segment_total": 0.0,
+            "first_segment_max": 0.0
+        }
+        
+        # 投稿から再生開始までの時間（秒）
+        self.recent_latencies = deque(maxlen=1000)
+        
+        # 読み上げキューの受付設定
+        config = configparser.ConfigParser()
+        config.read('config/settings.ini')
+        self.max_queue_length = config.getint('QUEUE', 'max_queue_length', fallback=20)
+        self.max_message_age = config.getfloat('QUEUE', 'max_message_age', fallback=60.0)
+        self.overflow_policy = config.get('QUEUE', 'overflow_policy', fallback='drop_oldest')
+        self.catch_up_threshold = config.getint('QUEUE', 'catch_up_threshold', fallback=0)
+        self.catch_up_keep = max(1, config.getint('QUEUE', 'catch_up_keep', fallback=3))
+        self.synthesis_ahead = max(1, config.getint('QUEUE', 'synthesis_ahead', fallback=3))
+        
+        # 先行合成の統計（再生の順番が来たときに合成が終わっていなかった回数）
+        self.pipeline_stats = {
+            "items": 0,
+            "stalls": 0,
+            "stall_time": 0.0,
+            "failed": 0
+        }
+        
+        # 再生方式（native: プロセス内でPCMに変換 / ffmpeg: 再生ごとにffmpegを起動）
+        self.playback_backend = config.get('AUDIO', 'playback_backend', fallback='native').strip().lower()
+        self.playback_stats = {
+            "memory": 0,
+            "opus": 0,
+            "native": 0,
+            "ffmpeg": 0,
+            "fallbacks": 0,
+            "stretched": 0
+        }
+        
+        # キューの溜まり具合に応じた話速（読み上げ終わるまでの見積もり秒数 -> speedScale）
+        self.seconds_per_char = config.getfloat('QUEUE', 'seconds_per_char', fallback=0.13)
+        self.speed_tiers = self._parse_speed_tiers(
+            config.get('QUEUE', 'speed_tiers', fallback='0:1.0,10:1.15,20:1.3,40:1.5')
+        )
+        self.speed_stats = {scale: 0 for _, scale in self.speed_tiers}
+        # 話速を変える方法（engine: 合成時に speedScale を指定 / playback: 再生時に時間伸縮 / off: 変えない）
+        self.speed_control = config.get('QUEUE', 'speed_control', fallback='engine').strip().lower()
+        
+        # 聞いている人がいないときの動作
+        self.pause_when_alone = config.getboolean('VOICE', 'pause_when_alone', fallback=True)
+        self.idle_disconnect_seconds = config.getfloat('VOICE', 'idle_disconnect_seconds', fallback=300.0)
+        self.reconnect_attempts = config.getint('VOICE', 'reconnect_attempts', fallback=3)
+        self.reconnect_base_delay = config.getfloat('VOICE', 'reconnect_base_delay', fallback=1.0)
+        self.reconnect_max_delay = config.getfloat('VOICE', 'reconnect_max_delay', fallback=30.0)
+        self.presence_stats = {
+            "skipped": 0,           # 聞いている人がいないため受け付けなかったメッセージ
+            "discarded": 0,         # 全員が退出したときに破棄した合成前の再生待ち
+            "auto_disconnects": 0,
+            "reconnects": 0,
+            "reconnect_failures": 0
+        }
+
+    def cog_unload(self):
+        """Cogのアンロード時に再生タスクを停止"""
+        for player in self.players.values():
+            if player.task:
+                player.task.cancel()
+        for task in list(self.auto_disconnect_tasks.values()) + list(self.reconnect_tasks.values()):
+            if task:
+                task.cancel()
 
     async def connect_to_voice(self, guild_id, channel_id):
         """指定されたボイスチャンネルに接続"""
@@ -37,14 +254,13 @@ class AudioControl(commands.Cog):
                 return False
                 
             # 既に接続している場合は切断
-            if guild_id in self.voice_clients and self.voice_clients[guild_id]:
+            if guild_id in self.players:
                 await self.disconnect_from_voice(guild_id)
                 
             # ボイスチャンネルに接続
             voice_client = await channel.connect()
-            self.voice_clients[guild_id] = voice_client
-            self.audio_queues[guild_id] = deque()
-            self.is_playing[guild_id] = False
+            self.attach_voice_client(guild_id, voice_client)
+            self._update_presence(guild_id)
             
             self.logger.info(f"ボイスチャンネルに接続: {channel.name} (サーバー: {guild.name})")
             return True
@@ -54,21 +270,33 @@ class AudioControl(commands.Cog):
             traceback.print_exc()
             return False
 
+    def attach_voice_client(self, guild_id, voice_client):
+        """接続済みのボイスクライアントを登録し、サーバーの再生タスクを開始"""
+        player = GuildPlayer(voice_client, self.synthesis_ahead)
+        player.task = asyncio.create_task(self._player_loop(guild_id, player))
+        self.players[guild_id] = player
+        return player
+
     async def disconnect_from_voice(self, guild_id):
         """ボイスチャンネルから切断"""
         try:
-            if guild_id in self.voice_clients and self.voice_clients[guild_id]:
-                if self.voice_clients[guild_id].is_connected():
-                    await self.voice_clients[guild_id].disconnect()
+            player = self.players.pop(guild_id, None)
+            if player:
+                # 再生タスクを止め、合成中のストリームを含めてキューを破棄
+                player.task.cancel()
+                try:
+                    await player.task
+                except asyncio.CancelledError:
+                    pass
+                for item in player.drain():
+                    self._discard_item(item)
+                
+                if player.voice_client.is_connected():
+                    await player.voice_client.disconnect()
                     
                 # 自動切断タスクをキャンセル
-                if guild_id in self.auto_disconnect_tasks and self.auto_disconnect_tasks[guild_id]:
-                    self.auto_disconnect_tasks[guild_id].cancel()
-                    self.auto_disconnect_tasks[guild_id] = None
+                self._cancel_auto_disconnect(guild_id)
                     
-                self.voice_clients[guild_id] = None
-                self.audio_queues[guild_id] = deque()
-                self.is_playing[guild_id] = False
                 self.logger.info(f"ボイスチャンネルから切断 (サーバーID: {guild_id})")
                 return True
                 
@@ -80,79 +308,582 @@ class AudioControl(commands.Cog):
 
     def is_connected(self, guild_id):
         """ボイスチャンネルに接続しているかどうかを確認"""
-        return (guild_id in self.voice_clients and 
-                self.voice_clients[guild_id] is not None and 
-                self.voice_clients[guild_id].is_connected())
+        player = self.players.get(guild_id)
+        return player is not None and player.voice_client.is_connected()
 
-    async def play_audio(self, guild_id, audio_path, user_id=None, message_text=None):
+    def get_voice_client(self, guild_id):
+        """サーバーのボイスクライアントを取得（未接続の場合はNone）"""
+        player = self.players.get(guild_id)
+        return player.voice_client if player else None
+
+    def is_idle(self, guild_id):
+        """再生中の音声も再生待ちもないかどうか"""
+        player = self.players.get(guild_id)
+        return player is None or player.idle
+    
+    def has_listeners(self, guild_id, channel=None):
+        """
+        ボイスチャンネルにスピーカーミュートしていないBot以外のメンバーがいるかどうか
+        
+        Args:
+            guild_id (int): サーバーID
+            channel (discord.VoiceChannel, optional): 調べるチャンネル（省略時は接続中のチャンネル）
+        """
+        if channel is None:
+            player = self.players.get(guild_id)
+            if player is None:
+                return False
+            channel = getattr(player.voice_client, 'channel', None)
+        if channel is None:
+            # チャンネルが分からない場合は聞いている人がいるものとして扱う
+            return True
+        return any(not member.bot and not self._is_deafened(member) for member in channel.members)
+    
+    @staticmethod
+    def _is_deafened(member):
+        """スピーカーミュート中（自分またはサーバーによる）かどうか"""
+        voice = getattr(member, 'voice', None)
+        return voice is not None and (voice.self_deaf or voice.deaf)
+    
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """ボイスチャンネルの入退室を監視し、聞いている人の有無と切断を処理する"""
+        guild_id = member.guild.id
+        
+        if self.bot.user is not None and member.id == self.bot.user.id:
+            # Bot自身が切断された（disconnect_from_voice による切断ではプレイヤーは既に削除済み）
+            if after.channel is None and before.channel is not None and guild_id in self.players:
+                self.logger.warning(f"ボイスチャンネルから切断されました (サーバーID: {guild_id})")
+                await self.disconnect_from_voice(guild_id)
+                self._schedule_reconnect(guild_id, before.channel.id)
+            elif after.channel is not None:
+                self._update_presence(guild_id)
+            return
+        
+        if member.bot or guild_id not in self.players:
+            return
+        
+        # 接続中のチャンネルでの入退室・スピーカーミュートの切り替えのみ処理する
+        channel = getattr(self.players[guild_id].voice_client, 'channel', None)
+        if channel is not None and channel in (before.channel, after.channel):
+            self._update_presence(guild_id)
+    
+    def _update_presence(self, guild_id):
+        """聞いている人の有無に応じて、再生待ちの破棄と自動切断の予約・取り消しを行う"""
+        if guild_id not in self.players:
+            return
+        
+        if self.has_listeners(guild_id):
+            self._cancel_auto_disconnect(guild_id)
+            return
+        
+        if guild_id in self.auto_disconnect_tasks:
+            return
+        
+        # 誰も聞いていない読み上げのために合成しないよう、合成前の再生待ちを破棄する
+        # （合成中・合成済みの項目は残し、そのまま再生する）
+        if self.pause_when_alone:
+            dropped = self.players[guild_id].drop_unsynthesized()
+            for item in dropped:
+                self._discard_item(item)
+            discarded = len(dropped)
+            self.presence_stats["discarded"] += discarded
+            if discarded:
+                self.logger.info(f"聞いている人がいないため {discarded} 件の読み上げを破棄 (サーバーID: {guild_id})")
+        
+        if self.idle_disconnect_seconds > 0:
+            self.auto_disconnect_tasks[guild_id] = asyncio.create_task(self._auto_disconnect(guild_id))
+    
+    def _cancel_auto_disconnect(self, guild_id):
+        task = self.auto_disconnect_tasks.pop(guild_id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+    
+    async def _auto_disconnect(self, guild_id):
+        """聞いている人がいない状態が続いたら切断する"""
+        await asyncio.sleep(self.idle_disconnect_seconds)
+        # 切断処理の中で自分自身をキャンセルしないよう、先に登録を外す
+        self.auto_disconnect_tasks.pop(guild_id, None)
+        if guild_id in self.players and not self.has_listeners(guild_id):
+            self.logger.info(f"聞いている人がいないため切断します (サーバーID: {guild_id})")
+            self.presence_stats["auto_disconnects"] += 1
+            await self.disconnect_from_voice(guild_id)
+    
+    def _schedule_reconnect(self, guild_id, channel_id):
+        """切断されたボイスチャンネルへの再接続を予約する"""
+        if self.reconnect_attempts <= 0 or guild_id in self.reconnect_tasks:
+            return
+        task = asyncio.create_task(self._reconnect(guild_id, channel_id))
+        self.reconnect_tasks[guild_id] = task
+        task.add_done_callback(lambda _: self.reconnect_tasks.pop(guild_id, None))
+    
+    async def _reconnect(self, guild_id, channel_id):
+        """間隔を倍にしながら再接続を試みる（聞いている人がいなくなった場合は諦める）"""
+        delay = self.reconnect_base_delay
+        for attempt in range(1, self.reconnect_attempts + 1):
+            await asyncio.sleep(delay)
+            if guild_id in self.players:
+                return  # コマンドなどで既に接続済み
+            
+            guild = self.bot.get_guild(guild_id)
+            channel = guild.get_channel(channel_id) if guild else None
+            if channel is None or not self.has_listeners(guild_id, channel):
+                self.logger.info(f"聞いている人がいないため再接続しません (サーバーID: {guild_id})")
+                return
+            
+            self.logger.info(f"再接続を試みます ({attempt}/{self.reconnect_attempts}, サーバーID: {guild_id})")
+            if guild.voice_client is not None:
+                # 切断済みのボイスクライアントが残っていると接続できないため破棄
+                await guild.voice_client.disconnect(force=True)
+            if await self.connect_to_voice(guild_id, channel_id):
+                self.presence_stats["reconnects"] += 1
+                return
+            delay = min(delay * 2, self.reconnect_max_delay)
+        
+        self.presence_stats["reconnect_failures"] += 1
+        self.logger.error(f"再接続に失敗しました (サーバーID: {guild_id})")
+    
+    def get_presence_stats(self):
+        """聞いている人の有無による制御の統計を取得（回避したエンジンの処理時間は平均応答時間からの見積もり）"""
+        stats = dict(self.presence_stats)
+        engines = voicevox_api.get_engine_stats()
+        completed = sum(engine["completed"] for engine in engines)
+        avg_latency = (sum(engine["avg_latency"] * engine["completed"] for engine in engines) / completed) if completed else 0
+        stats["avoided_engine_seconds"] = (stats["skipped"] + stats["discarded"]) * avg_latency
+        return stats
+
+    def _get_queue_stats(self, guild_id):
+        """サーバーごとの受付・破棄の統計を取得（なければ作成）"""
+        if guild_id not in self.queue_stats:
+            self.queue_stats[guild_id] = {
+                "admitted": 0,
+                "dropped_oldest": 0,
+                "dropped_newest": 0,
+                "expired": 0,
+                "caught_up": 0
+            }
+        return self.queue_stats[guild_id]
+    
+    def get_backlog(self, guild_id):
+        """合成待ちと再生待ちを合わせたメッセージ数"""
+        player = self.players.get(guild_id)
+        return self.pending_counts.get(guild_id, 0) + (len(player) if player else 0)
+    
+    def _is_expired(self, created_at):
+        """メッセージが読み上げ期限を過ぎているかどうか"""
+        return (created_at is not None and self.max_message_age > 0 and
+                time.time() - created_at > self.max_message_age)
+    
+    def admit(self, guild_id, created_at=None):
+        """
+        合成を依頼する前に、メッセージを読み上げキューに受け付けるか判定する
+        受け付けた場合は release_admission() を必ず呼び出すこと
+        
+        Args:
+            guild_id (int): サーバーID
+            created_at (float, optional): メッセージの投稿時刻（UNIX時間）
+            
+        Returns:
+            bool: 受け付けた場合はTrue
+        """
+        if not self.is_connected(guild_id):
+            return False
+        
+        # 誰も聞いていないサーバーの読み上げは合成しない
+        if self.pause_when_alone and not self.has_listeners(guild_id):
+            self.presence_stats["skipped"] += 1
+            return False
+        
+        stats = self._get_queue_stats(guild_id)
+        player = self.players[guild_id]
+        
+        # 古すぎるメッセージは合成しない
+        if self._is_expired(created_at):
+            stats["expired"] += 1
+            return False
+        
+        # キューが上限に達している場合
+        if self.max_queue_length > 0 and self.get_backlog(guild_id) >= self.max_queue_length:
+            # 合成中のメッセージは取り消せないため、再生待ちがない場合は新しい方を破棄
+            if self.overflow_policy == 'drop_oldest' and len(player):
+                self._discard_item(player.pop_oldest())
+                stats["dropped_oldest"] += 1
+            else:
+                stats["dropped_newest"] += 1
+                return False
+        
+        # キャッチアップ: 溜まりすぎた場合は最新のN件だけを残す
+        backlog = self.get_backlog(guild_id)
+        if self.catch_up_threshold > 0 and backlog >= self.catch_up_threshold:
+            skip = min(len(player), backlog + 1 - self.catch_up_keep)
+            for _ in range(max(0, skip)):
+                self._discard_item(player.pop_oldest())
+                stats["caught_up"] += 1
+            if skip > 0:
+                self.logger.info(f"読み上げが遅れているため {skip} 件をスキップ (サーバーID: {guild_id})")
+        
+        stats["admitted"] += 1
+        self.pending_counts[guild_id] = self.pending_counts.get(guild_id, 0) + 1
+        return True
+    
+    def release_admission(self, guild_id):
+        """admit() で受け付けたメッセージの合成待ちを解除する（キュー追加後または失敗時）"""
+        if self.pending_counts.get(guild_id, 0) > 0:
+            self.pending_counts[guild_id] -= 1
+    
+    def get_admission_stats(self, guild_id):
+        """サーバーごとの受付・破棄の統計を取得"""
+        stats = dict(self._get_queue_stats(guild_id))
+        stats["pending"] = self.pending_counts.get(guild_id, 0)
+        player = self.players.get(guild_id)
+        stats["queued"] = len(player) if player else 0
+        return stats
+    
+    async def play_audio(self, guild_id, audio_path, user_id=None, message_text=None, created_at=None):
         """音声ファイルを再生キューに追加"""
         if not self.is_connected(guild_id):
             self.logger.warning(f"ボイスチャンネルに接続していません (サーバーID: {guild_id})")
             return False
             
+        self._enqueue(guild_id, QueueItem(audio_path, None, user_id, message_text, created_at))
+        return True
+    
+    async def play_stream(self, guild_id, stream, user_id=None, message_text=None, created_at=None):
+        """
+        文ごとに合成される音声ストリームを再生キューに追加
+        先頭の文が用意でき次第再生を始め、残りの文は再生中にバックグラウンドで合成される
+        """
+        if not self.is_connected(guild_id):
+            self.logger.warning(f"ボイスチャンネルに接続していません (サーバーID: {guild_id})")
+            stream.cancel()
+            return False
+        
+        if not self._enqueue(guild_id, QueueItem(None, stream, user_id, message_text, created_at)):
+            stream.cancel()
+        return True
+    
+    def reserve(self, guild_id, factory, user_id=None, message_text=None, created_at=None):
+        """
+        合成前のメッセージを到着順に再生キューに予約する
+        合成は再生順が近づいた時点（先行合成の枠に入った時点）で開始され、再生は必ず予約順に行われる
+        
+        Args:
+            guild_id (int): サーバーID
+            factory (callable): 音声ファイルのパスまたはAudioStreamを返すコルーチン関数（失敗時はNone）
+            user_id (int, optional): 投稿者のユーザーID
+            message_text (str, optional): 読み上げるテキスト（重複チェックに使用）
+            created_at (float, optional): メッセージの投稿時刻（UNIX時間）
+        
+        Returns:
+            bool: 予約した場合はTrue
+        """
+        if not self.is_connected(guild_id):
+            self.logger.warning(f"ボイスチャンネルに接続していません (サーバーID: {guild_id})")
+            return False
+        
+        return self._enqueue(guild_id, QueueItem(None, None, user_id, message_text, created_at, factory))
+    
+    def _enqueue(self, guild_id, item):
+        """キュー項目を追加する（重複でスキップした場合はFalse）"""
+        player = self.players[guild_id]
+        
         # 既に同じテキストがキューにある場合はスキップ（重複読み上げ防止）
-        if message_text:
-            for item in self.audio_queues.get(guild_id, []):
-                if item.get("text") == message_text:
-                    self.logger.debug(f"重複メッセージをスキップ: {message_text[:20]}...")
-                    return True
-        
-        # キューに追加
-        self.audio_queues[guild_id].append({
-            "path": audio_path,
-            "user_id": user_id,
-            "text": message_text
-        })
-        
-        # 再生中でなければ再生を開始
-        if not self.is_playing[guild_id]:
-            asyncio.create_task(self._play_next(guild_id))
-            
+        if item.text and player.has_text(item.text):
+            self.logger.debug(f"重複メッセージをスキップ: {item.text[:20]}...")
+            return False
+        
+        # キューに追加（再生タスクが順に取り出して再生する）
+        player.put(item)
         return True
 
-    async def _play_next(self, guild_id):
-        """キューの次の音声を再生"""
-        if not self.is_connected(guild_id) or not self.audio_queues[guild_id]:
-            self.is_playing[guild_id] = False
+    async def _player_loop(self, guild_id, player):
+        """サーバーごとの再生タスク: キューから項目を取り出して順に再生する"""
+        try:
+            while True:
+                item = await player.queue.get()
+                player.forget(item)
+                
+                # 再生を待つ間に期限を過ぎたメッセージは読み上げない
+                if self._is_expired(item.created_at):
+                    self._get_queue_stats(guild_id)["expired"] += 1
+                    player.retire(item)
+                    self._discard_item(item)
+                    continue
+                
+                player.current = item
+                try:
+                    await self._play_item(player, item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"オーディオ再生エラー: {e}")
+                    traceback.print_exc()
+                finally:
+                    player.current = None
+                    player.retire(item)
+        except asyncio.CancelledError:
+            # 切断時: 再生中の項目を破棄して終了
+            if player.current is not None:
+                self._discard_item(player.current)
+                player.current = None
+            raise
+
+    async def _play_item(self, player, item):
+        """キュー項目を再生する（ストリームの場合は文ごとに順に再生）"""
+        if item.task is not None and not await self._await_synthesis(item):
+            return
+        
+        if item.stream is None:
+            await self._play_file(player, item.path, item)
             return
-            
-        self.is_playing[guild_id] = True
         
-        # キューから次の音声を取得
-        audio_data = self.audio_queues[guild_id].popleft()
-        audio_path = audio_data["path"]
+        first = True
+        pause_ms = 0
+        while True:
+            # 次の文の合成が終わるまで待つ
+            audio_path = await item.stream.next_path()
+            if audio_path is None:
+                return
+            if first:
+                self._record_stream_start(item.stream)
+            elif pause_ms > 0:
+                # 前の文の句読点に応じた間を空ける
+                await asyncio.sleep(pause_ms / 1000)
+            pause_ms = item.stream.pause_ms
+            await self._play_file(player, audio_path, item if first else None)
+            first = False
+
+    async def _play_file(self, player, audio_path, item=None):
+        """
+        音声ファイルを1つ再生し、再生が終わるまで待つ
         
+        Args:
+            player (GuildPlayer): 再生するサーバーの状態
+            audio_path (str): 音声ファイルのパス
+            item (QueueItem, optional): 新しいメッセージの再生開始時に渡す（遅延の記録用）
+        """
         try:
-            # 音声ファイルが存在するか確認
-            if not os.path.exists(audio_path):
+            # 再生時に話速を変える場合は、再生を始める時点のキューの溜まり具合で倍率を決める
+            speed = self._select_speed(player.queued_chars) if self.speed_control == "playback" else 1.0
+            source = await self._create_source(audio_path, speed)
+            if source is None:
                 self.logger.error(f"音声ファイルが見つかりません: {audio_path}")
-                await self._play_next(guild_id)  # 次の音声へ
                 return
-                
-            # 音声を再生
-            voice_client = self.voice_clients[guild_id]
             
-            # FFmpegオプションを設定
-            ffmpeg_options = {
-                'options': '-vn -loglevel error'
-            }
+            # 再生終了のコールバックは音声スレッドから呼ばれるため、イベントループに戻して通知
+            loop = asyncio.get_running_loop()
+            finished = loop.create_future()
             
-            source = discord.FFmpegPCMAudio(audio_path, **ffmpeg_options)
-            voice_client.play(source, after=lambda e: self._audio_finished(e, guild_id, audio_path))
+            def after(error):
+                loop.call_soon_threadsafe(self._notify_finished, finished, error)
             
-        except Exception as e:
-            self.logger.error(f"オーディオ再生エラー: {e}")
-            traceback.print_exc()
-            # エラーが発生した場合でも次の音声を再生
-            await self._play_next(guild_id)
-
-    def _audio_finished(self, error, guild_id, audio_path):
-        """音声再生が終了したときに呼ばれるコールバック"""
-        # エラーが発生した場合はログに記録
-        if error:
-            self.logger.error(f"オーディオ再生エラー: {error}")
+            player.voice_client.play(source, after=after)
             
-        # テンポラリディレクトリのファイルを削除（キャッシュは保持）
+            # 新しいメッセージの再生開始時に、投稿からの経過時間を記録
+            if item is not None and item.created_at is not None:
+                self.recent_latencies.append(max(0.0, time.time() - item.created_at))
+            
+            try:
+                error = await finished
+            except asyncio.CancelledError:
+                if player.voice_client.is_playing():
+                    player.voice_client.stop()
+                raise
+            
+            # エラーが発生した場合はログに記録
+            if error:
+                self.logger.error(f"オーディオ再生エラー: {error}")
+        finally:
+            # テンポラリディレクトリのファイルを削除（キャッシュは保持）
+            self._remove_temp_file(audio_path)
+
+    async def _await_synthesis(self, item):
+        """予約した項目の合成結果を待つ（合成できなかった場合はFalse）"""
+        self.pipeline_stats["items"] += 1
+        if not item.task.done():
+            # 再生の順番が来たのに合成が終わっていない（パイプラインの停止）
+            self.pipeline_stats["stalls"] += 1
+            wait_start = time.monotonic()
+            try:
+                await asyncio.wait({item.task})
+            finally:
+                self.pipeline_stats["stall_time"] += time.monotonic() - wait_start
+        
+        result = None
+        if not item.task.cancelled():
+            if item.task.exception() is not None:
+                self.logger.error(f"音声の合成に失敗: {item.task.exception()}")
+            else:
+                result = item.task.result()
+        
+        if result is None:
+            self.pipeline_stats["failed"] += 1
+            self.logger.error(f"音声の生成に失敗: {(item.text or '')[:20]}")
+            return False
+        
+        if isinstance(result, AudioStream):
+            item.stream = result
+        else:
+            item.path = result
+        return True
+    
+    def _parse_speed_tiers(self, value):
+        """「秒数:話速」のカンマ区切りを (秒数, 話速) のリスト（秒数の昇順）にする"""
+        tiers = []
+        for entry in value.split(','):
+            if not entry.strip():
+                continue
+            try:
+                seconds, scale = entry.split(':')
+                tiers.append((float(seconds), float(scale)))
+            except ValueError:
+                self.logger.warning(f"話速の段階の設定が正しくありません: {entry}")
+        tiers.sort()
+        if not tiers or tiers[0][0] > 0:
+            tiers.insert(0, (0.0, 1.0))
+        return tiers
+    
+    def estimate_drain_time(self, guild_id):
+        """再生待ちのメッセージをすべて読み上げ終わるまでの見積もり時間（秒）"""
+        player = self.players.get(guild_id)
+        if player is None:
+            return 0.0
+        return player.queued_chars * self.seconds_per_char
+    
+    def _select_speed(self, queued_chars):
+        """読み上げ終わるまでの見積もり時間（再生待ちの文字数から計算）が長いほど速い話速を選ぶ"""
+        drain_time = queued_chars * self.seconds_per_char
+        scale = self.speed_tiers[0][1]
+        for threshold, tier_scale in self.speed_tiers:
+            if drain_time >= threshold:
+                scale = tier_scale
+        
+        self.speed_stats[scale] = self.speed_stats.get(scale, 0) + 1
+        return scale
+    
+    def get_synthesis_params(self, guild_id, text=None):
+        """
+        キューの溜まり具合に応じた合成パラメータを選ぶ（合成を開始する時点で呼び出す）
+        先に再生される項目を読み上げ終わるまでの見積もり時間が長いほど速い話速を使い、遅れを取り戻す
+        
+        Args:
+            guild_id (int): サーバーID
+            text (str, optional): 合成するメッセージのテキスト（キューでこれより前にある項目だけを見積もりに使う）
+        
+        Returns:
+            dict: audio_query に上書きするパラメータ（通常の話速の場合はNone）
+        """
+        player = self.players.get(guild_id)
+        if self.speed_control != "engine" or player is None:
+            return None
+        
+        # 合成するメッセージ自身の長さで話速が上がらないよう、それより前の再生待ちだけで見積もる
+        queued_chars = player.chars_ahead(text) if text else player.queued_chars
+        scale = self._select_speed(queued_chars)
+        if scale == 1.0:
+            return None
+        return {"speedScale": scale}
+    
+    def get_speed_stats(self):
+        """話速の段階ごとの使用回数を取得"""
+        return dict(self.speed_stats)
+    
+    def get_pipeline_stats(self):
+        """先行合成の統計を取得"""
+        stats = dict(self.pipeline_stats)
+        stats["stall_ratio"] = (stats["stalls"] / stats["items"] * 100) if stats["items"] else 0
+        return stats
+    
+    @staticmethod
+    def _notify_finished(future, error):
+        if not future.done():
+            future.set_result(error)
+
+    def pause_audio(self, guild_id):
+        """再生中の音声を一時停止"""
+        voice_client = self.get_voice_client(guild_id)
+        if voice_client and voice_client.is_playing():
+            voice_client.pause()
+            return True
+        return False
+
+    def resume_audio(self, guild_id):
+        """一時停止中の音声を再開"""
+        voice_client = self.get_voice_client(guild_id)
+        if voice_client and voice_client.is_paused():
+            voice_client.resume()
+            return True
+        return False
+
+    async def _create_source(self, audio_path, speed=1.0):
+        """
+        再生方式に応じた音声ソースを作成
+        
+        Args:
+            audio_path (str): 音声ファイルのパス
+            speed (float): 再生速度の倍率（1.0以外の場合はキャッシュ済みの音声を時間伸縮して再生）
+        
+        Returns:
+            discord.AudioSource: 音声ソース、ファイルが見つからない場合はNone
+        """
+        if speed != 1.0:
+            self.playback_stats["stretched"] += 1
+        else:
+            # よく使われる音声はメモリに保持したデータからそのまま再生する
+            hot = self.cache_manager.get_hot(audio_path)
+            if hot is not None:
+                kind, data = hot
+                self.playback_stats["memory"] += 1
+                return OpusPacketSource(data, audio_path) if kind == "opus" else WavAudioSource(data, audio_path)
+        
+        if not self.cache_manager.exists(audio_path):
+            return None
+        
+        # 事前エンコードしたOpusパケットがあればそのまま送信する（速度を変える場合はデコードが必要なため使わない）
+        opus_path = self.cache_manager.get_opus_path(audio_path) if speed == 1.0 else None
+        if opus_path:
+            try:
+                source = OpusPacketSource.from_file(opus_path, reader=self.cache_manager.read_bytes)
+                self.playback_stats["opus"] += 1
+                self.cache_manager.offer_hot(audio_path, "opus", source.packets, source.size)
+                return source
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Opusパケットの読み込みに失敗: {e}")
+        
+        if self.playback_backend == "native":
+            try:
+                # WAVの変換はCPUを使うため、イベントループを塞がないよう別スレッドで実行
+                loop = asyncio.get_running_loop()
+                # セグメントに格納したキャッシュはメモリマップから直接読み込む
+                source = await loop.run_in_executor(
+                    None, WavAudioSource.from_file, audio_path, speed, self.cache_manager.read_wav
+                )
+                self.playback_stats["native"] += 1
+                if speed == 1.0:
+                    self.cache_manager.offer_hot(audio_path, "pcm", source.pcm, len(source.pcm))
+                return source
+            except ValueError as e:
+                # WAV以外の形式などはffmpegで再生する
+                self.logger.warning(f"プロセス内での変換に失敗したためffmpegで再生します: {e}")
+                self.playback_stats["fallbacks"] += 1
+        
+        # FFmpegオプションを設定
+        ffmpeg_options = {
+            'options': '-vn -loglevel error'
+        }
+        if speed != 1.0:
+            # atempo は0.5〜2.0倍に対応
+            ffmpeg_options['options'] += f' -filter:a atempo={min(2.0, max(0.5, speed)):g}'
+        
+        self.playback_stats["ffmpeg"] += 1
+        packed = self.cache_manager.read_packed(audio_path)
+        if packed is not None:
+            # セグメントに格納したキャッシュはファイルがないため、標準入力から渡す
+            return discord.FFmpegPCMAudio(io.BytesIO(packed.tobytes()), pipe=True, **ffmpeg_options)
+        return discord.FFmpegPCMAudio(audio_path, **ffmpeg_options)
+    
+    def _remove_temp_file(self, audio_path):
+        """一時ファイルを削除する（キャッシュファイルは保持）"""
         try:
             if audio_path and os.path.exists(audio_path) and "temp/" in audio_path:
                 # キャッシュファイルなら削除しない（キャッシュマネージャが管理）
@@ -161,14 +892,54 @@ class AudioControl(commands.Cog):
                     self.logger.debug(f"一時ファイルを削除: {audio_path}")
         except Exception as e:
             self.logger.error(f"ファイル削除エラー: {e}")
-            
-        # 次の音声を再生
-        asyncio.run_coroutine_threadsafe(self._play_next(guild_id), self.bot.loop)
-
+    
+    def _discard_item(self, item):
+        """再生せずに破棄するキュー項目の後始末"""
+        if item.task is not None:
+            if not item.task.done():
+                item.task.cancel()
+            elif not item.task.cancelled() and item.task.exception() is None:
+                result = item.task.result()
+                if isinstance(result, AudioStream):
+                    result.cancel()
+                else:
+                    self._remove_temp_file(result)
+        if item.stream is not None:
+            item.stream.cancel()
+        self._remove_temp_file(item.path)
+    
+    def _record_stream_start(self, stream):
+        """ストリームの最初の文が用意できるまでの時間を記録"""
+        latency = stream.first_segment_latency or 0.0
+        self.stream_stats["streams"] += 1
+        self.stream_stats["first_segment_total"] += latency
+        self.stream_stats["first_segment_max"] = max(self.stream_stats["first_segment_max"], latency)
+    
+    def get_latency_stats(self):
+        """投稿から再生開始までの時間の統計を取得"""
+        latencies = sorted(self.recent_latencies)
+        if not latencies:
+            return {"count": 0, "avg": 0, "p50": 0, "p95": 0, "max": 0}
+        return {
+            "count": len(latencies),
+            "avg": sum(latencies) / len(latencies),
+            "p50": latencies[len(latencies) // 2],
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "max": latencies[-1]
+        }
+    
+    def get_stream_stats(self):
+        """ストリーム再生の統計を取得"""
+        stats = dict(self.stream_stats)
+        stats["first_segment_avg"] = (stats["first_segment_total"] / stats["streams"]) if stats["streams"] else 0
+        return stats
+    
     def clear_queue(self, guild_id):
         """再生キューをクリア"""
-        if guild_id in self.audio_queues:
-            self.audio_queues[guild_id].clear()
+        player = self.players.get(guild_id)
+        if player:
+            for item in player.drain():
+                self._discard_item(item)
             self.logger.info(f"再生キューをクリア (サーバーID: {guild_id})")
             return True
         return False
@@ -39,10 +39,9 @@ class LeaveCommand:
             # get_connected_channelメソッドの代わりに、直接voice_clientから取得
             channel_mention = "ボイスチャンネル"
             try:
-                if (interaction.guild.id in audio_control.voice_clients and 
-                    audio_control.voice_clients[interaction.guild.id] and
-                    audio_control.voice_clients[interaction.guild.id].channel):
-                    channel_mention = audio_control.voice_clients[interaction.guild.id].channel.mention
+                voice_client = audio_control.get_voice_client(interaction.guild.id)
+                if voice_client and voice_client.channel:
+                    channel_mention = voice_client.channel.mention
             except Exception:
                 # チャンネル情報の取得に失敗しても処理を続行
                 pass
@@ -10,9 +10,9 @@ import json
 import math
 from typing import List
 
-# utils/voicevox_apiをインポートするためのパス設定
+# utils/speaker_catalogをインポートするためのパス設定
 sys.path.insert(0, os.getcwd())
-from utils.voicevox_api import VoicevoxAPI
+from utils.speaker_catalog import speaker_catalog
 
 class SpeakerPaginationView(ui.View):
     """話者リストのページネーション用View"""
@@ -87,7 +87,14 @@ class ListSpeakersCommand:
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger("commands.list_speakers")
-        self.voicevox_api = VoicevoxAPI()
+        self.speaker_catalog = speaker_catalog
+        
+        # 話者カタログのバージョンごとに作成済みのEmbedを保持
+        self._embeds = []
+        self._embeds_version = None
+        
+        # スナップショットから読み込んだ一覧があれば先にEmbedを作成しておく
+        self._get_embeds()
         
         # スラッシュコマンドを登録
         @bot.tree.command(
@@ -105,68 +112,14 @@ class ListSpeakersCommand:
                 # レスポンスをディファード
                 await interaction.response.defer(ephemeral=True)
                 
-                # 話者リストを取得
-                speakers = await self.voicevox_api.get_speakers()
+                # 話者リストを取得（カタログのキャッシュを使用）
+                speakers = await self.speaker_catalog.get_speakers()
                 
                 if not speakers:
                     await interaction.followup.send("VOICEVOXから話者情報を取得できませんでした。VOICEVOXエンジンが起動しているか確認してください。", ephemeral=True)
                     return
                 
-                # スピーカー情報を整理
-                speaker_dict = {}
-                
-                for speaker in speakers:
-                    speaker_name = speaker.get("name", "不明")
-                    styles = speaker.get("styles", [])
-                    
-                    if speaker_name not in speaker_dict:
-                        speaker_dict[speaker_name] = []
-                        
-                    for style in styles:
-                        style_id = style.get("id", -1)
-                        style_name = style.get("name", "不明")
-                        speaker_dict[speaker_name].append((style_id, style_name))
-                
-                # 最大25フィールドずつに分割して複数のEmbedを作成
-                embeds = []
-                current_embed = discord.Embed(
-                    title="VOICEVOX 話者一覧",
-                    description="以下の話者IDを `/set_speaker` コマンドで使用できます。",
-                    color=discord.Color.blue()
-                )
-                
-                field_count = 0
-                
-                # 話者をEmbedに追加
-                for speaker_name, styles in speaker_dict.items():
-                    # 25フィールド制限に達したら、新しいEmbedを作成
-                    if field_count >= 25:
-                        embeds.append(current_embed)
-                        current_embed = discord.Embed(
-                            title="VOICEVOX 話者一覧",
-                            description="以下の話者IDを `/set_speaker` コマンドで使用できます。",
-                            color=discord.Color.blue()
-                        )
-                        field_count = 0
-                    
-                    # スタイル情報をテキスト形式で作成
-                    value_text = "\n".join([f"ID: `{style_id}` - {style_name}" for style_id, style_name in styles])
-                    
-                    # フィールドを追加
-                    current_embed.add_field(
-                        name=speaker_name,
-                        value=value_text,
-                        inline=False
-                    )
-                    field_count += 1
-                
-                # 最後のEmbedを追加
-                if field_count > 0:
-                    embeds.append(current_embed)
-                
-                # フッターを全てのEmbedに追加
-                for i, embed in enumerate(embeds):
-                    embed.set_footer(text=f"話者IDを設定すると、自動読み上げ時にその声で読み上げられます")
+                embeds = self._get_embeds()
                 
                 # ページネーションビューを作成
                 if embeds:
@@ -182,6 +135,32 @@ class ListSpeakersCommand:
             except Exception as e:
                 self.logger.error(f"話者リスト取得エラー: {e}")
                 await interaction.followup.send(f"話者情報の取得中にエラーが発生しました: {e}", ephemeral=True)
+    
+    def _get_embeds(self):
+        """話者カタログのページ構成からEmbedを作成（カタログが更新されるまで再利用）"""
+        if self._embeds_version == self.speaker_catalog.version:
+            return self._embeds
+        
+        embeds = []
+        for page in self.speaker_catalog.pages:
+            embed = discord.Embed(
+                title="VOICEVOX 話者一覧",
+                description="以下の話者IDを `/set_speaker` コマンドで使用できます。",
+                color=discord.Color.blue()
+            )
+            for speaker_name, value_text in page:
+                embed.add_field(
+                    name=speaker_name,
+                    value=value_text,
+                    inline=False
+                )
+            # フッターを追加
+            embed.set_footer(text=f"話者IDを設定すると、自動読み上げ時にその声で読み上げられます")
+            embeds.append(embed)
+        
+        self._embeds = embeds
+        self._embeds_version = self.speaker_catalog.version
+        return embeds
 
 
 def setup(bot):
@@ -7,10 +7,11 @@ import logging
 import sys
 import os
 
-# utils/voicevox_apiをインポートするためのパス設定
+# utils/synthesisをインポートするためのパス設定
 sys.path.insert(0, os.getcwd())
-from utils.voicevox_api import VoicevoxAPI
-from utils.audio_cache import cache_manager
+from utils.synthesis import synthesis_service
+from utils.synthesis_scheduler import PRIORITY_INTERACTIVE
+from utils.text_normalizer import text_normalizer
 
 class SayCommand:
     """テキスト読み上げコマンド"""
@@ -18,7 +19,7 @@ class SayCommand:
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger("commands.say")
-        self.voicevox_api = VoicevoxAPI()
+        self.synthesis_service = synthesis_service
         
         # スラッシュコマンドを登録
         @bot.tree.command(
@@ -70,38 +71,26 @@ class SayCommand:
                 if speaker_id is None:
                     speaker_id = 1
                 
-                # キャッシュキーを生成
-                cache_key = cache_manager.generate_cache_key(text, speaker_id)
-                cache_path = cache_manager.get_cache_path(cache_key)
-                
                 # システム統計に反映
                 if hasattr(self.bot, 'system_stats'):
                     self.bot.system_stats.add_words(text)
                 
-                audio_path = None
-                if cache_path:
-                    # キャッシュがある場合はそれを使用
-                    audio_path = cache_path
-                    # キャッシュヒットを記録
-                    if hasattr(self.bot, 'system_stats'):
-                        self.bot.system_stats.record_cache_hit()
-                else:
-                    # 音声合成リクエスト
-                    audio_path = await self.voicevox_api.create_audio(text, speaker_id)
-                    # キャッシュミスを記録
-                    if hasattr(self.bot, 'system_stats'):
-                        self.bot.system_stats.record_cache_miss()
-                    
-                    if audio_path and cache_key:
-                        # キャッシュに追加
-                        await cache_manager.add_to_cache(cache_key, audio_path, text, speaker_id)
+                # 表記ゆれを揃えたテキストで合成し、同じ読み上げ内容のキャッシュを共有する
+                # （再生キューの重複チェックにも同じテキストを使う）
+                normalized = text_normalizer.normalize(text)
+                
+                # キャッシュの確認と音声合成（同じテキストの合成が実行中ならその結果を共有）
+                audio_path = await self.synthesis_service.get_audio(
+                    normalized, speaker_id, getattr(self.bot, 'system_stats', None),
+                    guild_id=interaction.guild.id, priority=PRIORITY_INTERACTIVE
+                )
                 
                 if not audio_path:
                     await interaction.followup.send("音声の生成に失敗しました。", ephemeral=True)
                     return
                 
                 # オーディオをキューに追加
-                await audio_control.play_audio(interaction.guild.id, audio_path, interaction.user.id, text)
+                await audio_control.play_audio(interaction.guild.id, audio_path, interaction.user.id, normalized)
                 
                 await interaction.followup.send(f"「{text}」を読み上げています。", ephemeral=True)
                 self.logger.info(f"テキスト読み上げ: \"{text}\" (話者ID: {speaker_id}, ユーザー: {interaction.user.name})")
@@ -10,7 +10,7 @@ import sys
 
 # utils/voicevox_apiをインポートするためのパス設定
 sys.path.insert(0, os.getcwd())
-from utils.voicevox_api import VoicevoxAPI
+from utils.speaker_catalog import speaker_catalog
 
 class SetSpeakerCommand:
     """デフォルト話者設定コマンド"""
@@ -18,7 +18,7 @@ class SetSpeakerCommand:
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger("commands.set_speaker")
-        self.voicevox_api = VoicevoxAPI()
+        self.speaker_catalog = speaker_catalog
         
         # ユーザー・サーバー別の話者設定ファイルのパス
         self.user_settings_path = "config/user_speakers.json"
@@ -121,13 +121,9 @@ class SetSpeakerCommand:
     
     async def _validate_speaker_id(self, speaker_id):
         """話者IDが有効かどうか確認する"""
-        speakers = await self.voicevox_api.get_speakers()
-        for speaker in speakers:
-            styles = speaker.get("styles", [])
-            for style in styles:
-                if style.get("id") == speaker_id:
-                    return f"{speaker.get('name')} ({style.get('name')})"
-        return None
+        if await self.speaker_catalog.lookup(speaker_id) is None:
+            return None
+        return self.speaker_catalog.describe_style(speaker_id)
     
     def get_user_speaker(self, user_id):
         """ユーザーのデフォルト話者IDを取得"""
@@ -15,6 +15,11 @@ import math
 # utils/sistema_statsをインポート
 sys.path.insert(0, os.getcwd())
 from utils.system_stats import SystemStats
+from utils.voicevox_api import voicevox_api
+from utils.synthesis import synthesis_service
+from utils.synthesis_scheduler import synthesis_scheduler
+from utils.audio_cache import cache_manager
+from utils.text_normalizer import text_normalizer
 
 class StatsCommand:
     """システム統計情報コマンド"""
@@ -69,8 +74,147 @@ class StatsCommand:
                     f"**読み上げメッセージ数:** {self.sys_stats.messages_processed:,} メッセージ\n"
                     f"**キャッシュヒット率:** {self.sys_stats.get_cache_hit_ratio():.1f}%"
                 )
+                cache_stats = cache_manager.get_cache_stats()
+                bot_info += (
+                    f"\n**音声キャッシュ:** {cache_stats['entries']:,}件 / {self._format_bytes(cache_stats['bytes'])}"
+                    + (f" (上限 {self._format_bytes(cache_stats['max_bytes'])}, 容量超過で削除 {cache_stats['evicted']:,}件)"
+                       if cache_stats['max_bytes'] > 0 else "")
+                )
+                segment_stats = cache_stats['segments']
+                if segment_stats:
+                    bot_info += (
+                        f"\n**キャッシュのセグメント:** {segment_stats['segments']:,}ファイル / "
+                        f"{self._format_bytes(segment_stats['disk_bytes'])} "
+                        f"(未回収 {self._format_bytes(segment_stats['dead_bytes'])}, "
+                        f"コンパクションで回収 {self._format_bytes(segment_stats['reclaimed_bytes'])})"
+                    )
+                tier_stats = cache_manager.get_tier_stats()
+                if tier_stats['lookups']:
+                    bot_info += (
+                        f"\n**キャッシュの階層別ヒット率:** メモリ {tier_stats['memory_hit_ratio']:.1f}% / "
+                        f"ディスク {tier_stats['disk_hit_ratio']:.1f}%"
+                    )
+                    if tier_stats['memory']:
+                        bot_info += (
+                            f" (メモリ {tier_stats['memory']['entries']:,}件 / "
+                            f"{self._format_bytes(tier_stats['memory']['bytes'])})"
+                        )
+                trim_stats = cache_manager.get_trim_stats()
+                if trim_stats['files']:
+                    bot_info += (
+                        f"\n**無音の除去:** {trim_stats['files']:,}件 "
+                        f"(平均 {trim_stats['avg_saved_seconds']:.2f}秒短縮, "
+                        f"合計 {trim_stats['saved_seconds']:.1f}秒 / {self._format_bytes(trim_stats['saved_bytes'])} 削減)"
+                    )
+                normalizer_stats = text_normalizer.get_stats()
+                if normalizer_stats['texts']:
+                    bot_info += (
+                        f"\n**表記ゆれの正規化:** {normalizer_stats['changed']:,} / {normalizer_stats['texts']:,}件 "
+                        f"({normalizer_stats['changed_ratio']:.1f}%)"
+                    )
                 embed.add_field(name="ボット統計", value=bot_info, inline=False)
                 
+                # VOICEVOX接続情報
+                http_stats = voicevox_api.get_http_stats()
+                segment_stats = voicevox_api.get_segment_stats()
+                synthesis_stats = synthesis_service.get_stats()
+                voicevox_info = (
+                    f"**リクエスト数:** {http_stats['requests']:,}\n"
+                    f"**新規接続数:** {http_stats['connections_created']:,}\n"
+                    f"**再利用接続数:** {http_stats['connections_reused']:,} ({http_stats['reuse_ratio']:.1f}%)\n"
+                    f"**並列セグメント合成:** {segment_stats['segments']:,} 件 "
+                    f"(失敗: {segment_stats['failed']:,}, 短縮率: {segment_stats['speedup']:.2f}倍)\n"
+                    f"**合成呼び出し:** {synthesis_stats['engine_calls']:,} 回 "
+                    f"(同時リクエスト統合で削減: {synthesis_stats['coalesced']:,} 回)\n"
+                    f"**長文の文単位キャッシュ:** {synthesis_stats['sentence_hits']:,} / {synthesis_stats['sentences']:,} 文 "
+                    f"({synthesis_stats['sentence_hit_ratio']:.1f}%)"
+                )
+                embed.add_field(name="VOICEVOX接続", value=voicevox_info, inline=False)
+                
+                # エンジンごとの負荷分散情報
+                engine_lines = []
+                for engine in voicevox_api.get_engine_stats():
+                    status = "🟢" if engine["healthy"] else "🔴"
+                    engine_lines.append(
+                        f"{status} `{engine['url']}` - 処理中: {engine['in_flight']}, "
+                        f"完了: {engine['completed']:,}, 失敗: {engine['failures']:,}, "
+                        f"平均: {engine['avg_latency'] * 1000:.0f}ms, {engine['throughput_per_min']:.1f}件/分"
+                    )
+                embed.add_field(name="VOICEVOXエンジン", value="\n".join(engine_lines), inline=False)
+                
+                # 合成スロットの割り当て状況
+                scheduler_stats = synthesis_scheduler.get_stats()
+                scheduler_info = (
+                    f"**使用中スロット:** {scheduler_stats['in_use']}/{scheduler_stats['slots']}\n"
+                    f"**全体の待機数:** {scheduler_stats['queued']}"
+                )
+                if interaction.guild:
+                    guild_stats = synthesis_scheduler.get_guild_stats(interaction.guild.id)
+                    scheduler_info += (
+                        f"\n**このサーバーの待機数:** {guild_stats['queued']}\n"
+                        f"**このサーバーの平均待ち時間:** {guild_stats['avg_wait'] * 1000:.0f}ms "
+                        f"(最大: {guild_stats['max_wait'] * 1000:.0f}ms)"
+                    )
+                embed.add_field(name="合成スケジューラ", value=scheduler_info, inline=False)
+                
+                # 読み上げキューの受付状況
+                audio_control = self.bot.get_cog('AudioControl')
+                if audio_control and interaction.guild:
+                    admission = audio_control.get_admission_stats(interaction.guild.id)
+                    queue_info = (
+                        f"**合成待ち / 再生待ち:** {admission['pending']} / {admission['queued']}\n"
+                        f"**受付:** {admission['admitted']:,}\n"
+                        f"**破棄 (古い順 / 新しい順):** {admission['dropped_oldest']:,} / {admission['dropped_newest']:,}\n"
+                        f"**期限切れ:** {admission['expired']:,}\n"
+                        f"**キャッチアップでスキップ:** {admission['caught_up']:,}"
+                    )
+                    latency = audio_control.get_latency_stats()
+                    if latency['count']:
+                        queue_info += (
+                            f"\n**投稿から再生まで:** 中央値 {latency['p50']:.2f}秒 / p95 {latency['p95']:.2f}秒"
+                        )
+                    coalescer = getattr(self.bot, 'burst_coalescer', None)
+                    if coalescer and coalescer.enabled:
+                        burst = coalescer.get_stats()
+                        queue_info += (
+                            f"\n**連続投稿のまとめ:** {burst['messages']:,}件 → {burst['bursts']:,}回 "
+                            f"(合成 {burst['engine_calls_saved']:,}回分を節約, "
+                            f"待ち時間 平均 {burst['avg_delay']:.2f}秒 / 最大 {burst['max_delay']:.2f}秒 / 上限 {burst['delay_bound']:.1f}秒)"
+                        )
+                    pipeline = audio_control.get_pipeline_stats()
+                    if pipeline['items']:
+                        queue_info += (
+                            f"\n**合成待ちで再生が止まった回数:** {pipeline['stalls']:,} / {pipeline['items']:,}件 "
+                            f"({pipeline['stall_ratio']:.1f}%, 合計 {pipeline['stall_time']:.1f}秒)"
+                        )
+                    playback = audio_control.playback_stats
+                    queue_info += (
+                        f"\n**再生ソース (メモリ / Opusパケット / プロセス内 / ffmpeg):** "
+                        f"{playback['memory']:,} / {playback['opus']:,} / {playback['native']:,} / {playback['ffmpeg']:,}"
+                    )
+                    if playback['stretched']:
+                        queue_info += f"\n**再生時に速度を変えた回数:** {playback['stretched']:,}"
+                    speed_stats = audio_control.get_speed_stats()
+                    if any(count for scale, count in speed_stats.items() if scale != 1.0):
+                        queue_info += "\n**話速の段階:** " + " / ".join(
+                            f"x{scale:g}: {count:,}" for scale, count in sorted(speed_stats.items())
+                        )
+                    stream_stats = audio_control.get_stream_stats()
+                    if stream_stats['streams']:
+                        queue_info += (
+                            f"\n**ストリーム読み上げ:** {stream_stats['streams']:,}件 "
+                            f"(最初の文まで 平均 {stream_stats['first_segment_avg']:.2f}秒 / 最大 {stream_stats['first_segment_max']:.2f}秒)"
+                        )
+                    presence = audio_control.get_presence_stats()
+                    if presence['skipped'] or presence['discarded'] or presence['auto_disconnects'] or presence['reconnects']:
+                        queue_info += (
+                            f"\n**聞いている人がいないため合成しなかった読み上げ:** "
+                            f"{presence['skipped'] + presence['discarded']:,}件 "
+                            f"(エンジン約 {presence['avoided_engine_seconds']:.1f}秒分)\n"
+                            f"**自動切断 / 再接続:** {presence['auto_disconnects']:,} / {presence['reconnects']:,}回"
+                        )
+                    embed.add_field(name="読み上げキュー", value=queue_info, inline=False)
+                
                 # ネットワーク情報
                 net_info = (
                     f"**送信:** {self._format_bytes(net_io.bytes_sent)}\n"
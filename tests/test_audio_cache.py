@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+
+from utils import audio_cache
+from utils.audio_cache import AudioCache
+from utils.wav_utils import WavData, write_wav
+
+
+def slow_encode_wav_to_opus_file(wav_path, opus_path):
+    """終了処理と重なるよう、時間をかけてOpusパケットファイルを書き出す"""
+    time.sleep(0.2)
+    with open(opus_path, 'wb') as f:
+        f.write(b'\x00' * 100)
+    return 100
+
+
+class CloseTest(unittest.IsolatedAsyncioTestCase):
+    """終了時のキャッシュの後始末"""
+    
+    async def asyncSetUp(self):
+        # 設定ファイルのない一時ディレクトリで、既定の設定のキャッシュを作る
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        self.source = os.path.join(self.directory.name, "source.wav")
+        write_wav(self.source, WavData(24000, 1, 2, b'\x10\x00' * 2400))
+    
+    async def asyncTearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+    
+    async def test_close_waits_for_pending_writes_and_opus_tasks(self):
+        cache = AudioCache()
+        cache.opus_cache = True
+        with mock.patch.object(audio_cache, 'encode_wav_to_opus_file', slow_encode_wav_to_opus_file):
+            write = asyncio.create_task(cache.add_to_cache("key", self.source, "テキスト", 1))
+            await asyncio.sleep(0)
+            await cache.close()
+            await write
+        
+        # 閉じた後は参照も追加もしない
+        self.assertIsNone(cache.get_cache_path("key"))
+        
+        reopened = AudioCache()
+        try:
+            entry = reopened.index.get("key")
+            self.assertIsNotNone(entry)
+            self.assertTrue(os.path.exists(reopened._opus_path(entry["path"])))
+            # Opusパケットファイルの分もサイズに含まれている
+            self.assertEqual(entry["size"], os.path.getsize(entry["path"]) + 100)
+        finally:
+            await reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
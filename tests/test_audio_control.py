@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from cogs.audio_control import AudioControl, GuildPlayer, QueueItem
+
+
+class FakeVoiceClient:
+    """再生せずに待ち続けるボイスクライアント"""
+    
+    channel = None
+    
+    def is_connected(self):
+        return True
+    
+    def is_playing(self):
+        return False
+    
+    def play(self, source, after=None):
+        pass
+    
+    def stop(self):
+        pass
+    
+    async def disconnect(self, force=False):
+        pass
+
+
+class SpeedSelectionTest(unittest.IsolatedAsyncioTestCase):
+    """キューの溜まり具合による話速の選択"""
+    
+    async def asyncSetUp(self):
+        self.control = AudioControl(bot=None)
+        self.control.speed_control = "engine"
+        self.control.seconds_per_char = 0.13
+        self.control.speed_tiers = [(0.0, 1.0), (10.0, 1.15), (20.0, 1.3), (40.0, 1.5)]
+    
+    async def asyncTearDown(self):
+        player = self.control.players.pop(1, None)
+        if player is not None and player.task is not None:
+            player.task.cancel()
+    
+    async def reserve(self, text):
+        """メッセージを予約し、合成開始時に選ばれた合成パラメータを返す"""
+        selected = asyncio.get_running_loop().create_future()
+        
+        async def synthesize():
+            selected.set_result(self.control.get_synthesis_params(1, text))
+            return None
+        
+        self.assertTrue(self.control.reserve(1, synthesize, message_text=text))
+        return selected
+    
+    async def test_single_long_message_on_idle_queue_plays_at_normal_speed(self):
+        self.control.attach_voice_client(1, FakeVoiceClient())
+        for length in (120, 400):
+            params = await asyncio.wait_for(await self.reserve("あ" * length), 1)
+            self.assertIsNone(params, f"{length}文字")
+    
+    async def test_backlog_ahead_speeds_up(self):
+        # 再生タスクを動かさず、予約したメッセージをキューに残したまま合成を始める
+        self.control.players[1] = GuildPlayer(FakeVoiceClient(), ahead=3)
+        first = await self.reserve("あ" * 100)
+        second = await self.reserve("い" * 200)
+        third = await self.reserve("う" * 10)
+        
+        self.assertIsNone(await asyncio.wait_for(first, 1))
+        self.assertEqual(await asyncio.wait_for(second, 1), {"speedScale": 1.15})
+        self.assertEqual(await asyncio.wait_for(third, 1), {"speedScale": 1.3})
+    
+    def test_estimate_counts_only_items_ahead(self):
+        player = GuildPlayer(FakeVoiceClient())
+        for text in ("a" * 10, "b" * 20, "c" * 30):
+            player.put(QueueItem(text=text))
+        
+        self.assertEqual(player.chars_ahead("a" * 10), 0)
+        self.assertEqual(player.chars_ahead("b" * 20), 10)
+        self.assertEqual(player.chars_ahead("c" * 30), 30)
+        self.assertEqual(player.chars_ahead("not queued"), 0)
+
+
+
+class ReconnectTest(unittest.IsolatedAsyncioTestCase):
+    """切断後の再接続"""
+    
+    async def asyncSetUp(self):
+        self.channel = SimpleNamespace(id=10, members=[])
+        guild = SimpleNamespace(id=1, voice_client=None, get_channel=lambda channel_id: self.channel)
+        self.control = AudioControl(bot=SimpleNamespace(get_guild=lambda guild_id: guild))
+        self.control.reconnect_base_delay = 0
+        self.connected = []
+        
+        async def connect_to_voice(guild_id, channel_id):
+            self.connected.append(channel_id)
+            return True
+        
+        self.control.connect_to_voice = connect_to_voice
+    
+    @staticmethod
+    def member(deaf=False, self_deaf=False):
+        return SimpleNamespace(bot=False, voice=SimpleNamespace(deaf=deaf, self_deaf=self_deaf))
+    
+    async def test_deafened_members_are_not_listeners(self):
+        self.channel.members = [self.member(self_deaf=True), self.member(deaf=True)]
+        await self.control._reconnect(1, 10)
+        self.assertEqual(self.connected, [])
+    
+    async def test_reconnects_while_someone_is_listening(self):
+        self.channel.members = [self.member(self_deaf=True), self.member()]
+        await self.control._reconnect(1, 10)
+        self.assertEqual(self.connected, [10])
+
+
+if __name__ == '__main__':
+    unittest.main()
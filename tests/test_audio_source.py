@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import ctypes
+import unittest
+from unittest import mock
+
+import discord
+
+from utils.wav_utils import build_wav
+from utils.audio_source import encode_wav_to_opus, parse_opus_packets, FRAME_SIZE, SAMPLES_PER_FRAME
+
+
+class CastingEncoder:
+    """discord.opus.Encoder と同じく、入力をctypesのポインタに変換してエンコードするエンコーダー"""
+    
+    def encode(self, pcm, frame_size):
+        ctypes.cast(pcm, ctypes.POINTER(ctypes.c_int16))
+        assert len(pcm) == FRAME_SIZE and frame_size == SAMPLES_PER_FRAME
+        return b'\xfc' + bytes(pcm[:4])
+
+
+class EncodeOpusTest(unittest.TestCase):
+    """Opusパケットへのエンコード"""
+    
+    def test_48k_stereo_passthrough(self):
+        # 変換不要な 48kHz / ステレオのWAVはPCMがメモリビューのまま渡される
+        frames = 2.5
+        pcm = bytes(range(256)) * int(FRAME_SIZE * frames / 256)
+        data = build_wav(pcm, 48000, 2, 2)
+        
+        with mock.patch.object(discord.opus, 'Encoder', CastingEncoder):
+            packets = parse_opus_packets(encode_wav_to_opus(data))
+        
+        self.assertEqual(len(packets), 3)
+        self.assertEqual(packets[0], b'\xfc' + pcm[:4])
+    
+    @unittest.skipUnless(discord.opus.is_loaded() or discord.opus._load_default(), "Opusライブラリがありません")
+    def test_48k_stereo_with_libopus(self):
+        data = build_wav(b'\x00' * FRAME_SIZE * 3, 48000, 2, 2)
+        self.assertEqual(len(parse_opus_packets(encode_wav_to_opus(data))), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+
+from utils.voicevox_api import VoicevoxAPI
+from utils.synthesis import SynthesisService
+from utils.wav_utils import WavData, read_wav, write_wav
+
+
+class FakeCache:
+    """何もキャッシュされていない状態から、追加されたキーだけを記録するキャッシュ"""
+    
+    cache_enabled = True
+    
+    def __init__(self):
+        self.added = []
+    
+    def generate_cache_key(self, text, speaker_id, params=None):
+        return text
+    
+    def get_cache_path(self, cache_key):
+        return None
+    
+    def peek_cache_path(self, cache_key):
+        return None
+    
+    def is_cache_file(self, audio_path):
+        return False
+    
+    async def add_to_cache(self, cache_key, file_path, text, speaker_id):
+        self.added.append(cache_key)
+    
+    read_wav = staticmethod(read_wav)
+
+
+class FakeScheduler:
+    @asynccontextmanager
+    async def slot(self, guild_id, priority):
+        yield
+
+
+class LongTextTest(unittest.IsolatedAsyncioTestCase):
+    """長文を文ごとに合成して結合する場合のキャッシュ"""
+    
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.api = VoicevoxAPI()
+        self.api.temp_dir = self.directory.name
+        self.api.long_text_threshold = 10
+        self.sample_rates = {}
+        
+        async def create_segment_audio(segment, speaker_id=1, params=None, index=0):
+            path = os.path.join(self.directory.name, f"{index}.wav")
+            sample_rate = self.sample_rates.get(index, 24000)
+            write_wav(path, WavData(sample_rate, 1, 2, b'\x00\x00' * (sample_rate // 10)))
+            return path
+        
+        self.api.create_segment_audio = create_segment_audio
+        self.cache = FakeCache()
+        self.service = SynthesisService(self.api, self.cache, FakeScheduler())
+        self.text = "一つ目の文です。二つ目の文です。三つ目の文です。"
+    
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+    
+    async def test_combined_audio_is_cached_under_full_text_key(self):
+        audio_path = await self.service.get_audio(self.text, 1)
+        
+        self.assertIsNotNone(audio_path)
+        self.assertIn(self.text, self.cache.added)
+    
+    async def test_combine_failure_is_not_cached_under_full_text_key(self):
+        # 設定変更前にキャッシュした文とサンプリングレートが異なる場合は結合できない
+        self.sample_rates[1] = 48000
+        audio_path = await self.service.get_audio(self.text, 1)
+        
+        self.assertIsNone(audio_path)
+        self.assertNotIn(self.text, self.cache.added)
+
+
+if __name__ == '__main__':
+    unittest.main()
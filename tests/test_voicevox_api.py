@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+
+from utils.voicevox_api import VoicevoxAPI
+
+
+class SegmentStatsTest(unittest.IsolatedAsyncioTestCase):
+    """並列セグメント合成の統計"""
+    
+    async def asyncSetUp(self):
+        self.api = VoicevoxAPI()
+        self.api.segment_concurrency = 4
+        self.api.segment_retries = 1
+        self.attempts = {}
+        
+        async def generate(text, speaker_id, params=None):
+            # 「失敗」を含む文は1回目だけ失敗する
+            self.attempts[text] = self.attempts.get(text, 0) + 1
+            await asyncio.sleep(0.05)
+            if "失敗" in text and self.attempts[text] == 1:
+                return None
+            return f"{text}.wav"
+        
+        self.api._generate_audio_segment = generate
+    
+    async def test_stream_records_wall_time_and_counts_each_segment_once(self):
+        stream = self.api.create_audio_stream("一文目。二文目で失敗。三文目。", 1)
+        paths = []
+        while (path := await stream.next_path()) is not None:
+            paths.append(path)
+        await asyncio.sleep(0)
+        
+        self.assertEqual(len(paths), 3)
+        stats = self.api.get_segment_stats()
+        self.assertEqual(stats["segments"], 3)
+        self.assertEqual(stats["retried"], 1)
+        self.assertGreater(stats["total_wall_time"], 0)
+        # 3文を並列に合成しても、逐次合成した場合の3倍を超えて速くはならない
+        self.assertLessEqual(stats["speedup"], 3.0)
+    
+    async def test_batch_counts_each_segment_once(self):
+        paths = await self.api._generate_segments(["一文目。", "二文目で失敗。"], 1)
+        
+        self.assertEqual(paths, ["一文目。.wav", "二文目で失敗。.wav"])
+        stats = self.api.get_segment_stats()
+        self.assertEqual(stats["segments"], 2)
+        self.assertLessEqual(stats["speedup"], 2.0)
+
+
+
+class EngineLoadTest(unittest.IsolatedAsyncioTestCase):
+    """エンジンごとの処理中のリクエスト数"""
+    
+    async def asyncSetUp(self):
+        self.api = VoicevoxAPI()
+        
+        async def get_session():
+            return None
+        
+        self.api._get_session = get_session
+    
+    async def assert_released_after(self, error):
+        async def synthesize_on(session, api_url, text, speaker_id, params=None):
+            raise error
+        
+        self.api._synthesize_on = synthesize_on
+        with self.assertRaises(type(error)):
+            await self.api._synthesize("テキスト", 1)
+        self.assertEqual([engine.in_flight for engine in self.api.engines.endpoints],
+                         [0] * len(self.api.engines.endpoints))
+    
+    async def test_unexpected_error_releases_engine(self):
+        await self.assert_released_after(RuntimeError("想定外のエラー"))
+    
+    async def test_cancellation_releases_engine(self):
+        await self.assert_released_after(asyncio.CancelledError())
+
+
+if __name__ == '__main__':
+    unittest.main()
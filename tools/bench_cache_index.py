@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+キャッシュ索引のベンチマーク
+
+指定した件数のキャッシュ情報が登録された状態で、1件の追加と1件の参照にかかる時間を
+SQLite（CacheIndex）と以前の方式（cache_info.json を追加のたびに全体を書き直す）で比較する。
+JSONの追加は件数に比例して遅くなるため、--json-inserts 回だけ計測する。
+
+使い方:
+    python tools/bench_cache_index.py [--entries 100000] [--inserts 2000] [--lookups 20000] [--json-inserts 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.getcwd())
+from utils.cache_index import CacheIndex
+
+
+def key_of(i):
+    return f"{i:064x}"
+
+
+def fill_index(index, entries):
+    """ベンチマーク用のエントリを一括で登録する"""
+    now = time.time()
+    rows = [
+        (key_of(i), f"テキスト{i}", i % 50, f"temp/cache/{key_of(i)}.wav", 40000 + i % 1000,
+         now - i, now - i, 1.2, 1.4)
+        for i in range(entries)
+    ]
+    index.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    index.conn.commit()
+
+
+def bench_sqlite(directory, entries, inserts, lookups):
+    """(1件の追加, 1件の参照, 最終アクセス日時の更新) の平均時間（秒）"""
+    index = CacheIndex(os.path.join(directory, "cache_index.db"))
+    fill_index(index, entries)
+    
+    start = time.perf_counter()
+    for i in range(entries, entries + inserts):
+        index.put(key_of(i), f"テキスト{i}", i % 50, f"temp/cache/{key_of(i)}.wav", 40000)
+    insert_time = (time.perf_counter() - start) / inserts
+    
+    rng = random.Random(1)
+    keys = [key_of(rng.randrange(entries)) for _ in range(lookups)]
+    start = time.perf_counter()
+    for key in keys:
+        index.get(key)
+    lookup_time = (time.perf_counter() - start) / lookups
+    
+    start = time.perf_counter()
+    for key in keys:
+        index.touch(key)
+    index.flush()
+    touch_time = (time.perf_counter() - start) / lookups
+    
+    index.close()
+    return insert_time, lookup_time, touch_time
+
+
+def bench_json(directory, entries, inserts, lookups):
+    """以前の方式: (1件の追加, 1件の参照) の平均時間（秒）と起動時の読み込み時間"""
+    path = os.path.join(directory, "cache_info.json")
+    now = datetime.now().isoformat()
+    cache_info = {"files": {
+        key_of(i): {"text": f"テキスト{i}", "speaker_id": i % 50, "path": f"temp/cache/{key_of(i)}.wav",
+                    "created": now, "last_accessed": now}
+        for i in range(entries)
+    }}
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(cache_info, ensure_ascii=False, indent=2))
+    
+    start = time.perf_counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        cache_info = json.load(f)
+    load_time = time.perf_counter() - start
+    
+    # 追加のたびに全体を書き直す
+    start = time.perf_counter()
+    for i in range(entries, entries + inserts):
+        cache_info["files"][key_of(i)] = {"text": f"テキスト{i}", "speaker_id": i % 50,
+                                          "path": f"temp/cache/{key_of(i)}.wav",
+                                          "created": now, "last_accessed": now}
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(cache_info, ensure_ascii=False, indent=2))
+    insert_time = (time.perf_counter() - start) / inserts
+    
+    rng = random.Random(1)
+    keys = [key_of(rng.randrange(entries)) for _ in range(lookups)]
+    start = time.perf_counter()
+    for key in keys:
+        cache_info["files"].get(key)
+    lookup_time = (time.perf_counter() - start) / lookups
+    
+    return insert_time, lookup_time, load_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="キャッシュ索引のベンチマーク")
+    parser.add_argument("--entries", type=int, default=100000, help="登録済みのエントリ数")
+    parser.add_argument("--inserts", type=int, default=2000, help="SQLiteで計測する追加の回数")
+    parser.add_argument("--lookups", type=int, default=20000, help="計測する参照の回数")
+    parser.add_argument("--json-inserts", type=int, default=5, help="JSONで計測する追加の回数")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"登録済み {args.entries:,} 件")
+        insert_time, lookup_time, touch_time = bench_sqlite(directory, args.entries, args.inserts, args.lookups)
+        db_size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"  SQLite: 追加 {insert_time * 1e6:10.1f} µs/件, 参照 {lookup_time * 1e6:8.1f} µs/件, "
+              f"アクセス日時の更新 {touch_time * 1e6:6.1f} µs/件, ファイル {db_size / 1024 / 1024:.1f} MB")
+        
+        json_insert, json_lookup, json_load = bench_json(directory, args.entries, args.json_inserts, args.lookups)
+        json_size = os.path.getsize(os.path.join(directory, "cache_info.json"))
+        print(f"  JSON:   追加 {json_insert * 1e6:10.1f} µs/件, 参照 {json_lookup * 1e6:8.1f} µs/件, "
+              f"起動時の読み込み {json_load * 1000:.0f} ms, ファイル {json_size / 1024 / 1024:.1f} MB")
+        print(f"  追加の高速化率: {json_insert / insert_time:.0f}倍")
+
+
+if __name__ == "__main__":
+    main()
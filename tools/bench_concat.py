@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WAV結合のベンチマーク
+
+utils.wav_utils によるプロセス内結合と、従来のffmpeg concatによる結合の
+処理時間を比較する。ffmpegがインストールされていない場合はプロセス内結合のみ計測する。
+
+使い方:
+    python tools/bench_concat.py [--segments 6] [--seconds 1.5] [--repeat 20]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+from utils.wav_utils import WavData, concat_wav_files, write_wav
+
+
+def make_clips(directory, segments, seconds, sample_rate=24000):
+    """VOICEVOXの出力に近い 24kHz / 16bit / モノラルのWAVを作成"""
+    paths = []
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    for i in range(segments):
+        samples = (np.sin(2 * np.pi * (220 + 40 * i) * t) * 8000).astype('<i2')
+        path = os.path.join(directory, f"segment_{i}.wav")
+        write_wav(path, WavData(sample_rate, 1, 2, samples.tobytes()))
+        paths.append(path)
+    return paths
+
+
+def bench_in_process(paths, directory, repeat, silence_ms=0, crossfade_ms=0):
+    """プロセス内結合の1回あたりの時間（秒）"""
+    output = os.path.join(directory, "combined_native.wav")
+    start = time.perf_counter()
+    for _ in range(repeat):
+        concat_wav_files(paths, output, silence_ms, crossfade_ms)
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_ffmpeg(paths, directory, repeat):
+    """ffmpeg concat による結合の1回あたりの時間（秒）"""
+    list_file = os.path.join(directory, "filelist.txt")
+    with open(list_file, "w") as f:
+        for path in paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    
+    output = os.path.join(directory, "combined_ffmpeg.wav")
+    start = time.perf_counter()
+    for _ in range(repeat):
+        subprocess.run([
+            "ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+            "-i", list_file, "-c", "copy", output
+        ], check=True, stderr=subprocess.PIPE)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WAV結合のベンチマーク")
+    parser.add_argument("--segments", type=int, default=6, help="結合するセグメント数")
+    parser.add_argument("--seconds", type=float, default=1.5, help="1セグメントの長さ（秒）")
+    parser.add_argument("--repeat", type=int, default=20, help="計測の繰り返し回数")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_clips(directory, args.segments, args.seconds)
+        
+        print(f"{args.segments}セグメント x {args.seconds}秒 を {args.repeat}回結合")
+        native = bench_in_process(paths, directory, args.repeat)
+        print(f"  プロセス内結合:               {native * 1000:8.2f} ms/回")
+        silence = bench_in_process(paths, directory, args.repeat, silence_ms=150)
+        print(f"  プロセス内結合 (無音150ms):    {silence * 1000:8.2f} ms/回")
+        crossfade = bench_in_process(paths, directory, args.repeat, crossfade_ms=20)
+        print(f"  プロセス内結合 (クロスフェード): {crossfade * 1000:8.2f} ms/回")
+        
+        if shutil.which("ffmpeg"):
+            ffmpeg = bench_ffmpeg(paths, directory, args.repeat)
+            print(f"  ffmpeg concat:                {ffmpeg * 1000:8.2f} ms/回")
+            print(f"  高速化率: {ffmpeg / native:.1f}倍")
+        else:
+            print("  ffmpegが見つからないため比較をスキップしました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+再生ソースのベンチマーク
+
+VOICEVOXの出力（24kHz / モノラル）をDiscordの送信フォーマット（48kHz / ステレオ）に
+変換してすべてのフレームを読み出すまでの時間とCPU時間を、プロセス内変換（WavAudioSource）と
+ffmpegのプロセス起動で比較する。ffmpegがインストールされていない場合はプロセス内変換のみ計測する。
+
+使い方:
+    python tools/bench_playback.py [--clips 50] [--seconds 3.0]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+try:
+    import resource  # Windowsでは子プロセスのCPU時間を取得できない
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.getcwd())
+from utils.audio_source import WavAudioSource, SAMPLING_RATE, CHANNELS
+from utils.wav_utils import WavData, write_wav
+
+
+def make_clips(directory, clips, seconds, sample_rate=24000):
+    """VOICEVOXの出力に近い 24kHz / 16bit / モノラルのWAVを作成"""
+    paths = []
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    for i in range(clips):
+        samples = (np.sin(2 * np.pi * (220 + 10 * i) * t) * 8000).astype('<i2')
+        path = os.path.join(directory, f"clip_{i}.wav")
+        write_wav(path, WavData(sample_rate, 1, 2, samples.tobytes()))
+        paths.append(path)
+    return paths
+
+
+def children_cpu():
+    """終了した子プロセスのCPU時間の合計（秒）"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def bench_native(paths):
+    """プロセス内変換: (経過時間, CPU時間, フレーム数)"""
+    frames = 0
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for path in paths:
+        source = WavAudioSource.from_file(path)
+        while source.read():
+            frames += 1
+        source.cleanup()
+    return time.perf_counter() - wall, time.process_time() - cpu, frames
+
+
+def bench_ffmpeg(paths):
+    """再生ごとにffmpegを起動（FFmpegPCMAudioと同じ出力形式）: (経過時間, CPU時間, フレーム数)"""
+    frames = 0
+    wall = time.perf_counter()
+    cpu = time.process_time() + children_cpu()
+    for path in paths:
+        result = subprocess.run([
+            "ffmpeg", "-loglevel", "error", "-i", path, "-vn",
+            "-f", "s16le", "-ar", str(SAMPLING_RATE), "-ac", str(CHANNELS), "pipe:1"
+        ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        frames += -(-len(result.stdout) // 3840)
+    return time.perf_counter() - wall, time.process_time() + children_cpu() - cpu, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="再生ソースのベンチマーク")
+    parser.add_argument("--clips", type=int, default=50, help="再生するクリップ数")
+    parser.add_argument("--seconds", type=float, default=3.0, help="1クリップの長さ（秒）")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_clips(directory, args.clips, args.seconds)
+        
+        print(f"{args.clips}クリップ x {args.seconds}秒 (24kHz モノラル → 48kHz ステレオ)")
+        wall, cpu, frames = bench_native(paths)
+        print(f"  プロセス内変換: {wall / args.clips * 1000:8.2f} ms/クリップ, "
+              f"CPU {cpu / args.clips * 1000:8.2f} ms/クリップ, プロセス起動 0回, {frames}フレーム")
+        
+        if shutil.which("ffmpeg"):
+            ffmpeg_wall, ffmpeg_cpu, ffmpeg_frames = bench_ffmpeg(paths)
+            print(f"  ffmpeg:         {ffmpeg_wall / args.clips * 1000:8.2f} ms/クリップ, "
+                  f"CPU {ffmpeg_cpu / args.clips * 1000:8.2f} ms/クリップ, "
+                  f"プロセス起動 {args.clips}回, {ffmpeg_frames}フレーム")
+            print(f"  高速化率: 経過時間 {ffmpeg_wall / wall:.1f}倍 / CPU時間 {ffmpeg_cpu / max(cpu, 1e-9):.1f}倍")
+        else:
+            print("  ffmpegが見つからないため比較をスキップしました")
+
+
+if __name__ == "__main__":
+    main()
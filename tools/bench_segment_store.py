@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+キャッシュの保存方式のベンチマーク
+
+同じ数の音声クリップを、1件ごとのファイル（files 方式）とセグメントファイルへの追記
+（packed 方式、SegmentStore）で保存し、1件の書き込み・読み込みにかかる時間、
+ファイル数、ディレクトリの走査時間を比較する。packed 方式では半分を削除した後の
+コンパクションにかかる時間と回収したサイズも計測する。
+
+使い方:
+    python tools/bench_segment_store.py [--clips 20000] [--clip-kb 60] [--reads 20000] [--segment-mb 64]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+from utils.segment_store import SegmentStore
+
+
+def clip_name(i):
+    return f"{i:064x}.wav"
+
+
+def bench_files(directory, payload, clips, reads):
+    """(1件の書き込み, 1件の読み込み, ディレクトリの走査) の時間（秒）とファイル数"""
+    start = time.perf_counter()
+    for i in range(clips):
+        with open(os.path.join(directory, clip_name(i)), 'wb') as f:
+            f.write(payload)
+    write_time = (time.perf_counter() - start) / clips
+    
+    rng = random.Random(1)
+    names = [clip_name(rng.randrange(clips)) for _ in range(reads)]
+    start = time.perf_counter()
+    for name in names:
+        with open(os.path.join(directory, name), 'rb') as f:
+            f.read()
+    read_time = (time.perf_counter() - start) / reads
+    
+    start = time.perf_counter()
+    files = len(os.listdir(directory))
+    scan_time = time.perf_counter() - start
+    return write_time, read_time, scan_time, files
+
+
+def bench_packed(directory, payload, clips, reads, segment_bytes):
+    """(1件の書き込み, 1件の読み込み, ディレクトリの走査, コンパクション) の時間（秒）とファイル数・回収サイズ"""
+    store = SegmentStore(directory, segment_bytes=segment_bytes)
+    start = time.perf_counter()
+    for i in range(clips):
+        store.put(clip_name(i), payload)
+    write_time = (time.perf_counter() - start) / clips
+    
+    rng = random.Random(1)
+    names = [clip_name(rng.randrange(clips)) for _ in range(reads)]
+    start = time.perf_counter()
+    for name in names:
+        store.get(name)
+    read_time = (time.perf_counter() - start) / reads
+    
+    start = time.perf_counter()
+    files = len(os.listdir(directory))
+    scan_time = time.perf_counter() - start
+    
+    # 半分を削除してから詰め直す
+    store.delete(clip_name(i) for i in range(0, clips, 2))
+    start = time.perf_counter()
+    reclaimed = store.compact()
+    compact_time = time.perf_counter() - start
+    
+    store.close()
+    return write_time, read_time, scan_time, files, compact_time, reclaimed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="キャッシュの保存方式のベンチマーク")
+    parser.add_argument("--clips", type=int, default=20000, help="保存するクリップ数")
+    parser.add_argument("--clip-kb", type=int, default=60, help="1クリップのサイズ（KB）")
+    parser.add_argument("--reads", type=int, default=20000, help="計測する読み込みの回数")
+    parser.add_argument("--segment-mb", type=int, default=64, help="1つのセグメントファイルの大きさ（MB）")
+    args = parser.parse_args()
+    
+    payload = os.urandom(args.clip_kb * 1024)
+    total_mb = args.clips * args.clip_kb / 1024
+    print(f"{args.clips:,}クリップ x {args.clip_kb} KB (合計 {total_mb:.0f} MB)")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        files_dir = os.path.join(directory, "files")
+        os.makedirs(files_dir)
+        write_time, read_time, scan_time, files = bench_files(files_dir, payload, args.clips, args.reads)
+        print(f"  files:  書き込み {write_time * 1e6:8.1f} µs/件, 読み込み {read_time * 1e6:6.1f} µs/件, "
+              f"ファイル {files:,} 個 (走査 {scan_time * 1000:.1f} ms)")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        write_time, read_time, scan_time, files, compact_time, reclaimed = bench_packed(
+            directory, payload, args.clips, args.reads, args.segment_mb * 1024 * 1024
+        )
+        print(f"  packed: 書き込み {write_time * 1e6:8.1f} µs/件, 読み込み {read_time * 1e6:6.1f} µs/件, "
+              f"ファイル {files:,} 個 (走査 {scan_time * 1000:.1f} ms)")
+        print(f"  半分を削除した後のコンパクション: {compact_time:.2f} 秒, {reclaimed / 1024 / 1024:.0f} MB 回収")
+
+
+if __name__ == "__main__":
+    main()
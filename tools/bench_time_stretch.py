@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+再生時の時間伸縮のベンチマーク
+
+キャッシュ済みのVOICEVOXの出力（24kHz / モノラル）を、音程を変えずに速めながら
+Discordの送信フォーマット（48kHz / ステレオ）に変換するときのCPU時間を、
+音声1秒あたりで計測する。倍率 1.0 は時間伸縮を行わない通常の変換。
+
+使い方:
+    python tools/bench_time_stretch.py [--clips 50] [--seconds 3.0] [--speeds 1.0,1.25,1.5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+from utils.audio_source import WavAudioSource
+from utils.wav_utils import WavData, write_wav
+
+
+def make_clips(directory, clips, seconds, sample_rate=24000):
+    """VOICEVOXの出力に近い 24kHz / 16bit / モノラルのWAV（倍音を含む声に近い波形）を作成"""
+    paths = []
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    for i in range(clips):
+        base = 120 + 5 * i
+        # 音程が揺れる倍音の多い波形
+        phase = 2 * np.pi * np.cumsum(base * (1 + 0.1 * np.sin(2 * np.pi * 3 * t))) / sample_rate
+        wave = sum(np.sin(phase * n) / n for n in range(1, 8))
+        samples = (wave * 6000).astype('<i2')
+        path = os.path.join(directory, f"clip_{i}.wav")
+        write_wav(path, WavData(sample_rate, 1, 2, samples.tobytes()))
+        paths.append(path)
+    return paths
+
+
+def bench(paths, speed):
+    """(経過時間, CPU時間, 再生時間の合計) を返す"""
+    played = 0.0
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for path in paths:
+        source = WavAudioSource.from_file(path, speed)
+        played += source.duration
+        source.cleanup()
+    return time.perf_counter() - wall, time.process_time() - cpu, played
+
+
+def main():
+    parser = argparse.ArgumentParser(description="再生時の時間伸縮のベンチマーク")
+    parser.add_argument("--clips", type=int, default=50, help="変換するクリップ数")
+    parser.add_argument("--seconds", type=float, default=3.0, help="1クリップの長さ（秒）")
+    parser.add_argument("--speeds", default="1.0,1.25,1.5", help="計測する倍率（カンマ区切り）")
+    args = parser.parse_args()
+    
+    speeds = [float(speed) for speed in args.speeds.split(',')]
+    source_seconds = args.clips * args.seconds
+    
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_clips(directory, args.clips, args.seconds)
+        
+        print(f"{args.clips}クリップ x {args.seconds}秒 (24kHz モノラル → 48kHz ステレオ)")
+        baseline = None
+        for speed in speeds:
+            wall, cpu, played = bench(paths, speed)
+            cpu_per_second = cpu / source_seconds * 1000
+            line = (f"  x{speed:<5g} 再生時間 {played:7.1f}秒, 経過時間 {wall / args.clips * 1000:7.2f} ms/クリップ, "
+                    f"CPU {cpu_per_second:6.2f} ms/元の音声1秒")
+            if speed == 1.0:
+                baseline = cpu_per_second
+            elif baseline:
+                line += f" (時間伸縮による増加 {cpu_per_second - baseline:+.2f} ms)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+読み上げパイプラインの負荷試験
+
+tools/stub_engine.py のスタブエンジンをプロセス内で起動し、架空のサーバー・チャンネル・
+メッセージで bot.process_auto_reading と AudioControl を動かす。Discordへの接続や
+ffmpegは使わず、ボイスクライアントは再生時間を模擬するだけのものに置き換える。
+
+作業ディレクトリは一時ディレクトリに作るため、リポジトリのキャッシュは汚さない。
+最後に処理件数/秒、投稿から再生開始までの時間（p50/p95/p99）、
+1メッセージあたりのエンジン呼び出し数、合成待ちで再生が止まった回数を表示する。
+
+使い方:
+    python tools/load_test.py [--guilds 10] [--messages 30] [--rate 1.0] [--engines 1]
+                              [--latency 0.2] [--jitter 0.05] [--error-rate 0.0]
+                              [--repeat-ratio 0.2] [--long-ratio 0.1] [--burst-ratio 0.2]
+                              [--playback-scale 0.0] [--cache-backend files|packed] [--cache-max-mb N]
+"""
+
+import argparse
+import asyncio
+import configparser
+import datetime
+import logging
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from collections import deque
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "tools"))
+
+import discord
+from stub_engine import StubEngine
+from utils.wav_utils import read_wav
+
+# 同じ投稿者が続けて送る短いメッセージ（連続投稿のまとめの効果を見るため）
+BURST_WORDS = ["うん", "それな", "わかる", "たしかに", "えー", "まじか", "なるほど", "あとで見る"]
+
+# 繰り返し投稿される定型文（キャッシュ・相乗りの効果を見るため）
+COMMON_PHRASES = [
+    "おはようございます",
+    "こんにちは",
+    "お疲れさまです",
+    "よろしくお願いします",
+    "ありがとうございます",
+    "了解です",
+    "おやすみなさい",
+    "草",
+]
+
+
+class FakeAudioSource:
+    """discord.FFmpegPCMAudio の代わり（プロセスを起動せずパスだけ保持する）"""
+    
+    def __init__(self, path, **kwargs):
+        self.path = path
+    
+    def cleanup(self):
+        pass
+
+
+class FakeVoiceClient:
+    """再生時間を模擬するだけのボイスクライアント"""
+    
+    def __init__(self, playback_scale):
+        self.playback_scale = playback_scale
+        self.playing = False
+        self.connected = True
+        self.played = 0
+    
+    def is_connected(self):
+        return self.connected
+    
+    def is_playing(self):
+        return self.playing
+    
+    def is_paused(self):
+        return False
+    
+    def play(self, source, after=None):
+        self.playing = True
+        self.played += 1
+        duration = 0.0
+        if self.playback_scale > 0 and hasattr(source, "duration"):
+            # プロセス内のソースは時間伸縮後の再生時間を持っている
+            duration = source.duration
+        elif self.playback_scale > 0:
+            try:
+                wav = read_wav(source.path)
+                duration = len(wav.pcm) / (wav.sample_rate * wav.channels * wav.sample_width)
+            except (OSError, ValueError):
+                pass
+        
+        def finished():
+            self.playing = False
+            if after:
+                after(None)
+        
+        asyncio.get_running_loop().call_later(duration * self.playback_scale, finished)
+    
+    def stop(self):
+        self.playing = False
+    
+    async def disconnect(self, force=False):
+        self.connected = False
+
+
+class FakeReadChannels:
+    """setup_command の代わり（すべてのチャンネルを読み上げ対象にする）"""
+    
+    def is_read_channel(self, guild_id, channel_id):
+        return True
+
+
+class FakeSpeakerSettings:
+    """set_speaker_command の代わり（ユーザーごとに話者を固定で割り当てる）"""
+    
+    def get_default_speaker(self, user_id, server_id=None):
+        return user_id % 4
+
+
+class FakeBot:
+    """process_auto_reading と AudioControl が参照する属性だけを持つBot"""
+    
+    def __init__(self, loop):
+        self.loop = loop
+        self.user = object()
+        self.setup_command = FakeReadChannels()
+        self.set_speaker_command = FakeSpeakerSettings()
+        self.cogs = {}
+    
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+
+class FakeObject:
+    """id と name だけを持つサーバー・チャンネル・ユーザー"""
+    
+    def __init__(self, object_id, name=None):
+        self.id = object_id
+        self.name = name or str(object_id)
+
+
+class FakeMessage:
+    """自動読み上げに必要な属性だけを持つメッセージ"""
+    
+    def __init__(self, guild, channel, author, content):
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+
+
+def free_port():
+    """空いているTCPポートを取得"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_text(rng, guild_index, message_index, repeat_ratio, long_ratio):
+    """負荷試験用のメッセージ本文を作成"""
+    roll = rng.random()
+    if roll < repeat_ratio:
+        return rng.choice(COMMON_PHRASES)
+    if roll < repeat_ratio + long_ratio:
+        # 定型の挨拶を含む長文（文単位のキャッシュが効く部分と効かない部分が混ざる）
+        sentences = rng.randint(4, 8)
+        return rng.choice(COMMON_PHRASES) + "。" + "".join(
+            f"これはサーバー{guild_index}の{message_index}件目の長いメッセージの{i + 1}文目です。"
+            for i in range(sentences)
+        ) + rng.choice(COMMON_PHRASES) + "。"
+    return f"サーバー{guild_index}の{message_index}件目のメッセージです"
+
+
+async def send_messages(bot_module, guild_index, args, rng, tasks):
+    """1つのサーバーでポアソン過程に従ってメッセージを投稿する"""
+    guild = FakeObject(guild_index, f"guild-{guild_index}")
+    channel = FakeObject(guild_index * 1000, f"channel-{guild_index}")
+    for message_index in range(args.messages):
+        author = FakeObject(rng.randint(1, args.users), "user")
+        text = make_text(rng, guild_index, message_index, args.repeat_ratio, args.long_ratio)
+        message = FakeMessage(guild, channel, author, text)
+        # on_message と同じく、メッセージごとに独立したタスクで処理する
+        tasks.append(asyncio.create_task(bot_module.process_auto_reading(message)))
+        
+        # 同じ投稿者が短い一言を立て続けに送る
+        if rng.random() < args.burst_ratio:
+            for _ in range(rng.randint(1, 3)):
+                await asyncio.sleep(rng.uniform(0.1, 0.4))
+                message = FakeMessage(guild, channel, author, rng.choice(BURST_WORDS))
+                tasks.append(asyncio.create_task(bot_module.process_auto_reading(message)))
+        
+        await asyncio.sleep(rng.expovariate(args.rate))
+
+
+async def wait_until_idle(audio_control, coalescer, guild_ids, timeout):
+    """まとめ待ちのメッセージがなくなり、すべてのサーバーのキューが空になり再生が終わるまで待つ"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not coalescer.pending and all(audio_control.is_idle(guild_id) for guild_id in guild_ids):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+def override_cache_settings(path, args):
+    """作業ディレクトリにコピーした設定ファイルのキャッシュ設定を上書きする"""
+    if args.cache_backend is None and args.cache_max_mb is None:
+        return
+    config = configparser.ConfigParser()
+    config.read(path, encoding='utf-8')
+    if args.cache_backend is not None:
+        config['DEFAULT']['cache_backend'] = args.cache_backend
+    if args.cache_max_mb is not None:
+        config['DEFAULT']['cache_max_size_mb'] = str(args.cache_max_mb)
+    with open(path, 'w', encoding='utf-8') as f:
+        config.write(f)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    
+    # スタブエンジンを起動
+    engines = []
+    runners = []
+    urls = []
+    for i in range(args.engines):
+        engine = StubEngine(args.latency, args.jitter, args.error_rate, seed=args.seed + i)
+        port = free_port()
+        runners.append(await engine.start(port=port))
+        engines.append(engine)
+        urls.append(f"http://127.0.0.1:{port}")
+    os.environ["VOICEVOX_API_URL"] = ",".join(urls)
+    
+    # 設定を読み込むシングルトンは作業ディレクトリとURLを決めた後でインポートする
+    discord.FFmpegPCMAudio = FakeAudioSource
+    import bot as bot_module
+    from cogs.audio_control import AudioControl
+    from utils.voicevox_api import voicevox_api
+    from utils.synthesis import synthesis_service
+    
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.CRITICAL)
+    
+    fake_bot = FakeBot(asyncio.get_running_loop())
+    audio_control = AudioControl(fake_bot)
+    audio_control.recent_latencies = deque()  # 全件を集計するため上限なしにする
+    if args.speed_control:
+        audio_control.speed_control = args.speed_control
+    fake_bot.cogs['AudioControl'] = audio_control
+    bot_module.bot = fake_bot
+    
+    guild_ids = list(range(1, args.guilds + 1))
+    for guild_id in guild_ids:
+        audio_control.attach_voice_client(guild_id, FakeVoiceClient(args.playback_scale))
+    
+    await voicevox_api.start()
+    try:
+        tasks = []
+        start_time = time.monotonic()
+        await asyncio.gather(*[
+            send_messages(bot_module, guild_id, args, random.Random(rng.random()), tasks)
+            for guild_id in guild_ids
+        ])
+        await asyncio.gather(*tasks, return_exceptions=True)
+        idle = await wait_until_idle(audio_control, bot_module.burst_coalescer, guild_ids, args.timeout)
+        elapsed = time.monotonic() - start_time
+    finally:
+        for guild_id in guild_ids:
+            await audio_control.disconnect_from_voice(guild_id)
+        await voicevox_api.close()
+        for runner in runners:
+            await runner.cleanup()
+    
+    # 集計
+    sent = len(tasks)
+    latencies = np.array(audio_control.recent_latencies) if audio_control.recent_latencies else np.zeros(1)
+    played = len(audio_control.recent_latencies)
+    engine_calls = sum(engine.stats["synthesis"] for engine in engines)
+    engine_errors = sum(engine.stats["errors"] for engine in engines)
+    admission = [audio_control.get_admission_stats(guild_id) for guild_id in guild_ids]
+    synthesis = synthesis_service.get_stats()
+    pipeline = audio_control.get_pipeline_stats()
+    burst = bot_module.burst_coalescer.get_stats()
+    speed = audio_control.get_speed_stats()
+    trim = synthesis_service.cache.get_trim_stats()
+    tiers = synthesis_service.cache.get_tier_stats()
+    
+    print(f"サーバー {args.guilds} x メッセージ {args.messages} "
+          f"(各サーバー {args.rate}件/秒, エンジン {args.engines}台, 遅延 {args.latency}秒)")
+    if not idle:
+        print(f"  警告: {args.timeout}秒以内にすべての再生が終わりませんでした")
+    print(f"  経過時間:             {elapsed:8.2f} 秒")
+    print(f"  投稿 / 再生:          {sent:8d} / {played}")
+    print(f"  処理件数:             {played / elapsed:8.2f} 件/秒")
+    print(f"  投稿から再生開始まで: p50 {np.percentile(latencies, 50) * 1000:8.1f} ms / "
+          f"p95 {np.percentile(latencies, 95) * 1000:8.1f} ms / p99 {np.percentile(latencies, 99) * 1000:8.1f} ms")
+    print(f"  エンジン呼び出し:     {engine_calls:8d} 回 ({engine_calls / sent:.2f} 回/メッセージ, エラー {engine_errors})")
+    print(f"  合成待ちで停止:       {pipeline['stalls']:8d} 回 ({pipeline['stall_ratio']:.1f}%, 合計 {pipeline['stall_time']:.2f} 秒)")
+    print(f"  連続投稿のまとめ:     {burst['engine_calls_saved']:8d} 回分の合成を節約 "
+          f"(待ち時間 平均 {burst['avg_delay'] * 1000:.0f} ms / 最大 {burst['max_delay'] * 1000:.0f} ms)")
+    print(f"  話速の段階 ({audio_control.speed_control}):  " +
+          " / ".join(f"x{scale:g} {count}" for scale, count in sorted(speed.items())))
+    print(f"  無音の除去:           {trim['files']:8d} 件 (平均 {trim['avg_saved_seconds'] * 1000:.0f} ms短縮, "
+          f"{trim['saved_bytes'] / 1024:.0f} KB削減)")
+    print(f"  キャッシュヒット:     {synthesis['cache_hits']:8d} / 相乗り {synthesis['coalesced']}")
+    print(f"  長文の文単位ヒット:   {synthesis['sentence_hits']:8d} / {synthesis['sentences']} 文 "
+          f"({synthesis['sentence_hit_ratio']:.1f}%)")
+    print(f"  階層別ヒット率:       メモリ {tiers['memory_hit_ratio']:.1f}% / ディスク {tiers['disk_hit_ratio']:.1f}% "
+          f"(再生: メモリ {audio_control.playback_stats['memory']} / Opus {audio_control.playback_stats['opus']} / "
+          f"変換 {audio_control.playback_stats['native']})")
+    cache = synthesis_service.cache.get_cache_stats()
+    print(f"  キャッシュ ({cache['backend']}):     {cache['entries']:8d} 件 / {cache['bytes'] / 1024:.0f} KB "
+          f"(容量超過で削除 {cache['evicted']} 件)")
+    if cache['segments']:
+        segments = cache['segments']
+        print(f"  セグメント:           {segments['segments']:8d} ファイル / {segments['disk_bytes'] / 1024:.0f} KB "
+              f"(未回収 {segments['dead_bytes'] / 1024:.0f} KB, 回収 {segments['reclaimed_bytes'] / 1024:.0f} KB, "
+              f"読み込み {segments['reads']} 回)")
+    print(f"  破棄 (古い順 / 新しい順 / 期限切れ): "
+          f"{sum(a['dropped_oldest'] for a in admission)} / "
+          f"{sum(a['dropped_newest'] for a in admission)} / "
+          f"{sum(a['expired'] for a in admission)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="読み上げパイプラインの負荷試験")
+    parser.add_argument("--guilds", type=int, default=10, help="サーバー数")
+    parser.add_argument("--messages", type=int, default=30, help="サーバーごとのメッセージ数")
+    parser.add_argument("--rate", type=float, default=1.0, help="サーバーごとの投稿頻度（件/秒）")
+    parser.add_argument("--users", type=int, default=5, help="サーバーごとの投稿ユーザー数")
+    parser.add_argument("--engines", type=int, default=1, help="スタブエンジンの台数")
+    parser.add_argument("--latency", type=float, default=0.2, help="エンジンの平均応答時間（秒）")
+    parser.add_argument("--jitter", type=float, default=0.05, help="エンジンの応答時間のゆらぎ（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="エンジンがエラーを返す割合")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="定型文を投稿する割合")
+    parser.add_argument("--burst-ratio", type=float, default=0.2,
+                        help="同じ投稿者が短い一言を立て続けに送る割合")
+    parser.add_argument("--long-ratio", type=float, default=0.1, help="長文を投稿する割合")
+    parser.add_argument("--playback-scale", type=float, default=0.0,
+                        help="再生時間の倍率（0で即時に再生完了、1で実時間）")
+    parser.add_argument("--speed-control", choices=["engine", "playback", "off"], default=None,
+                        help="話速を変える方法（省略時は settings.ini の設定）")
+    parser.add_argument("--cache-backend", choices=["files", "packed"], default=None,
+                        help="キャッシュの保存方式（省略時は settings.ini の設定）")
+    parser.add_argument("--cache-max-mb", type=int, default=None,
+                        help="キャッシュの容量の上限（MB、省略時は settings.ini の設定）")
+    parser.add_argument("--timeout", type=float, default=300.0, help="再生完了を待つ最大時間（秒）")
+    parser.add_argument("--seed", type=int, default=1, help="乱数のシード")
+    parser.add_argument("--verbose", action="store_true", help="ボットのログを表示する")
+    args = parser.parse_args()
+    
+    # キャッシュや一時ファイルは使い捨ての作業ディレクトリに作る
+    workdir = tempfile.mkdtemp(prefix="voicevox_load_test_")
+    try:
+        shutil.copytree(os.path.join(REPO_ROOT, "config"), os.path.join(workdir, "config"))
+        override_cache_settings(os.path.join(workdir, "config", "settings.ini"), args)
+        os.makedirs(os.path.join(workdir, "temp", "cache"), exist_ok=True)
+        os.chdir(workdir)
+        asyncio.run(run(args))
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+テキスト正規化によるキャッシュヒット率の比較
+
+メッセージのログを先頭から順に再生し、キャッシュキーを生のテキストから作る場合と
+正規化したテキストから作る場合のヒット率を比較する。
+ログには1行1メッセージのテキストファイルか、ボットのログファイル（「自動読み上げ: "..."」の行）を指定できる。
+ログを指定しない場合は、表記ゆれを含む合成メッセージを使う。
+
+使い方:
+    python tools/replay_normalization.py [ログファイル ...] [--cache-entries 0] [--case-fold]
+    python tools/replay_normalization.py --synthetic 20000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+from collections import OrderedDict
+
+sys.path.insert(0, os.getcwd())
+from utils.text_normalizer import TextNormalizer
+
+# ボットのログの読み上げ行
+LOG_LINE = re.compile(r'(?:自動読み上げ|テキスト読み上げ): "(.*)" \(話者ID: (\d+)')
+
+# 合成メッセージの元になる定型文
+PHRASES = [
+    "おはよう", "おはようございます", "こんにちは", "お疲れさまです", "ありがとう", "了解",
+    "おやすみなさい", "草", "www", "OK", "いってきます", "ただいま", "おかえり", "なるほど",
+    "それな", "マジで", "GG", "nice", "すごい", "よろしくお願いします"
+]
+
+
+def load_messages(paths):
+    """ログファイルから (テキスト, 話者ID) のリストを読み込む"""
+    messages = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                match = LOG_LINE.search(line)
+                if match:
+                    messages.append((match.group(1), int(match.group(2))))
+                elif line.strip():
+                    messages.append((line, 1))
+    return messages
+
+
+def to_fullwidth(text):
+    """英数字を全角にする"""
+    return "".join(chr(ord(c) + 0xFEE0) if '!' <= c <= '~' else c for c in text)
+
+
+def make_synthetic(count, seed):
+    """定型文に句読点・空白・全角/半角・大文字/小文字の表記ゆれを加えたメッセージを作る"""
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        if rng.random() < 0.4:
+            # 定型文以外の一度きりのメッセージ
+            messages.append((f"メッセージ{i}です", 1))
+            continue
+        text = rng.choice(PHRASES)
+        text += rng.choice(["", "", "！", "!", "！！", "!!!", "。", "…", "?", "？", "、"])
+        if rng.random() < 0.2:
+            text = to_fullwidth(text)
+        if rng.random() < 0.2:
+            text = rng.choice([" ", "　", "\n"]) + text + rng.choice([" ", "  ", ""])
+        if rng.random() < 0.2:
+            text = text.swapcase()
+        messages.append((text, rng.choice([1, 1, 1, 3])))
+    return messages
+
+
+def replay(messages, key_text, cache_entries):
+    """
+    メッセージを順に再生してキャッシュのヒット数を数える
+    
+    Returns:
+        tuple: (ヒット数, 異なるキャッシュキーの数)
+    """
+    cache = OrderedDict()
+    keys = set()
+    hits = 0
+    for text, speaker_id in messages:
+        key = (key_text(text), speaker_id)
+        keys.add(key)
+        if key in cache:
+            hits += 1
+            cache.move_to_end(key)
+            continue
+        cache[key] = True
+        if cache_entries and len(cache) > cache_entries:
+            cache.popitem(last=False)
+    return hits, len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="テキスト正規化によるキャッシュヒット率の比較")
+    parser.add_argument("logs", nargs="*", help="再生するメッセージのログ（省略時は合成メッセージ）")
+    parser.add_argument("--synthetic", type=int, default=20000, help="合成メッセージの件数")
+    parser.add_argument("--seed", type=int, default=1, help="合成メッセージの乱数シード")
+    parser.add_argument("--cache-entries", type=int, default=0, help="キャッシュの件数上限（0で無制限）")
+    parser.add_argument("--case-fold", action="store_true", help="英字の大文字・小文字を区別しない")
+    args = parser.parse_args()
+    
+    messages = load_messages(args.logs) if args.logs else make_synthetic(args.synthetic, args.seed)
+    if not messages:
+        print("メッセージがありません")
+        return
+    
+    normalizer = TextNormalizer()
+    normalizer.enabled = True
+    normalizer.case_fold = args.case_fold
+    
+    raw_hits, raw_keys = replay(messages, lambda text: text, args.cache_entries)
+    normalized_hits, normalized_keys = replay(messages, normalizer.normalize, args.cache_entries)
+    
+    total = len(messages)
+    source = ", ".join(args.logs) if args.logs else f"合成メッセージ (シード {args.seed})"
+    print(f"{source}: {total:,} 件, キャッシュ上限 {args.cache_entries or '無制限'}")
+    print(f"  生のテキスト:       ヒット {raw_hits:8,} 件 ({raw_hits / total * 100:5.1f}%), キー {raw_keys:,} 種類")
+    print(f"  正規化したテキスト: ヒット {normalized_hits:8,} 件 ({normalized_hits / total * 100:5.1f}%), "
+          f"キー {normalized_keys:,} 種類")
+    print(f"  ヒット率の改善:     {(normalized_hits - raw_hits) / total * 100:+.1f} ポイント "
+          f"(キャッシュミスによる合成 {normalized_hits - raw_hits:,} 回削減)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+負荷試験用のVOICEVOXエンジンのスタブ
+
+実際のエンジンの代わりに /speakers, /audio_query, /synthesis, /initialize_speaker,
+/version を提供し、テキストと話者から決まる音声（正弦波のWAV）を返す。
+応答の遅延・ゆらぎ・エラー率を指定できる。GET /stub/stats でリクエスト数を確認できる。
+
+使い方:
+    python tools/stub_engine.py [--port 50021] [--latency 0.2] [--jitter 0.05] [--error-rate 0.0]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import sys
+
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.getcwd())
+from utils.wav_utils import build_wav
+
+# 話者一覧（実際のエンジンの /speakers と同じ形式）
+SPEAKERS = [
+    {
+        "name": "スタブ話者A",
+        "speaker_uuid": "00000000-0000-0000-0000-00000000000a",
+        "styles": [{"name": "ノーマル", "id": 0}, {"name": "あまあま", "id": 1}],
+        "version": "stub"
+    },
+    {
+        "name": "スタブ話者B",
+        "speaker_uuid": "00000000-0000-0000-0000-00000000000b",
+        "styles": [{"name": "ノーマル", "id": 2}, {"name": "ツンツン", "id": 3}],
+        "version": "stub"
+    },
+]
+
+
+class StubEngine:
+    """スタブエンジンの設定とリクエスト数を保持するクラス"""
+    
+    def __init__(self, latency=0.2, jitter=0.05, error_rate=0.0, seconds_per_char=0.08,
+                 synthesis_ratio=0.8, seed=None):
+        """
+        初期化
+        
+        Args:
+            latency (float): /audio_query と /synthesis を合わせた平均の応答時間（秒）
+            jitter (float): 応答時間のゆらぎ（標準偏差、秒）
+            error_rate (float): HTTP 500 を返す割合（0〜1）
+            seconds_per_char (float): 1文字あたりの音声の長さ（秒）
+            synthesis_ratio (float): 応答時間のうち /synthesis が占める割合
+            seed (int, optional): 乱数のシード
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seconds_per_char = seconds_per_char
+        self.synthesis_ratio = synthesis_ratio
+        self.random = random.Random(seed)
+        
+        self.stats = {
+            "speakers": 0,
+            "audio_query": 0,
+            "synthesis": 0,
+            "initialize_speaker": 0,
+            "errors": 0,
+            "synthesized_seconds": 0.0
+        }
+    
+    async def _delay(self, ratio):
+        delay = self.latency * ratio
+        if self.jitter:
+            delay += self.random.gauss(0, self.jitter * ratio)
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _should_fail(self):
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return True
+        return False
+    
+    def make_query(self, text, speaker_id):
+        """/audio_query の応答（実際のエンジンと同じキーを持つ）"""
+        return {
+            "accent_phrases": [],
+            "speedScale": 1.0,
+            "pitchScale": 0.0,
+            "intonationScale": 1.0,
+            "volumeScale": 1.0,
+            "prePhonemeLength": 0.1,
+            "postPhonemeLength": 0.1,
+            "outputSamplingRate": 24000,
+            "outputStereo": False,
+            "kana": text,
+            # スタブ独自のキー（合成時に音声を決めるために使う）
+            "_text": text,
+            "_speaker": speaker_id
+        }
+    
+    def make_wav(self, query):
+        """クエリから決まる正弦波のWAVを作成する"""
+        text = query.get("_text", "")
+        speaker_id = query.get("_speaker", 0)
+        sample_rate = int(query.get("outputSamplingRate") or 24000)
+        stereo = bool(query.get("outputStereo"))
+        speed = float(query.get("speedScale") or 1.0)
+        
+        seconds = max(0.1, len(text) * self.seconds_per_char / max(speed, 0.1))
+        digest = hashlib.md5(f"{speaker_id}:{text}".encode('utf-8')).digest()
+        frequency = 200 + digest[0] * 2
+        
+        t = np.arange(int(sample_rate * seconds)) / sample_rate
+        samples = (np.sin(2 * np.pi * frequency * t) * 8000).astype('<i2')
+        
+        # 実際のエンジンと同じく前後に無音を付ける
+        pre = int(sample_rate * float(query.get("prePhonemeLength") or 0) / max(speed, 0.1))
+        post = int(sample_rate * float(query.get("postPhonemeLength") or 0) / max(speed, 0.1))
+        samples = np.concatenate([np.zeros(pre, dtype='<i2'), samples, np.zeros(post, dtype='<i2')])
+        self.stats["synthesized_seconds"] += len(samples) / sample_rate
+        if stereo:
+            samples = np.repeat(samples, 2)
+        
+        return build_wav(samples.tobytes(), sample_rate, 2 if stereo else 1, 2)
+    
+    async def handle_speakers(self, request):
+        self.stats["speakers"] += 1
+        return web.json_response(SPEAKERS)
+    
+    async def handle_audio_query(self, request):
+        self.stats["audio_query"] += 1
+        await self._delay(1 - self.synthesis_ratio)
+        if self._should_fail():
+            return web.Response(status=500, text="stub error")
+        text = request.query.get("text", "")
+        speaker_id = int(request.query.get("speaker", 0))
+        return web.json_response(self.make_query(text, speaker_id))
+    
+    async def handle_synthesis(self, request):
+        self.stats["synthesis"] += 1
+        query = await request.json()
+        await self._delay(self.synthesis_ratio)
+        if self._should_fail():
+            return web.Response(status=500, text="stub error")
+        return web.Response(body=self.make_wav(query), content_type="audio/wav")
+    
+    async def handle_initialize_speaker(self, request):
+        self.stats["initialize_speaker"] += 1
+        return web.Response(status=204)
+    
+    async def handle_version(self, request):
+        return web.json_response("stub")
+    
+    async def handle_stats(self, request):
+        return web.json_response(self.stats)
+    
+    def create_app(self):
+        """aiohttpのアプリケーションを作成"""
+        app = web.Application()
+        app.router.add_get('/speakers', self.handle_speakers)
+        app.router.add_post('/audio_query', self.handle_audio_query)
+        app.router.add_post('/synthesis', self.handle_synthesis)
+        app.router.add_post('/initialize_speaker', self.handle_initialize_speaker)
+        app.router.add_get('/version', self.handle_version)
+        app.router.add_get('/stub/stats', self.handle_stats)
+        return app
+    
+    async def start(self, host='127.0.0.1', port=50021):
+        """
+        サーバーを開始する（他のスクリプトから組み込んで使う場合）
+        
+        Returns:
+            web.AppRunner: 停止するときは cleanup() を呼ぶ
+        """
+        runner = web.AppRunner(self.create_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VOICEVOXエンジンのスタブ")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス")
+    parser.add_argument("--port", type=int, default=50021, help="待ち受けるポート")
+    parser.add_argument("--latency", type=float, default=0.2, help="平均の応答時間（秒）")
+    parser.add_argument("--jitter", type=float, default=0.05, help="応答時間のゆらぎ（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 を返す割合")
+    parser.add_argument("--seed", type=int, default=None, help="乱数のシード")
+    args = parser.parse_args()
+    
+    engine = StubEngine(args.latency, args.jitter, args.error_rate, seed=args.seed)
+    print(f"スタブエンジンを起動します: http://{args.host}:{args.port} "
+          f"(遅延 {args.latency}秒 ± {args.jitter}秒, エラー率 {args.error_rate})")
+    web.run_app(engine.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
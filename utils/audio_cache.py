@@ -2,16 +2,22 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
+import time
+import ctypes
+import asyncio
 import hashlib
 import logging
 import shutil
-from datetime import datetime
+import sqlite3
 import configparser
-import aiofiles
+import discord
 
+from utils.audio_source import encode_wav_to_opus, encode_wav_to_opus_file
+from utils.wav_utils import trim_wav_file, parse_wav, read_wav
+from utils.cache_index import CacheIndex
+from utils.hot_cache import HotCache
+from utils.segment_store import SegmentStore
 
-MAX_CACHE_SIZE = 1024 * 1024 * 1024  # 1GB
 
 class AudioCache:
     """音声ファイルのキャッシュを管理するクラス"""
@@ -25,121 +31,537 @@ class AudioCache:
         # キャッシュ設定
         self.cache_enabled = config.getboolean('DEFAULT', 'cache_enabled', fallback=True)
         self.cache_dir = config.get('PATHS', 'cache_directory', fallback='temp/cache')
+        # キャッシュの容量の上限（超えたら最後に使われた日時が古いものから削除）と保持日数
+        self.max_cache_bytes = config.getint('DEFAULT', 'cache_max_size_mb', fallback=1024) * 1024 * 1024
+        self.max_age_days = config.getint('DEFAULT', 'cache_max_age_days', fallback=30)
         
-        # キャッシュ情報を保存するJSONファイルのパス
-        self.cache_info_path = os.path.join(self.cache_dir, 'cache_info.json')
+        # よく使われる音声を再生できる形式でメモリに保持する（0で無効）
+        memory_bytes = config.getint('DEFAULT', 'cache_memory_mb', fallback=64) * 1024 * 1024
+        self.hot = HotCache(memory_bytes) if memory_bytes > 0 else None
+        self.tier_stats = {
+            "lookups": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0
+        }
         
-        # ディレクトリの存在確認
-        os.makedirs(self.cache_dir, exist_ok=True)
+        # キャッシュした音声をOpusパケットとしても保存するか（再生時のデコード・エンコードを省略）
+        self.opus_cache = config.getboolean('AUDIO', 'opus_cache', fallback=True)
+        self.opus_available = None  # Opusライブラリが使えるか（初回のエンコード時に判定）
+        self.opus_stats = {
+            "encoded": 0,
+            "failed": 0,
+            "bytes": 0
+        }
+        self._opus_tasks = set()
+        self._write_tasks = set()  # 実行中のキャッシュへの追加（終了時に完了を待つ）
         
-        # キャッシュ情報の読み込み
-        self.cache_info = self._load_cache_info()
+        # キャッシュに追加するときに前後の無音を取り除く（再生間の空白とファイルサイズを減らす）
+        self.trim_silence = config.getboolean('AUDIO', 'trim_silence', fallback=True)
+        self.trim_threshold_db = config.getfloat('AUDIO', 'trim_threshold_db', fallback=-50.0)
+        self.trim_padding_ms = config.getint('AUDIO', 'trim_padding_ms', fallback=50)
+        self.trim_stats = {
+            "files": 0,
+            "original_seconds": 0.0,
+            "trimmed_seconds": 0.0,
+            "original_bytes": 0,
+            "stored_bytes": 0
+        }
         
         # ロガー設定
         self.logger = logging.getLogger("audio_cache")
         
-    def _load_cache_info(self):
-        """キャッシュ情報をJSONから読み込む"""
-        if os.path.exists(self.cache_info_path):
-            try:
-                with open(self.cache_info_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                # 読み込みに失敗した場合は新規作成
-                return {"files": {}}
-        else:
-            return {"files": {}}
-    
-    async def _save_cache_info(self):
-        """キャッシュ情報をJSONに保存する"""
-        try:
-            async with aiofiles.open(self.cache_info_path, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(self.cache_info, ensure_ascii=False, indent=2))
-        except IOError as e:
-            self.logger.error(f"キャッシュ情報の保存に失敗: {e}")
+        # ディレクトリの存在確認
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+        # キャッシュ情報の索引（SQLite）。以前のJSONがあれば初回に移行する
+        self.cache_info_path = os.path.join(self.cache_dir, 'cache_info.json')
+        self.index = CacheIndex(os.path.join(self.cache_dir, 'cache_index.db'))
+        self.index.migrate_from_json(self.cache_info_path)
+        
+        # キャッシュの合計サイズはメモリ上で増減させる（ディレクトリを走査しない）
+        self.total_bytes = self.index.total_size()
+        
+        # 保存方式（files: 1件ごとのファイル / packed: 大きなセグメントファイルへの追記）
+        self.backend = config.get('DEFAULT', 'cache_backend', fallback='files').lower()
+        self.store = None
+        if self.backend == 'packed':
+            self.store = SegmentStore(
+                os.path.join(self.cache_dir, 'segments'),
+                segment_bytes=config.getint('DEFAULT', 'cache_segment_size_mb', fallback=64) * 1024 * 1024,
+                compact_ratio=config.getfloat('DEFAULT', 'cache_compact_ratio', fallback=0.5)
+            )
+        self._compaction_task = None
+        self._compacting = False
+        self.eviction_stats = {
+            "evicted": 0,
+            "evicted_bytes": 0,
+            "expired": 0
+        }
     
-    def generate_cache_key(self, text, speaker_id):
-        """テキストと話者IDからキャッシュキーを生成"""
-        return hashlib.sha256(f"{text}_{speaker_id}".encode()).hexdigest()
+    def generate_cache_key(self, text, speaker_id, params=None):
+        """テキストと話者ID（と合成パラメータ）からキャッシュキーを生成"""
+        key = f"{text}_{speaker_id}"
+        if params:
+            # 話速などが異なる音声は別のキャッシュとして扱う
+            key += "_" + ",".join(f"{name}={value}" for name, value in sorted(params.items()))
+        return hashlib.sha256(key.encode()).hexdigest()
     
     def get_cache_path(self, cache_key):
         """キャッシュキーからファイルパスを取得"""
         if not self.cache_enabled:
             return None
             
-        if cache_key in self.cache_info["files"]:
-            file_path = self.cache_info["files"][cache_key]["path"]
-            if os.path.exists(file_path):
+        self.tier_stats["lookups"] += 1
+        if self.hot is not None:
+            self.hot.record(cache_key)
+            if cache_key in self.hot:
+                # メモリにある音声は索引とファイルの存在を確認しない
+                self.tier_stats["memory_hits"] += 1
+                self.index.touch(cache_key)
+                return os.path.join(self.cache_dir, f"{cache_key}.wav")
+        
+        entry = self.index.get(cache_key)
+        if entry:
+            file_path = entry["path"]
+            if self.exists(file_path):
                 # 最終アクセス日時を更新
-                self.cache_info["files"][cache_key]["last_accessed"] = datetime.now().isoformat()
+                self.tier_stats["disk_hits"] += 1
+                self.index.touch(cache_key)
                 return file_path
             else:
                 # ファイルが存在しない場合はキャッシュ情報から削除
-                del self.cache_info["files"][cache_key]
+                self._delete_entries([(cache_key, file_path, entry["size"])])
         
+        self.tier_stats["misses"] += 1
         return None
     
+    def peek_cache_path(self, cache_key):
+        """キャッシュに追加済みのファイルパスを取得（ヒット率やアクセス日時には反映しない）"""
+        entry = self.index.get(cache_key) if self.cache_enabled else None
+        return entry["path"] if entry else None
+    
+    def _key_for_path(self, audio_path):
+        """キャッシュファイルのパスからキャッシュキーを取得（キャッシュ外のファイルはNone）"""
+        if not audio_path or os.path.dirname(os.path.abspath(audio_path)) != os.path.abspath(self.cache_dir):
+            return None
+        return os.path.splitext(os.path.basename(audio_path))[0]
+    
+    def is_cache_file(self, audio_path):
+        """キャッシュディレクトリ内のファイルかどうか"""
+        return self._key_for_path(audio_path) is not None
+    
+    def _store_name(self, audio_path):
+        """セグメントに格納したデータの名前（キャッシュ外のファイルや files 方式ではNone）"""
+        if self.store is None or not self.is_cache_file(audio_path):
+            return None
+        return os.path.basename(audio_path)
+    
+    def exists(self, audio_path):
+        """音声ファイル（セグメントに格納したキャッシュを含む）があるかどうか"""
+        name = self._store_name(audio_path)
+        if name is not None:
+            return self.store.contains(name)
+        return os.path.exists(audio_path)
+    
+    def read_packed(self, audio_path):
+        """
+        セグメントに格納したキャッシュのデータを取得（コピーせずにメモリマップのスライスを返す）
+        
+        Returns:
+            memoryview: データ、セグメントに格納していないファイルの場合はNone
+        """
+        name = self._store_name(audio_path)
+        return self.store.get(name) if name is not None else None
+    
+    def read_bytes(self, audio_path):
+        """音声ファイルの内容を取得（別スレッドからも呼び出せる）"""
+        data = self.read_packed(audio_path)
+        if data is None:
+            if self._store_name(audio_path) is not None:
+                raise FileNotFoundError(f"セグメントにキャッシュがありません: {audio_path}")
+            with open(audio_path, 'rb') as f:
+                data = f.read()
+        return data
+    
+    def read_wav(self, audio_path):
+        """
+        WAVを読み込んで解析する（別スレッドからも呼び出せる）
+        
+        Raises:
+            ValueError: WAVとして解釈できない場合
+        """
+        if self._store_name(audio_path) is None:
+            return read_wav(audio_path)
+        return parse_wav(self.read_bytes(audio_path))
+    
+    def get_hot(self, audio_path):
+        """
+        メモリに保持している再生用のデータを取得
+        
+        Returns:
+            tuple: (種類, データ)、保持していない場合はNone
+        """
+        key = self._key_for_path(audio_path) if self.hot is not None else None
+        return self.hot.get(key) if key else None
+    
+    def offer_hot(self, audio_path, kind, data, size):
+        """
+        ディスクから読み込んだ再生用のデータをメモリに保持する（よく使われる音声のみ）
+        
+        Args:
+            audio_path (str): キャッシュファイルのパス
+            kind (str): データの種類（"opus": Opusパケットのリスト / "pcm": 48kHz ステレオのPCM）
+            data: 再生用のデータ
+            size (int): データのサイズ（バイト）
+        """
+        key = self._key_for_path(audio_path) if self.hot is not None else None
+        if key and self.index.get(key):
+            if isinstance(data, memoryview):
+                # セグメントのメモリマップを保持し続けないよう、メモリに置く分はコピーする
+                data = data.tobytes()
+            self.hot.offer(key, kind, data, size)
+    
+    def get_tier_stats(self):
+        """メモリとディスクの階層ごとのヒット率を取得"""
+        stats = dict(self.tier_stats)
+        lookups = stats["lookups"]
+        stats["memory_hit_ratio"] = (stats["memory_hits"] / lookups * 100) if lookups else 0
+        stats["disk_hit_ratio"] = (stats["disk_hits"] / lookups * 100) if lookups else 0
+        stats["hit_ratio"] = stats["memory_hit_ratio"] + stats["disk_hit_ratio"]
+        stats["memory"] = self.hot.get_stats() if self.hot is not None else None
+        return stats
+    
     async def add_to_cache(self, cache_key, file_path, text, speaker_id):
         """ファイルをキャッシュに追加"""
         if not self.cache_enabled:
             return
         
+        # 終了時に書き込みの途中で索引を閉じないよう、追加処理をタスクとして管理する
+        # （待機側がキャンセルされても追加は最後まで行う）
+        task = asyncio.create_task(self._add_to_cache(cache_key, file_path, text, speaker_id))
+        self._write_tasks.add(task)
+        task.add_done_callback(self._write_tasks.discard)
+        await asyncio.shield(task)
+    
+    async def _add_to_cache(self, cache_key, file_path, text, speaker_id):
+        """ファイルをキャッシュに追加する処理の本体"""
         # キャッシュディレクトリ内のファイルパス
         cache_filename = f"{cache_key}.wav"
         cache_path = os.path.join(self.cache_dir, cache_filename)
         
+        # ファイルの書き出しとセグメントへの追記は、イベントループを塞がないよう別スレッドで実行
+        loop = asyncio.get_running_loop()
         try:
-            # ファイルをキャッシュディレクトリにコピー
-            if file_path != cache_path and os.path.exists(file_path):
-                shutil.copy2(file_path, cache_path)
-                
-            # キャッシュ情報を更新
-            self.cache_info["files"][cache_key] = {
-                "text": text,
-                "speaker_id": speaker_id,
-                "path": cache_path,
-                "created": datetime.now().isoformat(),
-                "last_accessed": datetime.now().isoformat()
-            }
+            if self.store is not None and not os.path.exists(file_path):
+                # セグメントに格納済みの音声（文ごとのキャッシュなど）は一度ファイルに書き出してから追加する
+                if not await loop.run_in_executor(None, self._write_packed, file_path, cache_path):
+                    self.logger.error(f"キャッシュに追加する音声が見つかりません: {file_path}")
+                    return
+                file_path = cache_path
+            
+            durations = None
+            if self.trim_silence and os.path.exists(file_path):
+                # 前後の無音を取り除いてキャッシュディレクトリに書き出す
+                durations = await self._store_trimmed(file_path, cache_path)
             
-            # キャッシュ情報を保存
-            await self._save_cache_info()
+            # ファイルをキャッシュディレクトリにコピー（packed 方式ではセグメントに追記）
+            copy = durations is None and file_path != cache_path and os.path.exists(file_path)
+            size = await loop.run_in_executor(None, self._write_cache_file, file_path, cache_path, copy)
+                
+            # キャッシュ情報を更新（1件の追加のみを書き込む）
+            previous = self.index.get(cache_key)
+            if previous:
+                self.total_bytes -= previous["size"]
+            if self.hot is not None:
+                self.hot.discard(cache_key)
+            self.index.put(
+                cache_key, text, speaker_id, cache_path, size,
+                duration=round(durations[1], 3) if durations else None,
+                original_duration=round(durations[0], 3) if durations else None
+            )
+            self.total_bytes += size
             self.logger.info(f"ファイルをキャッシュに追加: {cache_path}")
             
-        except (IOError, shutil.Error) as e:
+            # 容量の上限を超えた場合は、最後に使われた日時が古いものから削除
+            self.enforce_budget(keep=cache_key)
+            
+            # 最初の再生を遅らせないよう、Opusパケットはバックグラウンドで作成
+            if self.opus_cache and self.opus_available is not False:
+                task = asyncio.create_task(self._store_opus(cache_key, cache_path))
+                self._opus_tasks.add(task)
+                task.add_done_callback(self._opus_tasks.discard)
+            
+        except (IOError, shutil.Error, sqlite3.Error) as e:
             self.logger.error(f"キャッシュへの追加に失敗: {e}")
     
-    async def cleanup_old_cache(self, max_age_days=30):
-        """古いキャッシュファイルを削除"""
-        if not self.cache_enabled:
+    def _write_packed(self, file_path, cache_path):
+        """セグメントに格納済みの音声をファイルに書き出す（見つからない場合はFalse）"""
+        data = self.read_packed(file_path)
+        if data is None:
+            return False
+        with open(cache_path, 'wb') as f:
+            f.write(data)
+        return True
+    
+    def _write_cache_file(self, file_path, cache_path, copy):
+        """
+        キャッシュファイルを書き出し、packed 方式ではセグメントに追記する（イベントループ外で呼び出す）
+        
+        Returns:
+            int: キャッシュのサイズ（バイト）
+        """
+        if copy:
+            shutil.copy2(file_path, cache_path)
+        if self.store is not None:
+            return self._pack(os.path.basename(cache_path), cache_path)
+        return os.path.getsize(cache_path)
+    
+    def _pack(self, name, file_path):
+        """
+        書き出したキャッシュファイルをセグメントに追記し、ファイルは削除する
+        
+        Returns:
+            int: 格納したデータのサイズ（バイト）
+        """
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        self.store.put(name, data)
+        self._remove_file(file_path)
+        return len(data)
+    
+    async def _store_trimmed(self, file_path, cache_path):
+        """
+        無音を取り除いた音声をキャッシュに書き出す
+        
+        Returns:
+            tuple: (元の再生時間, 除去後の再生時間)、WAVとして扱えない場合はNone
+        """
+        try:
+            original_bytes = os.path.getsize(file_path)
+            loop = asyncio.get_running_loop()
+            durations = await loop.run_in_executor(
+                None, trim_wav_file, file_path, cache_path, self.trim_threshold_db, self.trim_padding_ms
+            )
+        except ValueError as e:
+            self.logger.warning(f"無音の除去に失敗したため、そのままキャッシュします: {e}")
+            return None
+        
+        self.trim_stats["files"] += 1
+        self.trim_stats["original_seconds"] += durations[0]
+        self.trim_stats["trimmed_seconds"] += durations[1]
+        self.trim_stats["original_bytes"] += original_bytes
+        self.trim_stats["stored_bytes"] += os.path.getsize(cache_path)
+        return durations
+    
+    def get_trim_stats(self):
+        """無音の除去の統計を取得"""
+        stats = dict(self.trim_stats)
+        stats["saved_seconds"] = stats["original_seconds"] - stats["trimmed_seconds"]
+        stats["saved_bytes"] = stats["original_bytes"] - stats["stored_bytes"]
+        stats["avg_saved_seconds"] = (stats["saved_seconds"] / stats["files"]) if stats["files"] else 0
+        return stats
+    
+    def _opus_path(self, cache_path):
+        """キャッシュファイルに対応するOpusパケットファイルのパス"""
+        return os.path.splitext(cache_path)[0] + '.opus'
+    
+    async def _store_opus(self, cache_key, cache_path):
+        """キャッシュした音声をOpusパケットにエンコードして保存"""
+        opus_path = self._opus_path(cache_path)
+        packets = None
+        try:
+            loop = asyncio.get_running_loop()
+            if self.store is not None:
+                wav_data = self.read_packed(cache_path)
+                if wav_data is None:
+                    return
+                packets = await loop.run_in_executor(None, encode_wav_to_opus, wav_data)
+                size = len(packets)
+                await loop.run_in_executor(None, self.store.put, os.path.basename(opus_path), packets)
+            else:
+                size = await loop.run_in_executor(None, encode_wav_to_opus_file, cache_path, opus_path)
+        except discord.opus.OpusNotLoaded:
+            self.opus_available = False
+            self.logger.warning("Opusライブラリが読み込めないため、Opusパケットのキャッシュを無効にします")
+            return
+        except (OSError, ValueError, TypeError, ctypes.ArgumentError, sqlite3.Error, discord.opus.OpusError) as e:
+            self.opus_stats["failed"] += 1
+            self.logger.error(f"Opusパケットの作成に失敗: {e}")
+            return
+        
+        self.opus_available = True
+        
+        # エンコード中に削除されたエントリのパケットは残さない
+        entry = self.index.get(cache_key)
+        if entry is None or entry["path"] != cache_path:
+            if packets is None:
+                self._remove_file(opus_path)
+            else:
+                self.store.delete([os.path.basename(opus_path)])
             return
+        
+        # パケットファイルの分もキャッシュのサイズに含める
+        self.index.set_size(cache_key, entry["size"] + size)
+        self.total_bytes += size
+        self.opus_stats["encoded"] += 1
+        self.opus_stats["bytes"] += size
+        self.enforce_budget(keep=cache_key)
+    
+    def get_opus_path(self, audio_path):
+        """
+        キャッシュした音声に対応するOpusパケットファイルのパスを取得
+        
+        Returns:
+            str: パケットファイルのパス、キャッシュ外のファイルや未作成の場合はNone
+        """
+        if not self.opus_cache or not audio_path:
+            return None
+        
+        opus_path = self._opus_path(audio_path)
+        if not self.is_cache_file(opus_path):
+            return None
+        return opus_path if self.exists(opus_path) else None
+    
+    def enforce_budget(self, keep=None):
+        """
+        キャッシュの合計サイズが上限を超えていれば、最後に使われた日時が古い順に削除する
+        
+        Args:
+            keep (str, optional): 削除しないキャッシュキー（追加したばかりのエントリ）
+        
+        Returns:
+            int: 削除したエントリ数
+        """
+        if self.max_cache_bytes <= 0 or self.total_bytes <= self.max_cache_bytes:
+            return 0
+        
+        evicted = 0
+        while self.total_bytes > self.max_cache_bytes:
+            victims = []
+            excess = self.total_bytes - self.max_cache_bytes
+            for key, path, size in self.index.least_recently_used(64):
+                if key == keep:
+                    continue
+                victims.append((key, path, size))
+                excess -= size
+                if excess <= 0:
+                    break
+            if not victims:
+                break
             
-        current_time = datetime.now()
-        keys_to_remove = []
+            self._delete_entries(victims)
+            evicted += len(victims)
+            self.eviction_stats["evicted"] += len(victims)
+            self.eviction_stats["evicted_bytes"] += sum(size for _, _, size in victims)
         
-        for key, info in self.cache_info["files"].items():
-            try:
-                last_accessed = datetime.fromisoformat(info["last_accessed"])
-                age_days = (current_time - last_accessed).days
-                
-                if age_days > max_age_days:
-                    # 古いファイルを削除
-                    if os.path.exists(info["path"]):
-                        os.remove(info["path"])
-                    keys_to_remove.append(key)
-                    self.logger.info(f"古いキャッシュファイルを削除: {info['path']}")
-            except (ValueError, KeyError) as e:
-                self.logger.error(f"キャッシュ情報の解析エラー: {e}")
-                keys_to_remove.append(key)
-        
-        # キャッシュ情報から削除したキーを削除
-        for key in keys_to_remove:
-            del self.cache_info["files"][key]
-        
-        # キャッシュ情報を保存
-        if keys_to_remove:
-            await self._save_cache_info()
-            self.logger.info(f"{len(keys_to_remove)}個の古いキャッシュエントリを削除")
+        if evicted:
+            self.logger.info(f"キャッシュの容量の上限を超えたため {evicted} 件を削除")
+        return evicted
+    
+    def _delete_entries(self, entries):
+        """キャッシュファイル（とOpusパケット）を削除し、索引と合計サイズを更新する"""
+        for key, path, size in entries:
+            if self.hot is not None:
+                self.hot.discard(key)
+            if self.store is not None:
+                self.store.delete([os.path.basename(path), os.path.basename(self._opus_path(path))])
+            else:
+                self._remove_file(path)
+                self._remove_file(self._opus_path(path))
+            self.total_bytes -= size or 0
+        self.index.remove(key for key, _, _ in entries)
+        self.total_bytes = max(0, self.total_bytes)
+        
+        # 削除で使われなくなった領域が増えたセグメントは、バックグラウンドで詰め直す
+        if self.store is not None:
+            self._schedule_compaction()
+    
+    def _schedule_compaction(self):
+        """詰め直す対象のセグメントがあればコンパクションを開始する（実行中の場合は何もしない）"""
+        if self._compacting or not self.store.compaction_candidates():
+            return
+        try:
+            self._compaction_task = asyncio.get_running_loop().create_task(self.compact())
+        except RuntimeError:
+            # イベントループ外では、定期的なクリーンアップの際に詰め直す
+            pass
+    
+    async def compact(self):
+        """
+        使用中の領域が少ないセグメントを詰め直して、削除したキャッシュの領域を回収する
+        
+        Returns:
+            int: 回収したバイト数
+        """
+        if self.store is None or self._compacting:
+            return 0
+        self._compacting = True
+        loop = asyncio.get_running_loop()
+        try:
+            reclaimed = await loop.run_in_executor(None, self.store.compact)
+        except (OSError, sqlite3.Error) as e:
+            self.logger.error(f"セグメントのコンパクションに失敗: {e}")
+            return 0
+        finally:
+            self._compacting = False
+        if reclaimed:
+            self.logger.info(f"セグメントのコンパクションで {reclaimed / 1024 / 1024:.1f} MB を回収")
+        return reclaimed
+    
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.error(f"キャッシュファイルの削除に失敗: {e}")
+    
+    async def cleanup_old_cache(self, max_age_days=None):
+        """最後に使われてから保持日数を過ぎたキャッシュファイルを削除"""
+        if not self.cache_enabled:
+            return
+        
+        if max_age_days is None:
+            max_age_days = self.max_age_days
+        if max_age_days <= 0:
+            return
+        
+        # 最終アクセス日時の索引で古いエントリだけを取り出す
+        expired = self.index.accessed_before(time.time() - max_age_days * 86400)
+        if expired:
+            self._delete_entries(expired)
+            self.eviction_stats["expired"] += len(expired)
+            self.logger.info(f"{len(expired)}個の古いキャッシュエントリを削除")
+    
+    def get_cache_stats(self):
+        """キャッシュの件数・サイズ・削除の統計を取得"""
+        stats = dict(self.eviction_stats)
+        stats["entries"] = self.index.count()
+        stats["bytes"] = self.total_bytes
+        stats["max_bytes"] = self.max_cache_bytes
+        stats["backend"] = self.backend
+        stats["segments"] = self.store.get_stats() if self.store is not None else None
+        return stats
+
+    async def close(self):
+        """まとめて書き込む最終アクセス日時を書き込み、索引とセグメントファイルを閉じる（Bot終了時に呼び出す）"""
+        # 以降のキャッシュの参照・追加を止める
+        self.cache_enabled = False
+        
+        # 実行中のキャッシュへの追加、Opusパケットの作成（追加から開始される）、コンパクションの順に終わるのを待つ
+        for tasks in (self._write_tasks, self._opus_tasks):
+            if tasks:
+                await asyncio.wait(list(tasks))
+        if self._compaction_task is not None and not self._compaction_task.done():
+            await asyncio.wait([self._compaction_task])
+        try:
+            self.index.close()
+        except sqlite3.Error as e:
+            self.logger.error(f"キャッシュの索引を閉じる際にエラーが発生: {e}")
+        if self.store is not None:
+            self.store.close()
+        self.logger.info("キャッシュの索引を閉じました")
 
 # シングルトンインスタンス
 cache_manager = AudioCache()
\ No newline at end of file
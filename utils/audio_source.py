@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+
+import discord
+
+from utils.wav_utils import read_wav, parse_wav, convert_wav
+
+# Discordの音声送信フォーマット（48kHz / 16bit / ステレオ、20msごと）
+SAMPLING_RATE = discord.opus.Encoder.SAMPLING_RATE
+CHANNELS = discord.opus.Encoder.CHANNELS
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+SAMPLES_PER_FRAME = discord.opus.Encoder.SAMPLES_PER_FRAME
+
+# 事前エンコードしたOpusパケットのファイル形式
+# 先頭にマジックナンバー、その後に「2バイトの長さ + パケット」を20msごとに並べる
+OPUS_MAGIC = b'VVOP'
+_PACKET_LENGTH = struct.Struct('<H')
+
+class WavAudioSource(discord.AudioSource):
+    """
+    WAVファイルをプロセス内でDiscordのPCMフォーマットに変換して再生する音声ソース
+    ffmpegのプロセスを起動せずに、変換済みのPCMを20msずつ返す
+    """
+    
+    def __init__(self, pcm, path=None):
+        """
+        初期化
+        
+        Args:
+            pcm (bytes): 48kHz / 16bit / ステレオのPCMデータ（bytes-like）
+            path (str, optional): 元の音声ファイルのパス
+        """
+        self.path = path
+        self.pcm = pcm
+        self._pcm = memoryview(pcm)
+        self._position = 0
+    
+    @classmethod
+    def from_file(cls, path, speed=1.0, reader=read_wav):
+        """
+        WAVファイルを読み込んで変換する（CPUを使うため、イベントループ外で呼び出す）
+        既に48kHz / ステレオのWAVはコピーせずにそのまま再生する
+        
+        Args:
+            path (str): WAVファイルのパス
+            speed (float): 再生速度の倍率（音程を変えずに速める）
+            reader (callable): パスからWavDataを読み込む関数（セグメントに格納したキャッシュなど）
+        
+        Raises:
+            ValueError: WAVとして解釈できない場合
+        """
+        wav = reader(path)
+        return cls(convert_wav(wav, SAMPLING_RATE, CHANNELS, speed), path)
+    
+    @property
+    def duration(self):
+        """再生時間（秒）"""
+        return len(self._pcm) / (SAMPLING_RATE * CHANNELS * 2)
+    
+    def read(self):
+        """次の20ms分のPCMを返す（終端では空のバイト列）"""
+        chunk = self._pcm[self._position:self._position + FRAME_SIZE]
+        self._position += FRAME_SIZE
+        if not chunk:
+            return b''
+        if len(chunk) < FRAME_SIZE:
+            # 最後のフレームは無音で埋める
+            return bytes(chunk) + b'\x00' * (FRAME_SIZE - len(chunk))
+        return bytes(chunk)
+    
+    def is_opus(self):
+        return False
+    
+    def cleanup(self):
+        self.pcm = b''
+        self._pcm = memoryview(b'')
+
+
+class OpusPacketSource(discord.AudioSource):
+    """
+    事前エンコードしたOpusパケットをそのまま送信する音声ソース
+    デコードもエンコードも行わないため、キャッシュ済みの音声をほぼCPUを使わずに再生できる
+    """
+    
+    def __init__(self, packets, path=None):
+        """
+        初期化
+        
+        Args:
+            packets (list): 20msごとのOpusパケットのリスト
+            path (str, optional): パケットファイルのパス
+        """
+        self.path = path
+        self.packets = packets
+        self._index = 0
+    
+    @classmethod
+    def from_file(cls, path, reader=None):
+        """
+        パケットファイルを読み込む
+        
+        Args:
+            path (str): パケットファイルのパス
+            reader (callable, optional): パスからファイルの内容を読み込む関数（セグメントに格納したキャッシュなど）
+        
+        Raises:
+            ValueError: パケットファイルとして解釈できない場合
+        """
+        if reader is not None:
+            return cls(parse_opus_packets(reader(path)), path)
+        with open(path, 'rb') as f:
+            return cls(parse_opus_packets(f.read()), path)
+    
+    @property
+    def duration(self):
+        """再生時間（秒）"""
+        return len(self.packets) * SAMPLES_PER_FRAME / SAMPLING_RATE
+    
+    def read(self):
+        """次の20ms分のOpusパケットを返す（終端では空のバイト列）"""
+        if self._index >= len(self.packets):
+            return b''
+        packet = self.packets[self._index]
+        self._index += 1
+        return packet
+    
+    def is_opus(self):
+        return True
+    
+    @property
+    def size(self):
+        """保持しているデータのおおよそのメモリ使用量（バイト）"""
+        return sum(len(packet) for packet in self.packets) + len(self.packets) * 41
+    
+    def cleanup(self):
+        self.packets = []
+
+
+def encode_opus_packets(pcm):
+    """
+    48kHz / 16bit / ステレオのPCMを20msごとのOpusパケットにエンコードする
+    
+    Raises:
+        discord.opus.OpusNotLoaded: Opusライブラリが読み込めない場合
+    """
+    # エンコーダーはスレッドセーフではないため、呼び出しごとに作成する
+    encoder = discord.opus.Encoder()
+    packets = []
+    for offset in range(0, len(pcm), FRAME_SIZE):
+        # 変換不要なPCMはメモリビューのまま渡されるが、エンコーダーはbytesしか受け付けない
+        frame = bytes(pcm[offset:offset + FRAME_SIZE])
+        if len(frame) < FRAME_SIZE:
+            frame += b'\x00' * (FRAME_SIZE - len(frame))
+        packets.append(encoder.encode(frame, SAMPLES_PER_FRAME))
+    return packets
+
+
+def build_opus_packets(packets):
+    """Opusパケットのリストをファイル形式のバイト列にする"""
+    parts = [OPUS_MAGIC]
+    for packet in packets:
+        parts.append(_PACKET_LENGTH.pack(len(packet)))
+        parts.append(packet)
+    return b''.join(parts)
+
+
+def parse_opus_packets(data):
+    """
+    ファイル形式のバイト列からOpusパケットのリストを取り出す
+    
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    if data[:len(OPUS_MAGIC)] != OPUS_MAGIC:
+        raise ValueError("Opusパケットファイルではありません")
+    
+    view = memoryview(data)
+    packets = []
+    offset = len(OPUS_MAGIC)
+    while offset < len(view):
+        if offset + _PACKET_LENGTH.size > len(view):
+            raise ValueError("Opusパケットファイルが途中で切れています")
+        length = _PACKET_LENGTH.unpack_from(view, offset)[0]
+        offset += _PACKET_LENGTH.size
+        if offset + length > len(view):
+            raise ValueError("Opusパケットファイルが途中で切れています")
+        packets.append(bytes(view[offset:offset + length]))
+        offset += length
+    return packets
+
+
+def encode_wav_to_opus(data):
+    """WAVのバイト列をOpusパケットファイル形式のバイト列に変換する（CPUを使うため、イベントループ外で呼び出す）"""
+    pcm = convert_wav(parse_wav(data), SAMPLING_RATE, CHANNELS)
+    return build_opus_packets(encode_opus_packets(pcm))
+
+
+def encode_wav_to_opus_file(wav_path, opus_path):
+    """WAVファイルをOpusパケットファイルに変換する（CPUを使うため、イベントループ外で呼び出す）"""
+    with open(wav_path, 'rb') as f:
+        data = encode_wav_to_opus(f.read())
+    
+    # 書き込み途中のファイルを再生しないよう、一時ファイルに書いてから置き換える
+    temp_path = opus_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, opus_path)
+    return len(data)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import logging
+import configparser
+
+class PendingBurst:
+    """まとめて読み上げる途中の連続メッセージ"""
+    
+    __slots__ = ("message", "author_id", "speaker_id", "texts", "length", "arrivals", "first_at", "timer")
+    
+    def __init__(self, message, author_id, speaker_id):
+        self.message = message        # 最初のメッセージ（サーバー・投稿者・投稿時刻の基準）
+        self.author_id = author_id
+        self.speaker_id = speaker_id
+        self.texts = []
+        self.length = 0
+        self.arrivals = []            # 各メッセージの到着時刻（追加された待ち時間の計測用）
+        self.first_at = time.monotonic()
+        self.timer = None
+
+
+class BurstCoalescer:
+    """
+    同じチャンネルで同じ投稿者・話者が短時間に続けて送ったメッセージを1つにまとめるクラス
+    最後のメッセージから一定時間（デバウンス）待ち、まとめたテキストを1回の合成で読み上げる
+    """
+    
+    def __init__(self, flush_callback):
+        """
+        初期化
+        
+        Args:
+            flush_callback (callable): (最初のメッセージ, 話者ID, まとめたテキスト) を受け取るコルーチン関数
+        """
+        self.flush_callback = flush_callback
+        
+        # 設定を読み込み
+        config = configparser.ConfigParser()
+        config.read('config/settings.ini')
+        
+        self.window = config.getint('READING', 'burst_window_ms', fallback=0) / 1000
+        self.max_delay = config.getint('READING', 'burst_max_delay_ms', fallback=2000) / 1000
+        self.max_length = config.getint('READING', 'burst_max_length', fallback=60)
+        self.joiner = config.get('READING', 'burst_joiner', fallback='、')
+        
+        self.pending = {}  # (サーバーID, チャンネルID) -> PendingBurst
+        self._tasks = set()
+        
+        # 統計
+        self.stats = {
+            "messages": 0,
+            "bursts": 0,
+            "total_delay": 0.0,
+            "max_delay": 0.0
+        }
+        
+        # ロガー設定
+        self.logger = logging.getLogger("burst_coalescer")
+    
+    @property
+    def enabled(self):
+        return self.window > 0
+    
+    async def add(self, message, speaker_id, text):
+        """
+        メッセージを追加する
+        まとめられない場合は、待機中のメッセージを先に読み上げてから処理する
+        
+        Args:
+            message (discord.Message): 受信したメッセージ
+            speaker_id (int): 読み上げに使う話者ID
+            text (str): 読み上げるテキスト
+        """
+        key = (message.guild.id, message.channel.id)
+        burst = self.pending.get(key)
+        
+        # 投稿者・話者が違う場合や長さの上限を超える場合は、待機中のものを先に読み上げる
+        if burst is not None and not self._can_merge(burst, message.author.id, speaker_id, text):
+            await self.flush(key)
+            burst = None
+        
+        # 単独で上限を超える長いメッセージはまとめずにすぐ読み上げる
+        if len(text) > self.max_length:
+            self.stats["messages"] += 1
+            self.stats["bursts"] += 1
+            await self.flush_callback(message, speaker_id, text)
+            return
+        
+        if burst is None:
+            burst = PendingBurst(message, message.author.id, speaker_id)
+            self.pending[key] = burst
+        
+        burst.texts.append(text)
+        burst.length += len(text) + (len(self.joiner) if len(burst.texts) > 1 else 0)
+        burst.arrivals.append(time.monotonic())
+        
+        # 最後のメッセージから window 秒後、ただし最初のメッセージから max_delay 秒以内に読み上げる
+        if burst.timer is not None:
+            burst.timer.cancel()
+        delay = max(0.0, min(self.window, burst.first_at + self.max_delay - time.monotonic()))
+        burst.timer = asyncio.get_running_loop().call_later(delay, self._schedule_flush, key)
+    
+    def _can_merge(self, burst, author_id, speaker_id, text):
+        return (burst.author_id == author_id and burst.speaker_id == speaker_id and
+                burst.length + len(self.joiner) + len(text) <= self.max_length)
+    
+    def _join(self, texts):
+        """テキストを連結（句読点で終わっている場合は区切りを入れない）"""
+        result = texts[0]
+        for text in texts[1:]:
+            if result[-1:] in "、。！？!?,.":
+                result += text
+            else:
+                result += self.joiner + text
+        return result
+    
+    def _schedule_flush(self, key):
+        task = asyncio.create_task(self.flush(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def flush(self, key):
+        """待機中のメッセージをまとめて読み上げる"""
+        burst = self.pending.pop(key, None)
+        if burst is None:
+            return
+        if burst.timer is not None:
+            burst.timer.cancel()
+        
+        now = time.monotonic()
+        for arrival in burst.arrivals:
+            delay = now - arrival
+            self.stats["total_delay"] += delay
+            self.stats["max_delay"] = max(self.stats["max_delay"], delay)
+        self.stats["messages"] += len(burst.texts)
+        self.stats["bursts"] += 1
+        
+        if len(burst.texts) > 1:
+            self.logger.debug(f"{len(burst.texts)}件のメッセージをまとめて読み上げ (チャンネルID: {key[1]})")
+        
+        try:
+            await self.flush_callback(burst.message, burst.speaker_id, self._join(burst.texts))
+        except Exception as e:
+            self.logger.error(f"まとめたメッセージの読み上げエラー: {e}")
+    
+    async def flush_all(self):
+        """すべての待機中のメッセージを読み上げる"""
+        for key in list(self.pending):
+            await self.flush(key)
+    
+    def get_stats(self):
+        """統計情報を取得"""
+        stats = dict(self.stats)
+        stats["engine_calls_saved"] = stats["messages"] - stats["bursts"]
+        stats["avg_delay"] = (stats["total_delay"] / stats["messages"]) if stats["messages"] else 0
+        stats["delay_bound"] = self.max_delay if self.enabled else 0
+        stats["pending"] = len(self.pending)
+        return stats
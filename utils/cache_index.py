@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from datetime import datetime
+
+# キャッシュ索引のテーブル定義
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    text TEXT,
+    speaker_id INTEGER,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    duration REAL,
+    original_duration REAL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_speaker ON entries (speaker_id);
+CREATE INDEX IF NOT EXISTS idx_entries_size ON entries (size);
+CREATE INDEX IF NOT EXISTS idx_entries_created ON entries (created);
+CREATE INDEX IF NOT EXISTS idx_entries_last_accessed ON entries (last_accessed);
+"""
+
+_COLUMNS = ("key", "text", "speaker_id", "path", "size", "created", "last_accessed", "duration", "original_duration")
+
+class CacheIndex:
+    """
+    音声キャッシュの索引をSQLite（WALモード）で管理するクラス
+    追加・参照は1件ずつの更新で済み、キャッシュの件数が増えても1件あたりのコストがほぼ変わらない
+    """
+    
+    def __init__(self, db_path, touch_batch=256):
+        """
+        初期化
+        
+        Args:
+            db_path (str): データベースファイルのパス
+            touch_batch (int): 最終アクセス日時の更新をまとめて書き込む件数
+        """
+        self.db_path = db_path
+        self.touch_batch = touch_batch
+        self._touched = {}  # キャッシュキー -> 書き込み前の最終アクセス日時
+        
+        # ロガー設定
+        self.logger = logging.getLogger("cache_index")
+        
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        # 書き込み中も読み込みを妨げず、コミットごとのfsyncを省く
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+    
+    def get(self, key):
+        """
+        キャッシュキーの情報を取得
+        
+        Returns:
+            dict: 索引の情報、登録されていない場合はNone
+        """
+        row = self.conn.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+    
+    def put(self, key, text, speaker_id, path, size=0, duration=None, original_duration=None):
+        """キャッシュキーを登録（既にある場合は置き換える）"""
+        now = time.time()
+        self._touched.pop(key, None)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries (key, text, speaker_id, path, size, created, last_accessed, "
+            "duration, original_duration) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, text, speaker_id, path, size, now, now, duration, original_duration)
+        )
+        self.conn.commit()
+    
+    def touch(self, key, timestamp=None):
+        """最終アクセス日時を更新（一定件数ごとにまとめて書き込む）"""
+        self._touched[key] = timestamp if timestamp is not None else time.time()
+        if len(self._touched) >= self.touch_batch:
+            self.flush()
+    
+    def flush(self):
+        """まとめていた最終アクセス日時の更新を書き込む"""
+        if not self._touched:
+            return
+        touched = [(timestamp, key) for key, timestamp in self._touched.items()]
+        self._touched.clear()
+        self.conn.executemany("UPDATE entries SET last_accessed = ? WHERE key = ?", touched)
+        self.conn.commit()
+    
+    def remove(self, keys):
+        """キャッシュキーを削除"""
+        keys = list(keys)
+        if not keys:
+            return
+        for key in keys:
+            self._touched.pop(key, None)
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+        self.conn.commit()
+    
+    def set_size(self, key, size):
+        """ファイルサイズを更新（関連ファイルを追加したときなど）"""
+        self.conn.execute("UPDATE entries SET size = ? WHERE key = ?", (size, key))
+        self.conn.commit()
+    
+    def least_recently_used(self, limit):
+        """
+        最終アクセス日時の古い順にエントリを取得
+        
+        Returns:
+            list: (キャッシュキー, ファイルパス, サイズ) のリスト
+        """
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT key, path, size FROM entries ORDER BY last_accessed LIMIT ?", (limit,)
+        ).fetchall()
+        return [(row["key"], row["path"], row["size"]) for row in rows]
+    
+    def accessed_before(self, timestamp):
+        """
+        最終アクセス日時が指定した時刻より前のエントリを取得
+        
+        Returns:
+            list: (キャッシュキー, ファイルパス, サイズ) のリスト
+        """
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT key, path, size FROM entries WHERE last_accessed < ? ORDER BY last_accessed", (timestamp,)
+        ).fetchall()
+        return [(row["key"], row["path"], row["size"]) for row in rows]
+    
+    def count(self):
+        """登録されているエントリ数"""
+        return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    
+    def total_size(self):
+        """登録されているファイルの合計サイズ（バイト）"""
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    
+    def migrate_from_json(self, json_path):
+        """
+        以前の cache_info.json から索引を移行する（移行後のJSONは .migrated を付けて残す）
+        
+        Returns:
+            int: 移行したエントリ数
+        """
+        if not os.path.exists(json_path):
+            return 0
+        
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                files = json.load(f).get("files", {})
+        except (json.JSONDecodeError, IOError) as e:
+            self.logger.error(f"cache_info.json の読み込みに失敗: {e}")
+            return 0
+        
+        rows = []
+        for key, info in files.items():
+            try:
+                path = info["path"]
+                created = self._parse_timestamp(info.get("created"))
+                last_accessed = self._parse_timestamp(info.get("last_accessed"), created)
+            except (KeyError, ValueError, TypeError) as e:
+                self.logger.warning(f"移行できないキャッシュ情報をスキップ: {key} ({e})")
+                continue
+            
+            # ファイルが既に削除されているものは移行しない
+            if not os.path.exists(path):
+                continue
+            rows.append((
+                key, info.get("text"), info.get("speaker_id"), path, os.path.getsize(path),
+                created, last_accessed, info.get("duration"), info.get("original_duration")
+            ))
+        
+        self.conn.executemany(
+            f"INSERT OR IGNORE INTO entries ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+            rows
+        )
+        self.conn.commit()
+        os.replace(json_path, json_path + '.migrated')
+        self.logger.info(f"cache_info.json から {len(rows)} 件のキャッシュ情報を移行しました")
+        return len(rows)
+    
+    @staticmethod
+    def _parse_timestamp(value, default=None):
+        """ISO形式の日時をUNIX時間に変換"""
+        if value is None:
+            return default if default is not None else time.time()
+        return datetime.fromisoformat(value).timestamp()
+    
+    def close(self):
+        """未書き込みの更新を書き込んで閉じる"""
+        self.flush()
+        self.conn.close()
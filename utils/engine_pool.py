@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import logging
+from collections import deque
+
+import aiohttp
+
+class EngineEndpoint:
+    """1つのVOICEVOXエンジンの負荷と状態を保持するクラス"""
+    
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.in_flight = 0
+        self.latency_ewma = None  # 直近のレイテンシの指数移動平均（秒）
+        self.consecutive_failures = 0
+        
+        # 統計
+        self.requests = 0
+        self.completed = 0
+        self.failures = 0
+        self.total_time = 0.0
+        self.ejections = 0
+        self.recent_completions = deque(maxlen=1000)  # 完了時刻（スループット計算用）
+    
+    def load_score(self, default_latency):
+        """負荷の指標（処理中のリクエスト数 × 推定レイテンシ）"""
+        latency = self.latency_ewma if self.latency_ewma is not None else default_latency
+        return (self.in_flight + 1) * latency
+    
+    def throughput(self, window=60):
+        """直近window秒間の1分あたりの完了数"""
+        threshold = time.monotonic() - window
+        count = sum(1 for t in self.recent_completions if t >= threshold)
+        return count * 60 / window
+
+
+class EnginePool:
+    """複数のVOICEVOXエンジンに負荷分散するクラス"""
+    
+    def __init__(self, urls, eject_after=3, probe_interval=10, ewma_alpha=0.3):
+        """
+        初期化
+        
+        Args:
+            urls (list): エンジンのURLのリスト
+            eject_after (int): 連続して何回失敗したら切り離すか
+            probe_interval (float): ヘルスチェックの間隔（秒）
+            ewma_alpha (float): レイテンシの移動平均の重み
+        """
+        if not urls:
+            raise ValueError("VOICEVOXエンジンのURLが指定されていません")
+        
+        self.endpoints = [EngineEndpoint(url) for url in urls]
+        self.eject_after = eject_after
+        self.probe_interval = probe_interval
+        self.ewma_alpha = ewma_alpha
+        self.default_latency = 1.0
+        self._probe_task = None
+        
+        # ロガー設定
+        self.logger = logging.getLogger("engine_pool")
+    
+    def acquire(self, exclude=()):
+        """
+        最も負荷の低い正常なエンジンを選んで処理中として登録する
+        正常なエンジンがない場合は全エンジンから選ぶ（ヘルスチェックの回復待ちの間も処理を試みる）
+        
+        Args:
+            exclude (tuple): 選択から除外するエンドポイント（フェイルオーバー用）
+        
+        Returns:
+            EngineEndpoint: 選択したエンドポイント
+        """
+        candidates = [e for e in self.endpoints if e.healthy and e not in exclude]
+        if not candidates:
+            candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+        
+        endpoint = min(candidates, key=lambda e: e.load_score(self.default_latency))
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        return endpoint
+    
+    def release(self, endpoint, elapsed, success):
+        """
+        リクエストの完了を記録する
+        
+        Args:
+            endpoint (EngineEndpoint): acquire()で取得したエンドポイント
+            elapsed (float): 処理にかかった時間（秒）
+            success (bool): 成功したかどうか
+        """
+        endpoint.in_flight = max(0, endpoint.in_flight - 1)
+        
+        if success:
+            endpoint.completed += 1
+            endpoint.total_time += elapsed
+            endpoint.consecutive_failures = 0
+            endpoint.recent_completions.append(time.monotonic())
+            if endpoint.latency_ewma is None:
+                endpoint.latency_ewma = elapsed
+            else:
+                endpoint.latency_ewma = self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * endpoint.latency_ewma
+        else:
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.healthy and endpoint.consecutive_failures >= self.eject_after:
+                self._eject(endpoint, f"{endpoint.consecutive_failures}回連続で失敗")
+    
+    def abandon(self, endpoint):
+        """キャンセルされたリクエストを成功・失敗のどちらにも数えずに解放する"""
+        endpoint.in_flight = max(0, endpoint.in_flight - 1)
+    
+    def _eject(self, endpoint, reason):
+        """エンドポイントを振り分け対象から外す"""
+        endpoint.healthy = False
+        endpoint.ejections += 1
+        self.logger.warning(f"VOICEVOXエンジンを切り離しました: {endpoint.url} ({reason})")
+    
+    def _readmit(self, endpoint):
+        """エンドポイントを振り分け対象に戻す"""
+        endpoint.healthy = True
+        endpoint.consecutive_failures = 0
+        self.logger.info(f"VOICEVOXエンジンが復帰しました: {endpoint.url}")
+    
+    async def probe(self, session):
+        """全エンジンの /version を確認し、状態を更新する"""
+        async def check(endpoint):
+            try:
+                async with session.get(f"{endpoint.url}/version") as response:
+                    return response.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return False
+        
+        results = await asyncio.gather(*[check(endpoint) for endpoint in self.endpoints])
+        for endpoint, ok in zip(self.endpoints, results):
+            if ok and not endpoint.healthy:
+                self._readmit(endpoint)
+            elif not ok and endpoint.healthy:
+                self._eject(endpoint, "ヘルスチェック失敗")
+    
+    def start_health_checks(self, get_session):
+        """
+        定期的なヘルスチェックを開始する
+        
+        Args:
+            get_session (callable): 共有セッションを返すコルーチン関数
+        """
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop(get_session))
+    
+    async def stop_health_checks(self):
+        """ヘルスチェックを停止する"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+    
+    async def _probe_loop(self, get_session):
+        """ヘルスチェックを繰り返すループ"""
+        try:
+            while True:
+                try:
+                    await self.probe(await get_session())
+                except Exception as e:
+                    self.logger.error(f"ヘルスチェックエラー: {e}")
+                await asyncio.sleep(self.probe_interval)
+        except asyncio.CancelledError:
+            self.logger.debug("ヘルスチェックタスクが停止されました")
+            raise
+    
+    def get_stats(self):
+        """エンドポイントごとの統計情報を取得"""
+        return [
+            {
+                "url": endpoint.url,
+                "healthy": endpoint.healthy,
+                "in_flight": endpoint.in_flight,
+                "requests": endpoint.requests,
+                "completed": endpoint.completed,
+                "failures": endpoint.failures,
+                "ejections": endpoint.ejections,
+                "avg_latency": (endpoint.total_time / endpoint.completed) if endpoint.completed else 0,
+                "throughput_per_min": endpoint.throughput()
+            }
+            for endpoint in self.endpoints
+        ]
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+class FrequencySketch:
+    """
+    キーごとのアクセス頻度を少ないメモリで近似するカウンタ（Count-Min Sketch）
+    一定回数ごとに全カウンタを半分にし、最近よく使われるキーほど大きな値になるようにする
+    """
+    
+    DEPTH = 4
+    MAX_COUNT = 15
+    
+    def __init__(self, width=4096, sample_size=None):
+        """
+        初期化
+        
+        Args:
+            width (int): 1行あたりのカウンタ数
+            sample_size (int, optional): カウンタを半分にするまでの記録回数（省略時は width の10倍）
+        """
+        self.width = width
+        self.sample_size = sample_size or width * 10
+        self.rows = [[0] * width for _ in range(self.DEPTH)]
+        self.additions = 0
+    
+    def _indexes(self, key):
+        return [hash((row, key)) % self.width for row in range(self.DEPTH)]
+    
+    def increment(self, key):
+        """アクセスを記録"""
+        for row, index in zip(self.rows, self._indexes(key)):
+            if row[index] < self.MAX_COUNT:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._reset()
+    
+    def estimate(self, key):
+        """アクセス頻度の推定値"""
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+    
+    def _reset(self):
+        """古いアクセスの影響を減らすため、全カウンタを半分にする"""
+        for row in self.rows:
+            for index, count in enumerate(row):
+                row[index] = count >> 1
+        self.additions //= 2
+
+
+class HotCache:
+    """
+    よく使われる音声を再生できる形式のままメモリに保持するキャッシュ
+    容量を超える場合は、追加する音声のアクセス頻度が追い出される音声より高いときだけ入れ替える（TinyLFU）
+    """
+    
+    def __init__(self, max_bytes, sketch_width=4096):
+        """
+        初期化
+        
+        Args:
+            max_bytes (int): 保持するデータの合計サイズの上限（バイト）
+            sketch_width (int): アクセス頻度を数えるカウンタの幅
+        """
+        self.max_bytes = max_bytes
+        self.sketch = FrequencySketch(sketch_width)
+        self.entries = OrderedDict()  # キー -> (種類, データ, サイズ)（先頭ほど最近使われていない）
+        self.bytes = 0
+        
+        # 統計
+        self.stats = {
+            "admitted": 0,
+            "rejected": 0,
+            "evicted": 0
+        }
+    
+    def __contains__(self, key):
+        return key in self.entries
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def record(self, key):
+        """アクセスを記録（キャッシュにない場合も含めて、参照のたびに呼び出す）"""
+        self.sketch.increment(key)
+    
+    def get(self, key):
+        """
+        保持しているデータを取得
+        
+        Returns:
+            tuple: (種類, データ)、保持していない場合はNone
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0], entry[1]
+    
+    def offer(self, key, kind, data, size):
+        """
+        データを追加する（アクセス頻度が低い場合は追加しない）
+        
+        Args:
+            key (str): キャッシュキー
+            kind (str): データの種類（"opus" / "pcm"）
+            data: 再生に使うデータ
+            size (int): データのサイズ（バイト）
+        
+        Returns:
+            bool: 追加した場合はTrue
+        """
+        if size > self.max_bytes:
+            self.stats["rejected"] += 1
+            return False
+        
+        self.discard(key)
+        
+        # 容量が足りない場合は、最近使われていないものから追い出す候補を選ぶ
+        frequency = self.sketch.estimate(key)
+        victims = []
+        free = self.max_bytes - self.bytes
+        for victim in self.entries:
+            if free >= size:
+                break
+            if self.sketch.estimate(victim) >= frequency:
+                # 追い出す音声の方がよく使われている場合は追加しない
+                self.stats["rejected"] += 1
+                return False
+            victims.append(victim)
+            free += self.entries[victim][2]
+        
+        for victim in victims:
+            self.discard(victim)
+            self.stats["evicted"] += 1
+        
+        self.entries[key] = (kind, data, size)
+        self.bytes += size
+        self.stats["admitted"] += 1
+        return True
+    
+    def discard(self, key):
+        """データを削除"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+    
+    def get_stats(self):
+        """統計情報を取得"""
+        stats = dict(self.stats)
+        stats["entries"] = len(self.entries)
+        stats["bytes"] = self.bytes
+        stats["max_bytes"] = self.max_bytes
+        return stats
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import mmap
+import struct
+import sqlite3
+import logging
+import threading
+
+# セグメントファイル内の1件の形式: ヘッダ（マジックナンバー, 名前の長さ, データの長さ）+ 名前 + データ
+# 索引が失われてもセグメントだけで中身を確認できるよう、名前も一緒に書き込む
+_RECORD_MAGIC = b'VVSG'
+_RECORD_HEADER = struct.Struct('<4sHI')
+
+# 格納したデータの位置の索引
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    name TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_segment ON records (segment);
+"""
+
+class SegmentStore:
+    """
+    キャッシュした音声を少数の大きなセグメントファイルに追記して保存するクラス
+    読み込みはファイルを開かずにメモリマップのスライスを返し、
+    削除で使われなくなった領域はセグメントごとに詰め直して（コンパクション）回収する
+    """
+    
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, compact_ratio=0.5):
+        """
+        初期化
+        
+        Args:
+            directory (str): セグメントファイルと索引を置くディレクトリ
+            segment_bytes (int): 1つのセグメントファイルの大きさの目安（超えたら次のファイルに追記）
+            compact_ratio (float): 使用中の領域の割合がこれを下回ったセグメントを詰め直す
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compact_ratio = compact_ratio
+        
+        # 再生中のスレッドやコンパクションからも呼び出されるため、すべての操作をロックで保護する
+        self._lock = threading.RLock()
+        self._maps = {}  # セグメント番号 -> mmap
+        self._pending_removal = []  # 削除できなかったセグメントファイル（マップ中のWindowsなど）
+        
+        # 統計
+        self.stats = {
+            "writes": 0,
+            "reads": 0,
+            "compacted_segments": 0,
+            "reclaimed_bytes": 0
+        }
+        
+        # ロガー設定
+        self.logger = logging.getLogger("segment_store")
+        
+        os.makedirs(directory, exist_ok=True)
+        
+        self.conn = sqlite3.connect(os.path.join(directory, 'segments.db'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+        
+        # セグメントごとのファイルサイズと、そのうち使用中の領域のバイト数
+        self.segment_sizes = {}
+        for filename in os.listdir(directory):
+            segment = self._parse_segment_name(filename)
+            if segment is not None:
+                self.segment_sizes[segment] = os.path.getsize(os.path.join(directory, filename))
+        self.live_bytes = {segment: 0 for segment in self.segment_sizes}
+        rows = self.conn.execute(
+            "SELECT segment, SUM(length + LENGTH(CAST(name AS BLOB)) + ?) FROM records GROUP BY segment",
+            (_RECORD_HEADER.size,)
+        ).fetchall()
+        for segment, live in rows:
+            self.live_bytes[segment] = live
+        
+        # 最も新しいセグメントに続けて追記する
+        self.active = max(self.segment_sizes, default=0)
+        self._file = None
+        if self.active == 0 or self.segment_sizes[self.active] >= self.segment_bytes:
+            self._roll()
+        else:
+            self._file = open(self._segment_path(self.active), 'ab')
+    
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment_{segment:06d}.seg")
+    
+    @staticmethod
+    def _parse_segment_name(filename):
+        if not (filename.startswith("segment_") and filename.endswith(".seg")):
+            return None
+        try:
+            return int(filename[len("segment_"):-len(".seg")])
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _record_size(name, length):
+        return _RECORD_HEADER.size + len(name.encode()) + length
+    
+    def _roll(self):
+        """新しいセグメントファイルに切り替える"""
+        if self._file is not None:
+            self._file.close()
+        self.active = max(self.segment_sizes, default=0) + 1
+        self._file = open(self._segment_path(self.active), 'ab')
+        self.segment_sizes[self.active] = 0
+        self.live_bytes[self.active] = 0
+    
+    def _append(self, name, data):
+        """
+        現在のセグメントの末尾に1件書き込む
+        
+        Returns:
+            int: セグメント内のデータの開始位置
+        """
+        if self.segment_sizes[self.active] >= self.segment_bytes:
+            self._roll()
+        
+        name_bytes = name.encode()
+        start = self.segment_sizes[self.active]
+        self._file.write(_RECORD_HEADER.pack(_RECORD_MAGIC, len(name_bytes), len(data)))
+        self._file.write(name_bytes)
+        self._file.write(data)
+        self._file.flush()
+        
+        size = _RECORD_HEADER.size + len(name_bytes) + len(data)
+        self.segment_sizes[self.active] += size
+        self.live_bytes[self.active] += size
+        return start + _RECORD_HEADER.size + len(name_bytes)
+    
+    def _locate(self, name):
+        return self.conn.execute(
+            "SELECT segment, offset, length FROM records WHERE name = ?", (name,)
+        ).fetchone()
+    
+    def _map(self, segment, end):
+        """セグメントファイルのメモリマップを取得（追記されて足りなくなった場合は作り直す）"""
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                self._release(mapped)
+            with open(self._segment_path(segment), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+    
+    @staticmethod
+    def _release(mapped):
+        """メモリマップを閉じる（再生中のスライスが残っている場合は、参照がなくなったときに解放される）"""
+        try:
+            mapped.close()
+        except BufferError:
+            pass
+    
+    def put(self, name, data):
+        """
+        データを追記する（同じ名前のデータがある場合は置き換える）
+        
+        Args:
+            name (str): データの名前（キャッシュファイル名）
+            data (bytes): 格納するデータ
+        """
+        with self._lock:
+            self._forget(name)
+            offset = self._append(name, data)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO records (name, segment, offset, length) VALUES (?, ?, ?, ?)",
+                (name, self.active, offset, len(data))
+            )
+            self.conn.commit()
+            self.stats["writes"] += 1
+    
+    def get(self, name):
+        """
+        データを取得（コピーせずにメモリマップのスライスを返す）
+        
+        Returns:
+            memoryview: 格納したデータ、ない場合はNone
+        """
+        with self._lock:
+            row = self._locate(name)
+            if row is None:
+                return None
+            segment, offset, length = row
+            try:
+                mapped = self._map(segment, offset + length)
+            except (OSError, ValueError) as e:
+                self.logger.error(f"セグメントファイルの読み込みに失敗: {e}")
+                return None
+            self.stats["reads"] += 1
+            return memoryview(mapped)[offset:offset + length]
+    
+    def contains(self, name):
+        """データがあるかどうか"""
+        with self._lock:
+            return self._locate(name) is not None
+    
+    def delete(self, names):
+        """データを削除する（領域はコンパクションで回収する）"""
+        with self._lock:
+            names = [name for name in names if self._forget(name)]
+            if names:
+                self.conn.executemany("DELETE FROM records WHERE name = ?", [(name,) for name in names])
+                self.conn.commit()
+    
+    def _forget(self, name):
+        """使用中の領域の集計から外す（索引の削除は呼び出し側で行う）"""
+        row = self._locate(name)
+        if row is None:
+            return False
+        segment, _, length = row
+        self.live_bytes[segment] = self.live_bytes.get(segment, 0) - self._record_size(name, length)
+        return True
+    
+    def compaction_candidates(self):
+        """詰め直す対象のセグメント（書き込み中のセグメントも、使用中の領域が少なければ対象にする）"""
+        with self._lock:
+            return [
+                segment for segment, size in self.segment_sizes.items()
+                if (size == 0 and segment != self.active)
+                or (size > 0 and self.live_bytes.get(segment, 0) / size < self.compact_ratio)
+            ]
+    
+    def compact(self):
+        """
+        使用中の領域が少ないセグメントを詰め直す（時間がかかるため、イベントループ外で呼び出す）
+        
+        Returns:
+            int: 回収したバイト数
+        """
+        self._retry_removal()
+        return sum(self.compact_segment(segment) for segment in self.compaction_candidates())
+    
+    def compact_segment(self, segment):
+        """
+        セグメント内の使用中のデータを現在のセグメントに移し、ファイルを削除する
+        1件ごとにロックを解放するため、コンパクション中も読み書きを続けられる
+        
+        Returns:
+            int: 回収したバイト数
+        """
+        with self._lock:
+            # 書き込み中のセグメントは、新しいセグメントに切り替えてから詰め直す
+            # （削除されたデータが書き込み中のセグメントに溜まり続けないように）
+            if segment == self.active:
+                self._roll()
+            rows = self.conn.execute(
+                "SELECT name, offset, length FROM records WHERE segment = ?", (segment,)
+            ).fetchall()
+        
+        for name, offset, length in rows:
+            with self._lock:
+                # 移す前に削除・置き換えられたデータは移さない
+                if self._locate(name) != (segment, offset, length):
+                    continue
+                data = self._map(segment, offset + length)[offset:offset + length]
+                new_offset = self._append(name, data)
+                self.conn.execute(
+                    "UPDATE records SET segment = ?, offset = ? WHERE name = ?", (self.active, new_offset, name)
+                )
+                self.conn.commit()
+                self.live_bytes[segment] -= self._record_size(name, length)
+        
+        with self._lock:
+            remaining = self.conn.execute(
+                "SELECT COUNT(*) FROM records WHERE segment = ?", (segment,)
+            ).fetchone()[0]
+            if remaining:
+                return 0
+            
+            reclaimed = self.segment_sizes.pop(segment, 0)
+            self.live_bytes.pop(segment, None)
+            mapped = self._maps.pop(segment, None)
+            if mapped is not None:
+                self._release(mapped)
+            self._remove_segment(self._segment_path(segment))
+            self.stats["compacted_segments"] += 1
+            self.stats["reclaimed_bytes"] += reclaimed
+            return reclaimed
+    
+    def _remove_segment(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # 再生中でマップされたままのファイルを削除できない環境では、次回のコンパクションで再試行する
+            self.logger.debug(f"セグメントファイルを削除できないため後で再試行します: {e}")
+            self._pending_removal.append(path)
+    
+    def _retry_removal(self):
+        with self._lock:
+            pending, self._pending_removal = self._pending_removal, []
+            for path in pending:
+                self._remove_segment(path)
+    
+    def get_stats(self):
+        """統計情報を取得"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["segments"] = len(self.segment_sizes)
+            stats["disk_bytes"] = sum(self.segment_sizes.values())
+            stats["live_bytes"] = sum(self.live_bytes.values())
+        stats["dead_bytes"] = stats["disk_bytes"] - stats["live_bytes"]
+        return stats
+    
+    def close(self):
+        """ファイルと索引を閉じる"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            for mapped in self._maps.values():
+                self._release(mapped)
+            self._maps.clear()
+            self.conn.close()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import asyncio
+import logging
+import configparser
+
+from utils.voicevox_api import voicevox_api
+
+# /list_speakers の1ページあたりのフィールド数（Discord Embedの上限）
+FIELDS_PER_PAGE = 25
+
+class SpeakerCatalog:
+    """VOICEVOXの話者一覧をキャッシュし、スタイルIDから高速に引けるようにするクラス"""
+    
+    def __init__(self, api):
+        """初期化"""
+        # 設定を読み込み
+        config = configparser.ConfigParser()
+        config.read('config/settings.ini')
+        
+        self.api = api
+        self.ttl = config.getint('SPEAKERS', 'catalog_ttl', fallback=3600)
+        self.retry_interval = config.getint('SPEAKERS', 'retry_interval', fallback=30)
+        self.min_refresh_interval = config.getint('SPEAKERS', 'min_refresh_interval', fallback=60)
+        self.snapshot_path = config.get('PATHS', 'speaker_snapshot', fallback='temp/speakers_snapshot.json')
+        
+        # 話者一覧と索引
+        self.speakers = []
+        self.style_index = {}  # style_id -> (speaker, style)
+        self.pages = []        # /list_speakers 用: ページごとの [(話者名, 表示テキスト)]
+        self.version = 0       # 一覧が更新されるたびに増える
+        self.updated_at = 0.0  # 最後にエンジンから取得した時刻（UNIX時間）
+        self.last_attempt = 0.0
+        self._refresh_lock = None  # イベントループ上で初回使用時に作成
+        
+        # ロガー設定
+        self.logger = logging.getLogger("speaker_catalog")
+        
+        # 前回のスナップショットを読み込み（エンジン起動前でも検証できるように）
+        self._load_snapshot()
+    
+    def _load_snapshot(self):
+        """ディスク上のスナップショットから話者一覧を復元する"""
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._build(snapshot.get("speakers", []))
+            self.updated_at = snapshot.get("updated_at", 0.0)
+            self.logger.info(f"話者スナップショットを読み込みました: {len(self.style_index)} スタイル")
+        except (json.JSONDecodeError, IOError) as e:
+            self.logger.error(f"話者スナップショットの読み込みに失敗: {e}")
+    
+    def _save_snapshot(self):
+        """話者一覧をスナップショットとして保存する"""
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            with open(self.snapshot_path, 'w', encoding='utf-8') as f:
+                json.dump({"updated_at": self.updated_at, "speakers": self.speakers}, f, ensure_ascii=False)
+        except IOError as e:
+            self.logger.error(f"話者スナップショットの保存に失敗: {e}")
+    
+    def _build(self, speakers):
+        """索引とページ構成を作り直す"""
+        style_index = {}
+        speaker_dict = {}
+        
+        for speaker in speakers:
+            speaker_name = speaker.get("name", "不明")
+            styles = speaker_dict.setdefault(speaker_name, [])
+            for style in speaker.get("styles", []):
+                style_index[style.get("id", -1)] = (speaker, style)
+                styles.append((style.get("id", -1), style.get("name", "不明")))
+        
+        # 話者ごとのフィールドを25件ずつページに分割
+        fields = [
+            (speaker_name, "\n".join([f"ID: `{style_id}` - {style_name}" for style_id, style_name in styles]))
+            for speaker_name, styles in speaker_dict.items()
+        ]
+        pages = [fields[i:i + FIELDS_PER_PAGE] for i in range(0, len(fields), FIELDS_PER_PAGE)]
+        
+        self.speakers = speakers
+        self.style_index = style_index
+        self.pages = pages
+        self.version += 1
+    
+    def is_stale(self):
+        """TTLを過ぎているかどうか"""
+        return time.time() - self.updated_at >= self.ttl
+    
+    def _should_refresh(self):
+        """TTLを過ぎていて、かつ直前の取得失敗から再試行間隔が経過しているかどうか"""
+        return self.is_stale() and time.time() - self.last_attempt >= self.retry_interval
+    
+    async def refresh(self, force=False):
+        """
+        エンジンから話者一覧を取得して更新する
+        
+        Args:
+            force (bool): TTL内でも取得し直すかどうか
+        
+        Returns:
+            bool: 一覧が最新の状態であればTrue
+        """
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        
+        async with self._refresh_lock:
+            # ロック待ちの間に他のタスクが更新した場合は何もしない
+            if not force and not self.is_stale():
+                return True
+            
+            self.last_attempt = time.time()
+            speakers = await self.api.get_speakers()
+            if not speakers:
+                # 取得に失敗した場合は既存の一覧（スナップショット）を使い続ける
+                self.logger.warning("話者一覧を取得できませんでした。既存の一覧を使用します")
+                return False
+            
+            self._build(speakers)
+            self.updated_at = time.time()
+            self._save_snapshot()
+            self.logger.info(f"話者一覧を更新しました: {len(self.style_index)} スタイル")
+            return True
+    
+    async def get_speakers(self):
+        """話者一覧を取得（TTLを過ぎていれば更新する）"""
+        if self._should_refresh():
+            await self.refresh()
+        return self.speakers
+    
+    def get_style(self, style_id):
+        """スタイルIDから (話者, スタイル) を取得。見つからない場合はNone"""
+        return self.style_index.get(style_id)
+    
+    async def lookup(self, style_id):
+        """
+        スタイルIDから (話者, スタイル) を取得する
+        見つからない場合は一覧が古い可能性があるため、間隔を空けて取得し直す
+        """
+        if self._should_refresh():
+            await self.refresh()
+        
+        entry = self.get_style(style_id)
+        if entry is None and time.time() - self.last_attempt >= self.min_refresh_interval:
+            await self.refresh(force=True)
+            entry = self.get_style(style_id)
+        return entry
+    
+    def describe_style(self, style_id):
+        """スタイルIDを「話者名 (スタイル名)」の形式で表す"""
+        entry = self.get_style(style_id)
+        if entry is None:
+            return None
+        speaker, style = entry
+        return f"{speaker.get('name')} ({style.get('name')})"
+
+# シングルトンインスタンス
+speaker_catalog = SpeakerCatalog(voicevox_api)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import uuid
+import shutil
+import asyncio
+import logging
+
+from utils.voicevox_api import voicevox_api, AudioStream
+from utils.audio_cache import cache_manager
+from utils.synthesis_scheduler import synthesis_scheduler, PRIORITY_AUTO_READ
+from utils.text_normalizer import text_normalizer
+
+class SynthesisService:
+    """キャッシュの確認と音声合成をまとめて行うクラス"""
+    
+    def __init__(self, api, cache, scheduler):
+        """初期化"""
+        self.api = api
+        self.cache = cache
+        self.scheduler = scheduler
+        
+        # 合成中のリクエスト（キャッシュキー -> 合成タスク）
+        self.in_flight = {}
+        
+        # 統計
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "engine_calls": 0,
+            "coalesced": 0,
+            "sentences": 0,
+            "sentence_hits": 0
+        }
+        
+        # ロガー設定
+        self.logger = logging.getLogger("synthesis")
+    
+    async def get_audio(self, text, speaker_id, system_stats=None, guild_id=None, priority=PRIORITY_AUTO_READ,
+                        params=None):
+        """
+        テキストの音声ファイルを取得する
+        キャッシュにあればそれを返し、同じテキスト・話者の合成が実行中であればその結果を待つ
+        
+        Args:
+            text (str): 合成するテキスト
+            speaker_id (int): 話者ID
+            system_stats (SystemStats, optional): キャッシュヒット/ミスを記録する統計オブジェクト
+            guild_id (int, optional): リクエスト元のサーバーID（合成スロットの公平な割り当てに使用）
+            priority (int): 合成スロットの優先度
+            params (dict, optional): 合成パラメータ（speedScale など）
+        
+        Returns:
+            str: 音声ファイルのパス、失敗時はNone
+        """
+        self.stats["requests"] += 1
+        
+        # キャッシュキーを生成
+        cache_key = self.cache.generate_cache_key(text, speaker_id, params)
+        cache_path = self.cache.get_cache_path(cache_key)
+        
+        if cache_path:
+            # キャッシュヒットを記録
+            self.stats["cache_hits"] += 1
+            if system_stats:
+                system_stats.record_cache_hit()
+            return cache_path
+        
+        # キャッシュミスを記録
+        if system_stats:
+            system_stats.record_cache_miss()
+        
+        # キャッシュが無効な場合は一時ファイルを共有できないため、それぞれ合成する
+        if not self.cache.cache_enabled:
+            self.stats["engine_calls"] += 1
+            async with self.scheduler.slot(guild_id, priority):
+                return await self.api.create_audio(text, speaker_id, params)
+        
+        # 同じキーの合成が実行中であれば、その結果を待つ
+        task = self.in_flight.get(cache_key)
+        coalesced = task is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+            self.logger.debug(f"実行中の合成に相乗り: {text[:20]}")
+        else:
+            task = asyncio.create_task(
+                self._synthesize_and_cache(cache_key, text, speaker_id, guild_id, priority, params)
+            )
+            self.in_flight[cache_key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(cache_key, None))
+        
+        # 待機側がキャンセルされても合成自体は継続させる
+        audio_path = await asyncio.shield(task)
+        
+        # キャッシュに追加できず一時ファイルが返された場合、再生後に削除されるため相乗りした側はコピーを使う
+        if coalesced and audio_path and not self.cache.is_cache_file(audio_path):
+            audio_path = await self._copy_temp_file(audio_path)
+        return audio_path
+    
+    def get_audio_stream(self, text, speaker_id, system_stats=None, guild_id=None, priority=PRIORITY_AUTO_READ,
+                         params=None):
+        """
+        長いテキストの音声を文ごとのストリームとして取得する
+        全文がキャッシュにあればそれを1つだけ返し、なければ各文をキャッシュから取得するか合成を開始する
+        
+        Args:
+            text (str): 合成するテキスト
+            speaker_id (int): 話者ID
+            system_stats (SystemStats, optional): キャッシュヒット/ミスを記録する統計オブジェクト
+            guild_id (int, optional): リクエスト元のサーバーID（合成スロットの公平な割り当てに使用）
+            priority (int): 合成スロットの優先度
+            params (dict, optional): 合成パラメータ（speedScale など）
+            
+        Returns:
+            AudioStream: 文ごとの音声ファイルを順に返すストリーム
+        """
+        self.stats["requests"] += 1
+        
+        cache_key = self.cache.generate_cache_key(text, speaker_id, params)
+        cache_path = self.cache.get_cache_path(cache_key)
+        if cache_path:
+            self.stats["cache_hits"] += 1
+            if system_stats:
+                system_stats.record_cache_hit()
+            return AudioStream.from_paths([cache_path])
+        
+        if system_stats:
+            system_stats.record_cache_miss()
+        
+        sentences = self._split_sentences(text) if self.cache.cache_enabled else None
+        if sentences is None:
+            # 各文ごとに合成スロットを確保する（長文が他のサーバーのスロットを占有しないように）
+            self.stats["engine_calls"] += 1
+            return self.api.create_audio_stream(
+                text, speaker_id, slot=lambda: self.scheduler.slot(guild_id, priority), params=params
+            )
+        
+        # キャッシュ済みの文はそのファイルを使い、それ以外の文の合成をすぐに開始する
+        # （各文はキャッシュに追加されるため、中止してもファイルは削除しない）
+        tasks = [
+            asyncio.create_task(self._get_sentence(sentence, speaker_id, guild_id, priority, params, index))
+            for index, (sentence, _) in enumerate(sentences)
+        ]
+        return AudioStream(tasks, owns_files=False, pauses=[pause for _, pause in sentences])
+    
+    def _split_sentences(self, text):
+        """
+        長いテキストを文ごとのキャッシュの単位に分割する
+        
+        Returns:
+            list: (正規化した文, 文の後に空ける間（ミリ秒）) のリスト、分割しない場合はNone
+        """
+        if len(text) <= self.api.long_text_threshold:
+            return None
+        # 文末の句読点を揃え、単独のメッセージとして読み上げた同じ文ともキャッシュを共有する
+        # （キャッシュした音声は前後の無音を取り除いているため、句読点による間はつなぐときに空ける）
+        sentences = [
+            (text_normalizer.normalize(segment).strip(), self.api.pause_after(segment))
+            for segment in self.api.split_segments(text)
+        ]
+        sentences = [(sentence, pause) for sentence, pause in sentences if sentence]
+        return sentences if len(sentences) > 1 else None
+    
+    async def _get_sentence(self, sentence, speaker_id, guild_id, priority, params=None, index=0):
+        """
+        1文の音声ファイルを取得する（文ごとのキャッシュキーで検索し、なければ合成してキャッシュする）
+        
+        Returns:
+            str: 音声ファイルのパス、失敗時はNone
+        """
+        self.stats["sentences"] += 1
+        cache_key = self.cache.generate_cache_key(sentence, speaker_id, params)
+        cache_path = self.cache.get_cache_path(cache_key)
+        if cache_path:
+            self.stats["sentence_hits"] += 1
+            return cache_path
+        
+        task = self.in_flight.get(cache_key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.create_task(
+                self._synthesize_sentence(cache_key, sentence, speaker_id, guild_id, priority, params, index)
+            )
+            self.in_flight[cache_key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(cache_key, None))
+        
+        return await asyncio.shield(task)
+    
+    async def _synthesize_sentence(self, cache_key, sentence, speaker_id, guild_id, priority, params=None,
+                                   index=0):
+        """合成スロットを確保して1文を合成し、キャッシュに追加する"""
+        self.stats["engine_calls"] += 1
+        async with self.scheduler.slot(guild_id, priority):
+            audio_path = await self.api.create_segment_audio(sentence, speaker_id, params, index)
+        if not audio_path:
+            return None
+        return await self._store(cache_key, audio_path, sentence, speaker_id)
+    
+    async def _synthesize_and_cache(self, cache_key, text, speaker_id, guild_id, priority, params=None):
+        """合成スロットを確保して音声を合成し、キャッシュに追加する"""
+        sentences = self._split_sentences(text)
+        if sentences is not None:
+            # 長文は文ごとにキャッシュし、キャッシュ済みの文と新しく合成した文を結合する
+            # （合成スロットは文ごとに確保する）
+            paths = await asyncio.gather(*[
+                self._get_sentence(sentence, speaker_id, guild_id, priority, params, index)
+                for index, (sentence, _) in enumerate(sentences)
+            ])
+            clips = [(path, pause) for path, (_, pause) in zip(paths, sentences) if path]
+            audio_path = await self.api.combine_audio_files([path for path, _ in clips],
+                                                            reader=self.cache.read_wav,
+                                                            pauses=[pause for _, pause in clips[:-1]])
+            if audio_path is None:
+                # 形式の異なる文のキャッシュなどで結合できなかった場合は、一部の文だけの音声をキャッシュしない
+                return None
+            if None in paths:
+                # 合成に失敗した文が欠けた音声を全文のキーでキャッシュしないよう、そのまま返す
+                self.logger.warning(f"{paths.count(None)}/{len(paths)} 文の合成に失敗したため全文はキャッシュしません")
+                return audio_path
+        else:
+            self.stats["engine_calls"] += 1
+            async with self.scheduler.slot(guild_id, priority):
+                audio_path = await self.api.create_audio(text, speaker_id, params)
+        if not audio_path:
+            return None
+        return await self._store(cache_key, audio_path, text, speaker_id)
+    
+    async def _store(self, cache_key, audio_path, text, speaker_id):
+        """合成した音声をキャッシュに追加し、キャッシュ側のファイルのパスを返す"""
+        await self.cache.add_to_cache(cache_key, audio_path, text, speaker_id)
+        cache_path = self.cache.peek_cache_path(cache_key)
+        if not cache_path:
+            return audio_path
+        
+        # 複数の要求元で共有するため、キャッシュ側のファイルを返して一時ファイルは削除
+        # （文のキャッシュファイルをそのまま使った場合は残す）
+        if cache_path != audio_path and not self.cache.is_cache_file(audio_path):
+            try:
+                os.remove(audio_path)
+            except OSError as e:
+                self.logger.debug(f"一時ファイルの削除に失敗: {e}")
+        return cache_path
+    
+    async def _copy_temp_file(self, audio_path):
+        """
+        一時ファイルのコピーを作る
+        
+        Returns:
+            str: コピーしたファイルのパス、失敗時はNone
+        """
+        base, ext = os.path.splitext(audio_path)
+        copy_path = f"{base}_{uuid.uuid4().hex[:8]}{ext}"
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, shutil.copyfile, audio_path, copy_path)
+        except OSError as e:
+            self.logger.error(f"一時ファイルのコピーに失敗: {e}")
+            return None
+        return copy_path
+    
+    def get_stats(self):
+        """合成の統計情報を取得"""
+        stats = dict(self.stats)
+        stats["in_flight"] = len(self.in_flight)
+        # 長文の文のうちキャッシュにあった割合
+        stats["sentence_hit_ratio"] = (stats["sentence_hits"] / stats["sentences"] * 100) if stats["sentences"] else 0
+        return stats
+
+# シングルトンインスタンス
+synthesis_service = SynthesisService(voicevox_api, cache_manager, synthesis_scheduler)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import configparser
+from contextlib import asynccontextmanager
+
+# 優先度（小さいほど優先）
+PRIORITY_INTERACTIVE = 0  # /say などのコマンド
+PRIORITY_AUTO_READ = 1    # チャンネルの自動読み上げ
+
+class GuildQueueStats:
+    """サーバーごとの待ち行列の状態と統計"""
+    
+    def __init__(self, weight=1.0):
+        self.weight = weight
+        self.last_finish = 0.0  # 直前に割り当てたリクエストの仮想終了時刻
+        self.queued = 0
+        self.running = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def to_dict(self):
+        return {
+            "weight": self.weight,
+            "queued": self.queued,
+            "running": self.running,
+            "granted": self.granted,
+            "avg_wait": (self.total_wait / self.granted) if self.granted else 0,
+            "max_wait": self.max_wait
+        }
+
+
+class SynthesisScheduler:
+    """
+    エンジンの同時合成数（スロット）を管理し、サーバー間で公平に割り当てるクラス
+    優先度の高いリクエストを先に、同じ優先度の中では重み付き公平キューイングで順番を決める
+    """
+    
+    def __init__(self):
+        """初期化"""
+        # 設定を読み込み
+        config = configparser.ConfigParser()
+        config.read('config/settings.ini')
+        
+        self.slots = max(1, config.getint('SCHEDULER', 'engine_slots', fallback=4))
+        self.default_weight = config.getfloat('SCHEDULER', 'default_guild_weight', fallback=1.0)
+        self.guild_weights = self._parse_weights(config.get('SCHEDULER', 'guild_weights', fallback=''))
+        
+        self.in_use = 0
+        self.virtual_time = 0.0
+        self.guilds = {}
+        self._queue = []  # (優先度, 仮想終了時刻, 連番, 仮想開始時刻, サーバーID, Future)
+        self._sequence = itertools.count()
+        
+        # ロガー設定
+        self.logger = logging.getLogger("synthesis_scheduler")
+    
+    def _parse_weights(self, value):
+        """「サーバーID:重み」のカンマ区切りを辞書に変換"""
+        weights = {}
+        for item in value.split(","):
+            if ":" not in item:
+                continue
+            guild_id, weight = item.split(":", 1)
+            try:
+                weights[int(guild_id.strip())] = max(0.01, float(weight))
+            except ValueError:
+                continue
+        return weights
+    
+    def _get_guild(self, guild_id):
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = GuildQueueStats(self.guild_weights.get(guild_id, self.default_weight))
+        return self.guilds[guild_id]
+    
+    @asynccontextmanager
+    async def slot(self, guild_id, priority=PRIORITY_AUTO_READ):
+        """
+        合成スロットを1つ確保する
+        
+        Args:
+            guild_id (int): リクエスト元のサーバーID（DMなどはNone）
+            priority (int): PRIORITY_INTERACTIVE または PRIORITY_AUTO_READ
+        """
+        await self._acquire(guild_id, priority)
+        try:
+            yield
+        finally:
+            self._release(guild_id)
+    
+    async def _acquire(self, guild_id, priority):
+        guild = self._get_guild(guild_id)
+        enqueued_at = time.monotonic()
+        
+        # 仮想時刻上の開始・終了時刻を割り当てる（重みが大きいほど間隔が短い）
+        start_tag = max(self.virtual_time, guild.last_finish)
+        finish_tag = start_tag + 1.0 / guild.weight
+        guild.last_finish = finish_tag
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, finish_tag, next(self._sequence), start_tag, guild_id, future))
+        guild.queued += 1
+        self._dispatch()
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 割り当て直後にキャンセルされた場合はスロットを返却
+                self._release(guild_id)
+            else:
+                guild.queued -= 1
+            raise
+        
+        wait = time.monotonic() - enqueued_at
+        guild.granted += 1
+        guild.total_wait += wait
+        guild.max_wait = max(guild.max_wait, wait)
+    
+    def _release(self, guild_id):
+        self.in_use -= 1
+        self._get_guild(guild_id).running -= 1
+        self._dispatch()
+    
+    def _dispatch(self):
+        """空いているスロットを待ち行列の先頭から割り当てる"""
+        while self.in_use < self.slots and self._queue:
+            _, _, _, start_tag, guild_id, future = heapq.heappop(self._queue)
+            if future.done():
+                # キャンセル済みの待機は読み飛ばす
+                continue
+            
+            guild = self._get_guild(guild_id)
+            guild.queued -= 1
+            guild.running += 1
+            self.in_use += 1
+            self.virtual_time = max(self.virtual_time, start_tag)
+            future.set_result(None)
+    
+    def get_guild_stats(self, guild_id):
+        """サーバーごとの待ち行列の統計を取得"""
+        return self._get_guild(guild_id).to_dict()
+    
+    def get_stats(self):
+        """スケジューラ全体の統計を取得"""
+        return {
+            "slots": self.slots,
+            "in_use": self.in_use,
+            "queued": sum(guild.queued for guild in self.guilds.values()),
+            "guilds": {guild_id: guild.to_dict() for guild_id, guild in self.guilds.items()}
+        }
+
+# シングルトンインスタンス
+synthesis_scheduler = SynthesisScheduler()
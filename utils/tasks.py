@@ -10,6 +10,9 @@ import discord
 from datetime import datetime, timedelta
 import json
 
+from utils.speaker_catalog import speaker_catalog
+from utils.audio_cache import cache_manager
+
 class BackgroundTasks:
     """
     バックグラウンドタスクを管理するクラス
@@ -37,7 +40,8 @@ class BackgroundTasks:
         self.tasks = [
             asyncio.create_task(self._update_status_loop()),
             asyncio.create_task(self._clean_cache_loop()),
-            asyncio.create_task(self._system_monitor_loop())
+            asyncio.create_task(self._system_monitor_loop()),
+            asyncio.create_task(self._refresh_speakers_loop())
         ]
     
     async def stop(self):
@@ -102,41 +106,11 @@ class BackgroundTasks:
             
             while self.running:
                 try:
-                    # キャッシュディレクトリをチェック
-                    cache_dir = "temp/cache"
-                    if os.path.exists(cache_dir):
-                        # アクセスされていない古いキャッシュファイルを削除
-                        files = os.listdir(cache_dir)
-                        current_time = time.time()
-                        deleted_count = 0
-                        
-                        # 最大キャッシュサイズ（デフォルト500MB）
-                        max_cache_size = 500 * 1024 * 1024
-                        
-                        # 現在のキャッシュサイズを計算
-                        total_size = sum(os.path.getsize(os.path.join(cache_dir, f)) for f in files if os.path.isfile(os.path.join(cache_dir, f)))
-                        
-                        # サイズが大きすぎる場合、一部のキャッシュを削除
-                        if total_size > max_cache_size:
-                            # ファイルを最終アクセス時間でソート
-                            file_stats = [(f, os.path.getatime(os.path.join(cache_dir, f))) for f in files if os.path.isfile(os.path.join(cache_dir, f))]
-                            file_stats.sort(key=lambda x: x[1])  # 古い順にソート
-                            
-                            # キャッシュサイズが上限以下になるまで古いファイルを削除
-                            for filename, _ in file_stats:
-                                file_path = os.path.join(cache_dir, filename)
-                                file_size = os.path.getsize(file_path)
-                                try:
-                                    os.remove(file_path)
-                                    deleted_count += 1
-                                    total_size -= file_size
-                                    if total_size <= max_cache_size * 0.8:  # 20%のマージンを残す
-                                        break
-                                except OSError:
-                                    continue
-                        
-                        if deleted_count > 0:
-                            self.logger.info(f"キャッシュクリーンアップ: {deleted_count}ファイルを削除しました")
+                    # 容量の上限は追加のたびにキャッシュ側で守られるため、ここでは保持日数を過ぎたものを削除
+                    await cache_manager.cleanup_old_cache()
+                    cache_manager.enforce_budget()
+                    # セグメント方式では削除した領域を詰め直して回収する
+                    await cache_manager.compact()
                 except Exception as e:
                     self.logger.error(f"キャッシュクリーンアップエラー: {e}")
                 
@@ -190,6 +164,33 @@ class BackgroundTasks:
         except Exception as e:
             self.logger.error(f"システム監視ループで予期しないエラー: {e}")
     
+    async def _refresh_speakers_loop(self):
+        """話者カタログをTTLごとに更新するループ"""
+        try:
+            # Botが準備完了するまで待機
+            await self.bot.wait_until_ready()
+            
+            while self.running:
+                interval = speaker_catalog.ttl
+                try:
+                    if speaker_catalog.is_stale():
+                        # 取得に失敗した場合（エンジン起動中など）は短い間隔で再試行
+                        if not await speaker_catalog.refresh():
+                            interval = speaker_catalog.retry_interval
+                    else:
+                        # 次にTTLが切れるまで待機
+                        interval = max(1, speaker_catalog.ttl - (time.time() - speaker_catalog.updated_at))
+                except Exception as e:
+                    self.logger.error(f"話者カタログ更新エラー: {e}")
+                    interval = speaker_catalog.retry_interval
+                
+                await asyncio.sleep(interval)
+                
+        except asyncio.CancelledError:
+            self.logger.debug("話者カタログ更新タスクが停止されました")
+        except Exception as e:
+            self.logger.error(f"話者カタログ更新ループで予期しないエラー: {e}")
+    
     async def _save_stats(self):
         """統計情報を定期的にファイルに保存"""
         if not hasattr(self.bot, 'system_stats'):
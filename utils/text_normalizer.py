@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import logging
+import unicodedata
+import configparser
+
+# 連続すると1つにまとめる句読点（NFKC正規化後の文字）
+_PUNCTUATION_RUN = re.compile(r'[!?。、.,]{2,}')
+# 文末に付いていても読み上げ結果が変わらない句読点（疑問符は抑揚が変わるため含めない）
+_TRAILING_PUNCTUATION = re.compile(r'[!。、.,]+$')
+_WHITESPACE = re.compile(r'\s+')
+_LATIN = re.compile(r'[A-Z]+')
+
+class TextNormalizer:
+    """
+    キャッシュキーを作る前に、読み上げ結果が同じになるテキストの表記ゆれを揃えるクラス
+    全角/半角・空白・連続した句読点・文末の句読点の違いで別々に合成されないようにする
+    """
+    
+    def __init__(self):
+        """初期化"""
+        # 設定を読み込み
+        config = configparser.ConfigParser()
+        config.read('config/settings.ini')
+        
+        self.enabled = config.getboolean('READING', 'normalize_text', fallback=True)
+        self.case_fold = config.getboolean('READING', 'normalize_case_fold', fallback=False)
+        
+        # 統計
+        self.stats = {
+            "texts": 0,
+            "changed": 0
+        }
+        
+        # ロガー設定
+        self.logger = logging.getLogger("text_normalizer")
+    
+    def normalize(self, text):
+        """
+        テキストを正規化する（同じ入力には常に同じ結果を返す）
+        
+        Args:
+            text (str): 読み上げるテキスト
+        
+        Returns:
+            str: 正規化したテキスト
+        """
+        if not self.enabled:
+            return text
+        
+        self.stats["texts"] += 1
+        
+        # 全角英数字・半角カナ・互換文字を揃える
+        result = unicodedata.normalize('NFKC', text)
+        
+        # 空白（全角スペース・改行を含む）を1つの半角スペースにまとめる
+        result = _WHITESPACE.sub(' ', result).strip()
+        
+        # 「！！！」「。。。」などの連続した句読点を1つにまとめる（疑問符を含む場合は疑問符を残す）
+        result = _PUNCTUATION_RUN.sub(lambda m: '?' if '?' in m.group() else m.group()[0], result)
+        
+        # 文末の句読点を除く（句読点だけのテキストはそのまま）
+        stripped = _TRAILING_PUNCTUATION.sub('', result).rstrip()
+        if stripped:
+            result = stripped
+        
+        # 英字の大文字・小文字を揃える
+        if self.case_fold:
+            result = _LATIN.sub(lambda m: m.group().lower(), result)
+        
+        if result != text:
+            self.stats["changed"] += 1
+        return result
+    
+    def get_stats(self):
+        """統計情報を取得"""
+        stats = dict(self.stats)
+        stats["changed_ratio"] = (stats["changed"] / stats["texts"] * 100) if stats["texts"] else 0
+        return stats
+
+# シングルトンインスタンス
+text_normalizer = TextNormalizer()
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import asyncio
 import aiohttp
 import json
 import logging
@@ -9,10 +10,72 @@ import hashlib
 import configparser
 from dotenv import load_dotenv
 import re
+import time
+import uuid
+from collections import deque
+
+from utils.engine_pool import EnginePool
+from utils.wav_utils import concat_wav_files, read_wav
 
 # 環境変数の読み込み
 load_dotenv()
 
+class AudioStream:
+    """文ごとに合成される音声ファイルを元の順序で受け取るためのストリーム"""
+    
+    def __init__(self, tasks, owns_files=True, pauses=None):
+        """
+        初期化
+        
+        Args:
+            tasks (list): 各文の音声ファイルのパス（失敗時はNone）を返すタスクのリスト
+            owns_files (bool): 中止時に合成済みのファイルを削除するかどうか
+            pauses (list, optional): 各文の後に空ける間（ミリ秒）
+        """
+        self._tasks = deque(tasks)
+        self._pauses = deque(pauses or [0] * len(tasks))
+        self.segment_count = len(tasks)
+        self.owns_files = owns_files
+        self.pause_ms = 0  # 最後に返した文の後に空ける間（ミリ秒）
+        self.created_at = time.monotonic()
+        self.first_segment_latency = None  # 最初の文が用意できるまでの秒数
+    
+    @classmethod
+    def from_paths(cls, paths):
+        """合成済みの音声ファイルからストリームを作成する"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for path in paths:
+            future = loop.create_future()
+            future.set_result(path)
+            futures.append(future)
+        return cls(futures, owns_files=False)
+    
+    async def next_path(self):
+        """次の文の音声ファイルのパスを取得（合成が終わるまで待つ）。終端ではNone"""
+        while self._tasks:
+            self.pause_ms = self._pauses.popleft()
+            path = await self._tasks.popleft()
+            if path:
+                if self.first_segment_latency is None:
+                    self.first_segment_latency = time.monotonic() - self.created_at
+                return path
+        return None
+    
+    def cancel(self):
+        """未再生の文の合成を中止し、合成済みの一時ファイルを削除する"""
+        while self._tasks:
+            task = self._tasks.popleft()
+            if not task.done():
+                task.cancel()
+            elif self.owns_files and not task.cancelled() and task.exception() is None and task.result():
+                try:
+                    os.remove(task.result())
+                except OSError:
+                    pass
+        self._pauses.clear()
+
+
 class VoicevoxAPI:
     """VOICEVOX APIとの連携を行うクラス"""
     
@@ -22,8 +85,19 @@ class VoicevoxAPI:
         config = configparser.ConfigParser()
         config.read('config/settings.ini')
         
-        # APIのURL設定
-        self.api_url = os.getenv("VOICEVOX_API_URL", "http://localhost:50021")
+        # APIのURL設定（カンマ区切りで複数のエンジンを指定可能）
+        api_urls = (os.getenv("VOICEVOX_API_URL")
+                    or config.get('VOICEVOX', 'api_urls', fallback='')
+                    or "http://localhost:50021")
+        self.api_urls = [url.strip() for url in api_urls.split(",") if url.strip()]
+        self.api_url = self.api_urls[0]
+        
+        # エンジン間の負荷分散
+        self.engines = EnginePool(
+            self.api_urls,
+            eject_after=config.getint('VOICEVOX', 'eject_after_failures', fallback=3),
+            probe_interval=config.getfloat('VOICEVOX', 'health_check_interval', fallback=10.0)
+        )
         
         # キャッシュ設定
         self.cache_enabled = config.getboolean('DEFAULT', 'cache_enabled', fallback=True)
@@ -32,189 +106,465 @@ class VoicevoxAPI:
         
         # 音声設定
         self.audio_format = config.get('AUDIO', 'audio_format', fallback='wav')
+        self.output_sample_rate = config.getint('AUDIO', 'sample_rate', fallback=24000)
+        self.output_stereo = config.getboolean('AUDIO', 'output_stereo', fallback=False)
+        self.segment_silence_ms = config.getint('AUDIO', 'segment_silence_ms', fallback=0)
+        self.segment_crossfade_ms = config.getint('AUDIO', 'segment_crossfade_ms', fallback=0)
+        self.sentence_pause_ms = config.getint('AUDIO', 'sentence_pause_ms', fallback=300)
+        self.clause_pause_ms = config.getint('AUDIO', 'clause_pause_ms', fallback=100)
+        
+        # HTTP接続プール設定
+        self.pool_limit = config.getint('VOICEVOX', 'pool_limit', fallback=32)
+        self.pool_limit_per_host = config.getint('VOICEVOX', 'pool_limit_per_host', fallback=8)
+        self.keepalive_timeout = config.getfloat('VOICEVOX', 'keepalive_timeout', fallback=30.0)
+        self.connect_timeout = config.getfloat('VOICEVOX', 'connect_timeout', fallback=5.0)
+        self.request_timeout = config.getfloat('VOICEVOX', 'request_timeout', fallback=60.0)
+        
+        # 長文セグメントの並列合成設定
+        self.segment_concurrency = max(1, config.getint('VOICEVOX', 'segment_concurrency', fallback=4))
+        self.segment_retries = max(0, config.getint('VOICEVOX', 'segment_retries', fallback=1))
+        self.long_text_threshold = config.getint('VOICEVOX', 'long_text_threshold', fallback=100)
+        self._segment_semaphore = None  # イベントループ上で初回使用時に作成
+        
+        # 共有セッション（start()で作成、close()で破棄）
+        self._session = None
+        
+        # 接続再利用の統計
+        self.http_stats = {
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0
+        }
+        
+        # セグメント合成の統計
+        self.segment_stats = {
+            "segments": 0,
+            "failed": 0,
+            "retried": 0,
+            "total_segment_time": 0.0,
+            "total_wall_time": 0.0
+        }
+        self.recent_segment_timings = deque(maxlen=100)
         
         # ロガー設定
         self.logger = logging.getLogger("voicevox_api")
     
+    async def start(self):
+        """共有HTTPセッションを開始する（Bot起動時に呼び出す）"""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+            self.logger.info(
+                f"VOICEVOX HTTPセッションを開始 (上限: {self.pool_limit}, ホスト毎: {self.pool_limit_per_host})"
+            )
+            # エンジンのヘルスチェックを開始
+            self.engines.start_health_checks(self._get_session)
+        return self._session
+    
+    async def close(self):
+        """共有HTTPセッションを閉じる（Bot終了時に呼び出す）"""
+        await self.engines.stop_health_checks()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            self.logger.info("VOICEVOX HTTPセッションを終了しました")
+        self._session = None
+    
+    def _create_session(self):
+        """キープアライブ付きの接続プールを持つセッションを作成"""
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_limit,
+            limit_per_host=self.pool_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.request_timeout,
+            connect=self.connect_timeout
+        )
+        
+        # 接続の新規作成・再利用をカウントするトレース設定
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[trace_config]
+        )
+    
+    async def _get_session(self):
+        """共有セッションを取得（未開始の場合は開始する）"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+    
+    async def _on_request_start(self, session, context, params):
+        self.http_stats["requests"] += 1
+    
+    async def _on_connection_create_end(self, session, context, params):
+        self.http_stats["connections_created"] += 1
+    
+    async def _on_connection_reuseconn(self, session, context, params):
+        self.http_stats["connections_reused"] += 1
+    
+    def get_http_stats(self):
+        """HTTP接続の統計情報を取得"""
+        stats = dict(self.http_stats)
+        total = stats["connections_created"] + stats["connections_reused"]
+        stats["reuse_ratio"] = (stats["connections_reused"] / total * 100) if total else 0
+        return stats
+    
+    def get_engine_stats(self):
+        """エンジンごとの負荷分散の統計情報を取得"""
+        return self.engines.get_stats()
+    
     async def get_speakers(self):
         """使用可能な話者一覧を取得する"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(f"{self.api_url}/speakers") as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        self.logger.error(f"話者一覧の取得に失敗: HTTP {response.status}")
-                        return []
-            except aiohttp.ClientError as e:
-                self.logger.error(f"VOICEVOX API接続エラー: {e}")
-                return []
-    
-    def _generate_cache_filename(self, text, speaker_id):
-        """キャッシュ用のファイル名を生成"""
-        # テキストとspeaker_idからハッシュを生成
-        text_hash = hashlib.sha256(f"{text}_{speaker_id}".encode()).hexdigest()[:16]
-        return f"{self.cache_dir}/{text_hash}.{self.audio_format}"
-    
-    async def create_audio(self, text, speaker_id=1, output_path=None):
-        """
-        テキストから音声を生成する
+        session = await self._get_session()
+        engine = self.engines.acquire()
+        start_time = time.perf_counter()
+        success = False
+        try:
+            async with session.get(f"{engine.url}/speakers") as response:
+                success = response.status < 500
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    self.logger.error(f"話者一覧の取得に失敗: HTTP {response.status}")
+                    return []
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error(f"VOICEVOX API接続エラー ({engine.url}): {e}")
+            return []
+        finally:
+            self.engines.release(engine, time.perf_counter() - start_time, success)
+    
+    async def get_speaker_info(self, speaker_id):
+        """
+        特定の話者の情報を取得する
         
         Args:
-            text (str): 合成するテキスト
-            speaker_id (int): 話者ID
-            output_path (str, optional): 保存先ファイルパス
+            speaker_id (int): 話者ID（スタイルID）
             
         Returns:
-            str: 生成された音声ファイルのパス、失敗時はNone
+            dict: 話者情報、取得失敗時はNone
         """
-        # 出力パスが指定されていなければキャッシュパスを使用
-        if not output_path:
-            output_path = self._generate_cache_filename(text, speaker_id)
+        # 話者カタログはこのモジュールに依存するため、ここでインポートする
+        from utils.speaker_catalog import speaker_catalog
         
-        # キャッシュが有効で、既にファイルが存在する場合は再利用
-        if self.cache_enabled and os.path.exists(output_path):
-            self.logger.info(f"キャッシュされた音声ファイルを使用: {output_path}")
-            return output_path
+        entry = await speaker_catalog.lookup(speaker_id)
+        if entry is None:
+            return None
+        return entry[0]
+    
+    def split_segments(self, text):
+        """句読点でテキストを分割する（句読点は直前のセグメントに含める）"""
+        segments = re.split('([。、．，!！?？])', text)
+        combined_segments = []
         
-        # ディレクトリの存在確認
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-        # 音声合成リクエスト
-        async with aiohttp.ClientSession() as session:
-            try:
-                # 1. オーディオクエリの作成
-                params = {"text": text, "speaker": speaker_id}
-                async with session.post(f"{self.api_url}/audio_query", params=params) as response:
-                    if response.status != 200:
-                        self.logger.error(f"オーディオクエリ作成失敗: HTTP {response.status}")
-                        return None
-                    query_data = await response.json()
-                
-                # 2. 音声合成
-                params = {"speaker": speaker_id}
-                async with session.post(
-                    f"{self.api_url}/synthesis", 
-                    params=params,
-                    json=query_data,
-                    headers={"Accept": f"audio/{self.audio_format}"}
-                ) as response:
-                    if response.status != 200:
-                        self.logger.error(f"音声合成失敗: HTTP {response.status}")
-                        return None
-                    
-                    # 音声ファイルの保存
-                    with open(output_path, "wb") as f:
-                        f.write(await response.read())
-                    
-                    self.logger.info(f"音声ファイル生成: {output_path}")
-                    return output_path
-                    
-            except aiohttp.ClientError as e:
-                self.logger.error(f"VOICEVOXリクエストエラー: {e}")
-                return None
+        # 句読点を保持しながら結合
+        for i in range(0, len(segments) - 1, 2):
+            combined_segments.append(segments[i] + segments[i + 1])
+        
+        # 最後のセグメントが漏れている場合は追加
+        if len(segments) % 2 == 1:
+            combined_segments.append(segments[-1])
+        
+        return [segment for segment in combined_segments if segment.strip()]
     
-    async def get_speaker_info(self, speaker_id):
+    def pause_after(self, segment):
+        """文ごとにキャッシュした音声をつなぐときに、セグメントの末尾の句読点に応じて空ける間（ミリ秒）"""
+        segment = segment.rstrip()
+        if not segment:
+            return 0
+        if segment[-1] in '。．!！?？':
+            return self.sentence_pause_ms
+        if segment[-1] in '、，':
+            return self.clause_pause_ms
+        return 0
+    
+    async def create_audio(self, text, speaker_id=1, params=None):
         """
-        特定の話者の情報を取得する
+        テキストから音声を生成（非同期版）
         
         Args:
+            text (str): 合成するテキスト
             speaker_id (int): 話者ID
-            
-        Returns:
-            dict: 話者情報、取得失敗時はNone
+            params (dict, optional): オーディオクエリに上書きする合成パラメータ（speedScale など）
         """
-        speakers = await self.get_speakers()
-        for speaker in speakers:
-            if speaker.get("speaker_id") == speaker_id:
-                return speaker
-        return None
-    
-    async def create_audio(self, text, speaker_id=1):
-        """テキストから音声を生成（非同期版）"""
         try:
             # テキストの長さが長い場合は分割して処理
-            if len(text) > 100:
-                # 句読点で分割
-                segments = re.split('([。、．，!！?？])', text)
-                combined_segments = []
-                
-                # 句読点を保持しながら結合
-                for i in range(0, len(segments) - 1, 2):
-                    if i + 1 < len(segments):
-                        combined_segments.append(segments[i] + segments[i + 1])
-                    else:
-                        combined_segments.append(segments[i])
+            if len(text) > self.long_text_threshold:
+                segments = self.split_segments(text)
                 
-                # 最後のセグメントが漏れている場合は追加
-                if len(segments) % 2 == 1:
-                    combined_segments.append(segments[-1])
-                
-                # 各セグメントを個別に音声化して結合
-                audio_paths = []
-                for segment in combined_segments:
-                    if not segment.strip():
-                        continue
-                    path = await self._generate_audio_segment(segment, speaker_id)
-                    if path:
-                        audio_paths.append(path)
+                # 各セグメントを並列に音声化して結合（順序は維持）
+                audio_paths = await self._generate_segments(segments, speaker_id, params)
                 
                 if not audio_paths:
                     return None
                 
                 # 複数の音声ファイルを結合
-                return await self._combine_audio_files(audio_paths)
+                return await self.combine_audio_files(audio_paths)
             else:
                 # 短いテキストはそのまま処理
-                return await self._generate_audio_segment(text, speaker_id)
+                return await self._generate_audio_segment(text, speaker_id, params)
                 
         except Exception as e:
             self.logger.error(f"音声合成エラー: {e}")
             return None
     
-    async def _generate_audio_segment(self, text, speaker_id):
+    def create_audio_stream(self, text, speaker_id=1, slot=None, params=None):
+        """
+        テキストを文ごとに分割して合成を開始し、完成した順ではなく元の順序で
+        音声ファイルを返すストリームを作成する（先頭の文から再生を始められる）
+        
+        Args:
+            text (str): 合成するテキスト
+            speaker_id (int): 話者ID
+            slot (callable, optional): 各文の合成前に確保する非同期コンテキストマネージャを返す関数
+            params (dict, optional): オーディオクエリに上書きする合成パラメータ
+            
+        Returns:
+            AudioStream: 文ごとの音声ファイルを順に返すストリーム
+        """
+        segments = self.split_segments(text) or [text]
+        
+        # 全ての文の合成が終わった時点で、ストリーム全体の経過時間と各文の合成時間を記録する
+        start_time = time.perf_counter()
+        batch = {"pending": len(segments), "segments": 0, "segment_time": 0.0}
+        
+        async def generate(index, segment):
+            if slot is None:
+                path, elapsed = await self._generate_segment_with_retry(index, segment, speaker_id, params)
+            else:
+                async with slot():
+                    path, elapsed = await self._generate_segment_with_retry(index, segment, speaker_id, params)
+            batch["segments"] += 1
+            batch["segment_time"] += elapsed
+            return path
+        
+        def on_done(_):
+            batch["pending"] -= 1
+            if batch["pending"] == 0:
+                self._record_segment_batch(batch["segments"], batch["segment_time"], time.perf_counter() - start_time)
+        
+        # 全ての文の合成をバックグラウンドで開始（同時実行数はセマフォで制限）
+        tasks = [asyncio.create_task(generate(index, segment)) for index, segment in enumerate(segments)]
+        for task in tasks:
+            task.add_done_callback(on_done)
+        return AudioStream(tasks)
+    
+    async def create_segment_audio(self, segment, speaker_id=1, params=None, index=0):
+        """
+        1文を合成する（失敗時は設定回数だけ再試行する）
+        文ごとのキャッシュから個別に呼び出されるため、並列セグメント合成の短縮率には含めない
+        
+        Args:
+            segment (str): 合成する文
+            speaker_id (int): 話者ID
+            params (dict, optional): オーディオクエリに上書きする合成パラメータ
+            index (int): ログに出す文の位置
+            
+        Returns:
+            str: 音声ファイルのパス、失敗時はNone
+        """
+        path, _ = await self._generate_segment_with_retry(index, segment, speaker_id, params)
+        return path
+    
+    async def _generate_segments(self, segments, speaker_id, params=None):
+        """
+        複数のセグメントを同時実行数の上限付きで並列に音声化する
+        
+        Returns:
+            list: 元の順序に並んだ音声ファイルのパス（失敗したセグメントは除外）
+        """
+        # 同じセグメントは1回だけ合成する
+        unique_segments = list(dict.fromkeys(segments))
+        
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*[
+            self._generate_segment_with_retry(index, segment, speaker_id, params)
+            for index, segment in enumerate(unique_segments)
+        ])
+        wall_time = time.perf_counter() - start_time
+        
+        paths = {segment: path for segment, (path, _) in zip(unique_segments, results)}
+        segment_time = sum(elapsed for _, elapsed in results)
+        self._record_segment_batch(len(unique_segments), segment_time, wall_time)
+        self.logger.info(
+            f"{len(unique_segments)}セグメントを合成: 経過 {wall_time:.2f}秒 / 合計 {segment_time:.2f}秒"
+        )
+        
+        return [paths[segment] for segment in segments if paths[segment]]
+    
+    async def _generate_segment_with_retry(self, index, segment, speaker_id, params=None):
+        """
+        1セグメントを合成し、失敗時は設定回数だけ再試行する
+        
+        Returns:
+            tuple: (音声ファイルのパスまたはNone, 合成に要した合計秒数)
+        """
+        total_elapsed = 0.0
+        for attempt in range(self.segment_retries + 1):
+            async with self._get_segment_semaphore():
+                start_time = time.perf_counter()
+                path = await self._generate_audio_segment(segment, speaker_id, params)
+                elapsed = time.perf_counter() - start_time
+            
+            total_elapsed += elapsed
+            self.recent_segment_timings.append({
+                "index": index,
+                "length": len(segment),
+                "elapsed": elapsed,
+                "attempt": attempt,
+                "success": path is not None
+            })
+            
+            if path:
+                return path, total_elapsed
+            
+            if attempt < self.segment_retries:
+                self.segment_stats["retried"] += 1
+                self.logger.warning(f"セグメント {index} の合成を再試行します ({attempt + 1}/{self.segment_retries})")
+        
+        # 再試行しても失敗したセグメントはスキップ
+        self.segment_stats["failed"] += 1
+        self.logger.error(f"セグメント {index} の合成に失敗したためスキップします: {segment[:20]}")
+        return None, total_elapsed
+    
+    def _record_segment_batch(self, count, segment_time, wall_time):
+        """
+        並列に合成したセグメントの件数と時間を記録する（短縮率の計算用）
+        
+        Args:
+            count (int): 合成したセグメントの数（再試行は数えない）
+            segment_time (float): 各セグメントの合成時間の合計（秒）
+            wall_time (float): 最初の合成開始から最後の合成終了までの経過時間（秒）
+        """
+        self.segment_stats["segments"] += count
+        self.segment_stats["total_segment_time"] += segment_time
+        self.segment_stats["total_wall_time"] += wall_time
+    
+    def _get_segment_semaphore(self):
+        """セグメント合成の同時実行数を制限するセマフォを取得"""
+        if self._segment_semaphore is None:
+            self._segment_semaphore = asyncio.Semaphore(self.segment_concurrency)
+        return self._segment_semaphore
+    
+    def get_segment_stats(self):
+        """セグメント合成の統計情報を取得"""
+        stats = dict(self.segment_stats)
+        # 並列化による短縮率（逐次合成した場合の合計時間との比較）
+        if stats["total_segment_time"] > 0:
+            stats["speedup"] = stats["total_segment_time"] / max(stats["total_wall_time"], 1e-9)
+        else:
+            stats["speedup"] = 0
+        return stats
+    
+    async def _generate_audio_segment(self, text, speaker_id, params=None):
         """テキストセグメントから音声を生成する"""
         # 一時ファイルパスを生成
-        temp_file = f"temp/{hashlib.sha256(text.encode()).hexdigest()[:8]}_{speaker_id}.{self.audio_format}"
+        # 同じ文を同時に合成しても衝突しないよう、ランダムな接尾辞を付ける
+        text_hash = hashlib.sha256(text.encode()).hexdigest()[:8]
+        temp_file = f"{self.temp_dir}/{text_hash}_{speaker_id}_{uuid.uuid4().hex[:8]}.{self.audio_format}"
         
         # ディレクトリの存在確認
         os.makedirs(os.path.dirname(temp_file), exist_ok=True)
         
         # 音声合成リクエスト
-        async with aiohttp.ClientSession() as session:
+        audio_data = await self._synthesize(text, speaker_id, params)
+        if audio_data is None:
+            return None
+        
+        # 音声ファイルの保存
+        with open(temp_file, "wb") as f:
+            f.write(audio_data)
+        
+        return temp_file
+    
+    async def _synthesize(self, text, speaker_id, params=None):
+        """
+        最も負荷の低いエンジンでオーディオクエリ作成と音声合成を実行する
+        接続エラーやエンジン側のエラーの場合は、別のエンジンで1回だけ再試行する
+        
+        Returns:
+            bytes: 合成された音声データ、失敗時はNone
+        """
+        session = await self._get_session()
+        tried = []
+        
+        for _ in range(min(2, len(self.engines.endpoints))):
+            # クエリ作成と合成は同じエンジンで行う
+            engine = self.engines.acquire(exclude=tried)
+            tried.append(engine)
+            start_time = time.perf_counter()
+            healthy = None  # 結果が出ないまま抜けた場合はNone
             try:
-                # 1. オーディオクエリの作成
-                params = {"text": text, "speaker": speaker_id}
-                async with session.post(f"{self.api_url}/audio_query", params=params) as response:
-                    if response.status != 200:
-                        self.logger.error(f"オーディオクエリ作成失敗: HTTP {response.status}")
-                        return None
-                    query_data = await response.json()
-                
-                # 2. 音声合成
-                params = {"speaker": speaker_id}
-                async with session.post(
-                    f"{self.api_url}/synthesis", 
-                    params=params,
-                    json=query_data,
-                    headers={"Accept": f"audio/{self.audio_format}"}
-                ) as response:
-                    if response.status != 200:
-                        self.logger.error(f"音声合成失敗: HTTP {response.status}")
-                        return None
-                    
-                    # 音声ファイルの保存
-                    with open(temp_file, "wb") as f:
-                        f.write(await response.read())
-                    
-                    return temp_file
-                    
-            except aiohttp.ClientError as e:
-                self.logger.error(f"VOICEVOXリクエストエラー: {e}")
-                return None
+                audio_data, status = await self._synthesize_on(session, engine.url, text, speaker_id, params)
+                healthy = status < 500
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.error(f"VOICEVOXリクエストエラー ({engine.url}): {e}")
+                healthy = False
+                continue
+            finally:
+                # どのように抜けても処理中のリクエスト数を戻す
+                if healthy is None:
+                    # 呼び出し元の都合による中断や想定外のエラーはエンジンの失敗として数えない
+                    self.engines.abandon(engine)
+                else:
+                    self.engines.release(engine, time.perf_counter() - start_time, healthy)
+            
+            if healthy:
+                return audio_data
+        
+        return None
+    
+    async def _synthesize_on(self, session, api_url, text, speaker_id, params=None):
+        """
+        指定したエンジンでオーディオクエリ作成と音声合成を実行する
+        
+        Returns:
+            tuple: (音声データまたはNone, HTTPステータス)
+        """
+        # 1. オーディオクエリの作成
+        query_params = {"text": text, "speaker": speaker_id}
+        async with session.post(f"{api_url}/audio_query", params=query_params) as response:
+            if response.status != 200:
+                self.logger.error(f"オーディオクエリ作成失敗: HTTP {response.status}")
+                return None, response.status
+            query_data = await response.json()
+        
+        # 出力フォーマットを指定（48kHz / ステレオにすると再生時の変換が不要になる）
+        query_data["outputSamplingRate"] = self.output_sample_rate
+        query_data["outputStereo"] = self.output_stereo
+        
+        # 話速などのリクエストごとの合成パラメータを上書き
+        if params:
+            query_data.update(params)
+        
+        # 2. 音声合成
+        async with session.post(
+            f"{api_url}/synthesis", 
+            params={"speaker": speaker_id},
+            json=query_data,
+            headers={"Accept": f"audio/{self.audio_format}"}
+        ) as response:
+            if response.status != 200:
+                self.logger.error(f"音声合成失敗: HTTP {response.status}")
+                return None, response.status
+            return await response.read(), response.status
 
-    async def _combine_audio_files(self, audio_paths):
-        """複数の音声ファイルを結合する"""
+    async def combine_audio_files(self, audio_paths, reader=read_wav, pauses=None):
+        """
+        複数の音声ファイルを結合する（1つだけの場合はそのファイルを返す）
+        
+        Args:
+            audio_paths (list): 音声ファイルのパス
+            reader (callable): パスからWavDataを読み込む関数（セグメントに格納したキャッシュなど）
+            pauses (list, optional): ファイル間ごとに挿入する無音（ミリ秒、指定時は segment_silence_ms の代わりに使用）
+        
+        Returns:
+            str: 結合した音声ファイルのパス、結合できなかった場合はNone
+        """
         if not audio_paths:
             return None
         
@@ -223,30 +573,24 @@ class VoicevoxAPI:
             return audio_paths[0]
         
         # 複数ファイルの場合は結合
-        import subprocess
-        import uuid
-        
-        output_file = f"temp/combined_{uuid.uuid4().hex[:8]}.{self.audio_format}"
+        output_file = f"{self.temp_dir}/combined_{uuid.uuid4().hex[:8]}.{self.audio_format}"
         
-        # FFMPEGを使って結合
+        # RIFFヘッダを解析してPCMを連結（イベントループを塞がないよう別スレッドで実行）
         try:
-            # 入力ファイルリストを作成
-            list_file = f"temp/filelist_{uuid.uuid4().hex[:8]}.txt"
-            with open(list_file, "w") as f:
-                for path in audio_paths:
-                    f.write(f"file '{os.path.abspath(path)}'\n")
-            
-            # FFMPEGで結合
-            subprocess.run([
-                "ffmpeg", "-f", "concat", "-safe", "0", 
-                "-i", list_file, "-c", "copy", output_file
-            ], check=True, stderr=subprocess.PIPE)
-            
-            # 一時リストファイルを削除
-            os.remove(list_file)
-            
-            return output_file
-            
-        except (subprocess.SubprocessError, OSError) as e:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None,
+                concat_wav_files,
+                audio_paths,
+                output_file,
+                self.segment_silence_ms if pauses is None else pauses,
+                self.segment_crossfade_ms if pauses is None else 0,
+                reader
+            )
+        except (ValueError, OSError) as e:
+            # 一部のファイルだけの音声を全文として扱わないよう、失敗として返す
             self.logger.error(f"音声ファイル結合エラー: {e}")
-            return audio_paths[0]  # エラーの場合は最初のファイルを返す
\ No newline at end of file
+            return None
+
+# シングルトンインスタンス
+voicevox_api = VoicevoxAPI()
\ No newline at end of file
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# WAVフォーマットID
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# サンプル幅（バイト）ごとのNumPy型
+_SAMPLE_DTYPES = {
+    2: np.dtype('<i2'),
+    4: np.dtype('<i4'),
+}
+
+# 解析済みのWAVデータ（pcmはインターリーブされた生のPCMバイト列）
+WavData = namedtuple("WavData", ["sample_rate", "channels", "sample_width", "pcm"])
+
+
+def parse_wav(data):
+    """
+    RIFFヘッダを解析してWAVデータを取り出す
+    
+    Args:
+        data (bytes): WAVファイルの内容
+    
+    Returns:
+        WavData: 解析したフォーマット情報とPCMデータ
+    
+    Raises:
+        ValueError: RIFF/WAVEとして解釈できない場合
+    """
+    view = memoryview(data)
+    if len(view) < 12 or bytes(view[0:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+        raise ValueError("RIFF/WAVE形式ではありません")
+    
+    fmt = None
+    pcm = None
+    offset = 12
+    
+    # チャンクを順に走査（fmt と data 以外は読み飛ばす）
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from('<I', view, offset + 4)[0]
+        body_start = offset + 8
+        body_end = min(body_start + chunk_size, len(view))
+        
+        if chunk_id == b'fmt ':
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', view, body_start)
+            if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE):
+                raise ValueError(f"未対応のWAVフォーマットです: {format_tag:#06x}")
+            fmt = (sample_rate, channels, bits // 8)
+        elif chunk_id == b'data':
+            pcm = view[body_start:body_end]
+        
+        # チャンクは2バイト境界に揃えられる
+        offset = body_start + chunk_size + (chunk_size & 1)
+    
+    if fmt is None or pcm is None:
+        raise ValueError("fmt または data チャンクが見つかりません")
+    
+    return WavData(fmt[0], fmt[1], fmt[2], pcm)
+
+
+def read_wav(path):
+    """WAVファイルを読み込んで解析する"""
+    with open(path, 'rb') as f:
+        return parse_wav(f.read())
+
+
+def build_wav(pcm, sample_rate, channels, sample_width):
+    """PCMデータにRIFFヘッダを付けてWAVのバイト列を作成する"""
+    pcm = bytes(pcm)
+    block_align = channels * sample_width
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + len(pcm), b'WAVE',
+        b'fmt ', 16, WAVE_FORMAT_PCM, channels, sample_rate,
+        sample_rate * block_align, block_align, sample_width * 8,
+        b'data', len(pcm)
+    )
+    return header + pcm
+
+
+def write_wav(path, wav):
+    """WavDataをファイルに書き出す"""
+    with open(path, 'wb') as f:
+        f.write(build_wav(wav.pcm, wav.sample_rate, wav.channels, wav.sample_width))
+
+
+def to_samples(wav):
+    """PCMデータを (フレーム数, チャンネル数) のNumPy配列に変換する"""
+    dtype = _SAMPLE_DTYPES.get(wav.sample_width)
+    if dtype is None:
+        raise ValueError(f"未対応のサンプル幅です: {wav.sample_width * 8}bit")
+    usable = len(wav.pcm) - len(wav.pcm) % (dtype.itemsize * wav.channels)
+    return np.frombuffer(wav.pcm[:usable], dtype=dtype).reshape(-1, wav.channels)
+
+
+def resample(samples, src_rate, dst_rate):
+    """
+    線形補間でサンプリングレートを変換する
+    
+    Args:
+        samples (np.ndarray): (フレーム数, チャンネル数) の配列
+        src_rate (int): 変換前のサンプリングレート
+        dst_rate (int): 変換後のサンプリングレート
+    
+    Returns:
+        np.ndarray: 変換後の float32 配列
+    """
+    samples = samples.astype(np.float32, copy=False)
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    
+    frames = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(frames, dtype=np.float64) * (src_rate / dst_rate)
+    index = np.minimum(positions.astype(np.int64), len(samples) - 1)
+    following = np.minimum(index + 1, len(samples) - 1)
+    frac = (positions - index).astype(np.float32)[:, None]
+    return samples[index] * (1.0 - frac) + samples[following] * frac
+
+
+def trim_silence(wav, threshold_db=-50.0, padding_ms=50):
+    """
+    先頭と末尾の無音を取り除く
+    
+    Args:
+        wav (WavData): 対象のWAVデータ
+        threshold_db (float): 無音とみなす振幅（フルスケールに対するdB）
+        padding_ms (int): 音声の前後に残す無音の長さ（ミリ秒）
+    
+    Returns:
+        WavData: 無音を除いたWAVデータ（すべて無音の場合は元のデータ）
+    """
+    samples = to_samples(wav)
+    if len(samples) == 0:
+        return wav
+    
+    full_scale = float(np.iinfo(samples.dtype).max)
+    threshold = full_scale * (10.0 ** (threshold_db / 20.0))
+    
+    # いずれかのチャンネルが閾値を超えるフレームを音声とみなす
+    voiced = np.flatnonzero((np.abs(samples) > threshold).any(axis=1))
+    if len(voiced) == 0:
+        return wav
+    
+    padding = int(wav.sample_rate * padding_ms / 1000)
+    start = max(0, voiced[0] - padding)
+    end = min(len(samples), voiced[-1] + 1 + padding)
+    if start == 0 and end == len(samples):
+        return wav
+    
+    frame_bytes = wav.channels * wav.sample_width
+    return WavData(wav.sample_rate, wav.channels, wav.sample_width, wav.pcm[start * frame_bytes:end * frame_bytes])
+
+
+def wav_duration(wav):
+    """WAVデータの再生時間（秒）"""
+    return len(wav.pcm) / (wav.sample_rate * wav.channels * wav.sample_width)
+
+
+def trim_wav_file(src_path, dst_path, threshold_db=-50.0, padding_ms=50):
+    """
+    WAVファイルの前後の無音を取り除いて書き出す
+    
+    Returns:
+        tuple: (元の再生時間, 除去後の再生時間) 秒
+    
+    Raises:
+        ValueError: WAVとして解釈できない場合
+    """
+    wav = read_wav(src_path)
+    trimmed = trim_silence(wav, threshold_db, padding_ms)
+    
+    # 書き込み途中のファイルを再生しないよう、一時ファイルに書いてから置き換える
+    temp_path = dst_path + '.tmp'
+    write_wav(temp_path, trimmed)
+    os.replace(temp_path, dst_path)
+    return wav_duration(wav), wav_duration(trimmed)
+
+
+def time_stretch(samples, rate, sample_rate, frame_ms=40, tolerance_ms=10):
+    """
+    WSOLA（波形の類似度に基づく重ね合わせ）で音程を変えずに再生速度を変える
+    
+    Args:
+        samples (np.ndarray): (フレーム数, チャンネル数) の配列
+        rate (float): 速度の倍率（1.5 で 1.5倍速、長さは 1/1.5 になる）
+        sample_rate (int): サンプリングレート
+        frame_ms (int): 重ね合わせる区間の長さ（ミリ秒）
+        tolerance_ms (int): 区間の位置をずらして探す範囲（ミリ秒）
+    
+    Returns:
+        np.ndarray: 変換後の float32 配列
+    """
+    samples = samples.astype(np.float32, copy=False)
+    if rate == 1.0 or len(samples) == 0:
+        return samples
+    
+    length = max(4, int(sample_rate * frame_ms / 1000) & ~1)
+    synthesis_hop = length // 2
+    analysis_hop = synthesis_hop * rate
+    tolerance = int(sample_rate * tolerance_ms / 1000)
+    
+    # 50%の重なりで足し合わせると1になる窓
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(length) / length)).astype(np.float32)[:, None]
+    
+    # 探索範囲と最後の区間がはみ出さないよう前後を無音で埋める
+    padded = np.pad(samples, ((tolerance, length + tolerance + synthesis_hop), (0, 0)))
+    # 類似度はチャンネルを平均した波形で計算する
+    mono = padded.mean(axis=1)
+    
+    frames = int(np.ceil(len(samples) / rate / synthesis_hop))
+    out = np.zeros(((frames + 1) * synthesis_hop + length, samples.shape[1]), dtype=np.float32)
+    
+    previous = tolerance
+    out[:length] += padded[previous:previous + length] * window
+    for k in range(1, frames):
+        # 前の区間の自然な続きに最も似ている区間を、本来の位置の前後から探す
+        template = mono[previous + synthesis_hop:previous + synthesis_hop + length]
+        nominal = tolerance + int(k * analysis_hop)
+        if nominal + tolerance + length > len(mono):
+            break
+        region = mono[nominal - tolerance:nominal + tolerance + length]
+        correlation = np.correlate(region, template, mode='valid')
+        previous = nominal - tolerance + int(np.argmax(correlation))
+        
+        start = k * synthesis_hop
+        out[start:start + length] += padded[previous:previous + length] * window
+    
+    return out[:int(round(len(samples) / rate))]
+
+
+def convert_wav(wav, sample_rate, channels, speed=1.0):
+    """
+    WAVを指定したサンプリングレート・チャンネル数の16bit PCMに変換する
+    
+    Args:
+        wav (WavData): 変換元のWAVデータ
+        sample_rate (int): 変換後のサンプリングレート
+        channels (int): 変換後のチャンネル数
+        speed (float): 再生速度の倍率（音程は変えない）
+    
+    Returns:
+        bytes: インターリーブされた16bit リトルエンディアンのPCM（変換しない場合は元のデータのビュー）
+    """
+    # 既に目的のフォーマットであれば変換もコピーもしない
+    if (wav.sample_rate, wav.channels, wav.sample_width) == (sample_rate, channels, 2) and speed == 1.0:
+        return wav.pcm
+    
+    samples = to_samples(wav).astype(np.float32)
+    if wav.sample_width == 4:
+        samples /= 65536.0
+    
+    # チャンネル数を減らす場合は先にダウンミックスして変換量を減らす
+    if wav.channels != channels:
+        samples = samples.mean(axis=1, keepdims=True)
+    
+    # 速度の変換はサンプル数の少ない元のサンプリングレートで行う
+    if speed != 1.0:
+        samples = time_stretch(samples, speed, wav.sample_rate)
+    
+    samples = resample(samples, wav.sample_rate, sample_rate)
+    
+    # モノラルから目的のチャンネル数に複製
+    if samples.shape[1] != channels:
+        samples = np.repeat(samples, channels, axis=1)
+    
+    return np.clip(np.rint(samples), -32768, 32767).astype('<i2').tobytes()
+
+
+def concat_wavs(clips, silence_ms=0, crossfade_ms=0):
+    """
+    複数のWAVを1つに結合する
+    
+    Args:
+        clips (list): 結合するWavDataのリスト（同一フォーマットであること）
+        silence_ms (int or list): クリップ間に挿入する無音の長さ（ミリ秒、リストの場合はクリップ間ごとの長さ）
+        crossfade_ms (int): クリップ間のクロスフェードの長さ（ミリ秒、無音より優先）
+    
+    Returns:
+        WavData: 結合したWAVデータ
+    """
+    if not clips:
+        raise ValueError("結合するクリップがありません")
+    
+    first = clips[0]
+    for clip in clips[1:]:
+        if (clip.sample_rate, clip.channels, clip.sample_width) != (first.sample_rate, first.channels, first.sample_width):
+            raise ValueError("フォーマットの異なるWAVは結合できません")
+    
+    if isinstance(silence_ms, (list, tuple)):
+        gaps = list(silence_ms)
+    else:
+        gaps = [silence_ms] * (len(clips) - 1)
+    
+    # 加工が不要な場合はPCMを単純に連結
+    if max(gaps, default=0) <= 0 and crossfade_ms <= 0:
+        pcm = b''.join(bytes(clip.pcm) for clip in clips)
+        return WavData(first.sample_rate, first.channels, first.sample_width, pcm)
+    
+    arrays = [to_samples(clip) for clip in clips]
+    dtype = arrays[0].dtype
+    
+    if crossfade_ms > 0:
+        fade = int(first.sample_rate * crossfade_ms / 1000)
+        overlaps = [0] + [min(fade, len(prev), len(cur)) for prev, cur in zip(arrays, arrays[1:])]
+        out = np.zeros((sum(len(a) for a in arrays) - sum(overlaps), first.channels), dtype=np.float32)
+        
+        pos = 0
+        for array, overlap in zip(arrays, overlaps):
+            pos -= overlap
+            if overlap:
+                # 直線的なフェードアウト/フェードインを重ね合わせる
+                ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)[:, None]
+                out[pos:pos + overlap] *= (1.0 - ramp)
+                out[pos:pos + overlap] += array[:overlap] * ramp
+            out[pos + overlap:pos + len(array)] = array[overlap:]
+            pos += len(array)
+        
+        info = np.iinfo(dtype)
+        result = np.clip(np.rint(out), info.min, info.max).astype(dtype)
+    else:
+        parts = []
+        for i, array in enumerate(arrays):
+            if i > 0 and gaps[i - 1] > 0:
+                parts.append(np.zeros((int(first.sample_rate * gaps[i - 1] / 1000), first.channels), dtype=dtype))
+            parts.append(array)
+        result = np.concatenate(parts)
+    
+    return WavData(first.sample_rate, first.channels, first.sample_width, result.tobytes())
+
+
+def concat_wav_files(paths, output_path, silence_ms=0, crossfade_ms=0, reader=read_wav):
+    """WAVファイルを読み込んで結合し、1つのファイルとして書き出す"""
+    clips = [reader(path) for path in paths]
+    write_wav(output_path, concat_wavs(clips, silence_ms, crossfade_ms))
+    return output_path